@@ -1,84 +1,74 @@
 import os
-from datetime import datetime, timedelta
-from collections import defaultdict
-from github import Github
+import sys
+import argparse
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.event_log import EventLog
+from src.event_metrics import weekly_metrics as event_weekly_metrics
+from src.github_graphql import GraphQLBulkFetcher
+from src.issue_facts import IssueFactStore
+from src.metrics_history import KIND_CLOSE, KIND_FIRST_RESPONSE, MetricsHistory
 
 load_dotenv()
 
+def format_percentiles(percentiles):
+    if not percentiles or not percentiles['count']:
+        return "No data"
+    return " / ".join(f"{percentiles[p]:.1f}" for p in ('p50', 'p90', 'p99')) + " minutes"
+
 class AnalyticsDashboard:
-    def __init__(self):
-        self.github = Github(os.getenv('GITHUB_TOKEN'))
-        self.repo = self.github.get_repo('naman-msft/AKS')
+    def __init__(self, store_path='triage_issue_facts.json', history_path='triage_metrics.db',
+                 events_dir='.triage_events'):
+        self.fetcher = GraphQLBulkFetcher('naman-msft/AKS')
+        self.store = IssueFactStore(store_path)
+        self.history_path = history_path
+        self.events = EventLog(events_dir)
     
     def generate_weekly_metrics(self):
         """Generate comprehensive weekly metrics"""
-        one_week_ago = datetime.now() - timedelta(days=7)
+        now = datetime.now(timezone.utc)
+        one_week_ago = now - timedelta(days=7)
         
-        metrics = {
-            'period': f"{one_week_ago.strftime('%Y-%m-%d')} to {datetime.now().strftime('%Y-%m-%d')}",
-            'issues_created': 0,
-            'issues_closed': 0,
-            'ai_classifications': defaultdict(int),
-            'human_overrides': 0,
-            'average_time_to_first_response': [],
-            'issues_by_area': defaultdict(int),
-            'cri_issues': 0,
-            'duplicate_issues': 0,
-            'stale_closures': 0,
-            'repair_items_created': 0
-        }
+        # Only issues changed since the last run are fetched, everything else comes from the store
+        self.store.refresh(self.fetcher)
+        self.store.save()
+        print(f"📡 {self.fetcher.stats()}")
         
-        # Analyze issues created in the last week
-        recent_issues = self.repo.get_issues(state='all', since=one_week_ago)
+        metrics = self.store.weekly_metrics(one_week_ago, now)
         
-        for issue in recent_issues:
-            if issue.created_at >= one_week_ago:
-                metrics['issues_created'] += 1
-                
-                # Check AI classification
-                for label in issue.labels:
-                    if label.name in ['bug', 'support', 'feature', 'info_needed']:
-                        metrics['ai_classifications'][label.name] += 1
-                    if label.name == 'CRI':
-                        metrics['cri_issues'] += 1
-                    if label.name == 'duplicate':
-                        metrics['duplicate_issues'] += 1
-                
-                # Calculate time to first response
-                first_comment = None
-                for comment in issue.get_comments():
-                    if comment.user.login != issue.user.login:
-                        first_comment = comment
-                        break
-                
-                if first_comment:
-                    response_time = (first_comment.created_at - issue.created_at).total_seconds() / 60
-                    metrics['average_time_to_first_response'].append(response_time)
-                
-                # Check for overrides
-                for comment in issue.get_comments():
-                    if '/override-classification' in comment.body:
-                        metrics['human_overrides'] += 1
-            
-            if issue.closed_at and issue.closed_at >= one_week_ago:
-                metrics['issues_closed'] += 1
-                if 'auto-closed' in [l.name for l in issue.labels]:
-                    metrics['stale_closures'] += 1
+        # Tail latencies come from the raw durations rather than the averaged snapshot
+        history = MetricsHistory(self.history_path)
+        try:
+            added = history.record_facts(self.store.facts.values())
+            print(f"🗄️  Recorded {added} new durations in {self.history_path}")
+            metrics['first_response_percentiles'] = history.percentiles(
+                KIND_FIRST_RESPONSE, one_week_ago, now)
+            metrics['close_percentiles'] = history.percentiles(KIND_CLOSE, one_week_ago, now)
+            # Longer windows are merged from the stored weekly sketches
+            metrics['first_response_by_month'] = history.period_percentiles(
+                'month', KIND_FIRST_RESPONSE, start=now - timedelta(days=90))
+        finally:
+            history.close()
         
-        # Calculate averages
-        if metrics['average_time_to_first_response']:
-            avg_response = sum(metrics['average_time_to_first_response']) / len(metrics['average_time_to_first_response'])
-            metrics['average_time_to_first_response'] = f"{avg_response:.1f} minutes"
-        else:
-            metrics['average_time_to_first_response'] = "No data"
+        # Override rates by confidence come from the triage event log when one is present
+        if self.events.segments():
+            metrics['accuracy'] = event_weekly_metrics(self.events, one_week_ago, now)['accuracy']
         
         return metrics
     
-    def generate_report(self):
+    def generate_event_metrics(self):
+        """Weekly metrics from the bot's own event log, without any GitHub API traffic"""
+        now = datetime.now(timezone.utc)
+        metrics = event_weekly_metrics(self.events, now - timedelta(days=7), now)
+        print(f"🗒️  Read {len(self.events.segments())} event log segments from {self.events.directory}")
+        return metrics
+    
+    def generate_report(self, metrics=None):
         """Generate markdown report"""
-        metrics = self.generate_weekly_metrics()
+        if metrics is None:
+            metrics = self.generate_weekly_metrics()
         
         report = f"""# AKS AI Triage Bot - Weekly Analytics Report
 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -98,6 +88,8 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ### Response Times
 - **Average Time to First Response:** {metrics['average_time_to_first_response']}
+- **First Response p50 / p90 / p99:** {format_percentiles(metrics.get('first_response_percentiles'))}
+- **Time to Close p50 / p90 / p99:** {format_percentiles(metrics.get('close_percentiles'))}
 - **Manual Triage Time Saved:** ~{metrics['issues_created'] * 15} minutes
 
 ### Classification Breakdown
@@ -106,6 +98,26 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             percentage = (count / max(sum(metrics['ai_classifications'].values()), 1)) * 100
             report += f"- **{classification.title()}:** {count} ({percentage:.1f}%)\n"
         
+        monthly = metrics.get('first_response_by_month')
+        if monthly:
+            report += "\n### First Response Trend (p50 / p90 / p99)\n"
+            for month, percentiles in monthly.items():
+                report += f"- **{month}:** {format_percentiles(percentiles)} ({percentiles['count']} issues)\n"
+        
+        accuracy = metrics.get('accuracy')
+        if accuracy and accuracy['classifications']:
+            report += "\n### Classification Accuracy\n"
+            report += (f"- **Overall:** {accuracy['accuracy']:.1f}% "
+                       f"({accuracy['overridden']} of {accuracy['classifications']} overridden)\n")
+            for classification, bucket in accuracy['by_classification'].items():
+                report += f"- **{classification.title()}:** {bucket['accuracy']:.1f}% of {bucket['count']}\n"
+            report += "\n| Confidence | Issues | Accuracy |\n|---|---|---|\n"
+            for bucket_name, bucket in accuracy['by_confidence'].items():
+                report += f"| {bucket_name} | {bucket['count']} | {bucket['accuracy']:.1f}% |\n"
+            latency = accuracy['latency_ms']
+            if latency['count']:
+                report += f"\n- **Classifier latency p50 / p95:** {latency['p50']:.0f} / {latency['p95']:.0f} ms\n"
+        
         report += f"""
 ### Automation Actions
 - **Stale Issues Closed:** {metrics['stale_closures']}
@@ -126,38 +138,41 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         return report
     
     def save_metrics_history(self, metrics):
-        """Save metrics for historical tracking"""
-        history_file = 'triage_metrics_history.json'
-        
+        """Append this week's snapshot to the history store"""
+        history = MetricsHistory(self.history_path)
         try:
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        except:
-            history = []
-        
-        history.append({
-            'timestamp': datetime.now().isoformat(),
-            'metrics': metrics
-        })
-        
-        # Keep last 52 weeks
-        history = history[-52:]
-        
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+            imported = history.import_legacy_json()
+            if imported:
+                print(f"📥 Imported {imported} snapshots from triage_metrics_history.json")
+            history.append_snapshot(metrics)
+            # The text export is what gets committed; the database is rebuilt from it when missing
+            exported = history.export_text()
+            print(f"💾 Appended {exported} new or changed rows to {history.text_path}")
+        finally:
+            history.close()
 
 def main():
-    dashboard = AnalyticsDashboard()
-    report = dashboard.generate_report()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', choices=['github', 'events'], default='github',
+                        help='Read issues from GitHub, or only the local triage event log')
+    parser.add_argument('--events', default='.triage_events', help='Event log directory for --source events')
+    args = parser.parse_args()
+
+    dashboard = AnalyticsDashboard(events_dir=args.events)
+    if args.source == 'events':
+        metrics = dashboard.generate_event_metrics()
+    else:
+        metrics = dashboard.generate_weekly_metrics()
+    report = dashboard.generate_report(metrics)
     print(report)
     
     # Save to file
     with open('weekly_triage_report.md', 'w') as f:
         f.write(report)
     
-    # Save metrics history
-    metrics = dashboard.generate_weekly_metrics()
-    dashboard.save_metrics_history(metrics)
+    # Save metrics history; event-log metrics only cover the bot's own actions, so they stay out of it
+    if args.source == 'github':
+        dashboard.save_metrics_history(metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Run the classifier across historical issues.
+
+Issues are streamed from GitHub (GraphQL, all states) or from a local snapshot
+file and classified concurrently. Progress is checkpointed so an interrupted or
+rate-limited run picks up where it stopped.
+
+Usage:
+    python scripts/backfill.py --source github --workers 8
+    python scripts/backfill.py --source snapshot --snapshot issues.json --output results.jsonl
+    python scripts/backfill.py --source github --apply   # write labels/comments back
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+from github import Github
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_plan import ActionPlanExecutor, is_rate_limit_error
+from src.github_graphql import GraphQLBulkFetcher
+from triage_enhanced import build_classifier, build_triage_plan
+
+load_dotenv()
+
+CHECKPOINT_EVERY = 25
+MAX_BACKOFF_SECONDS = 600
+
+
+class BackfillCheckpoint:
+    """Set of issue numbers already processed, persisted atomically"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.processed = set()
+        self.started_at = datetime.now().isoformat()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.processed = set(data.get('processed', []))
+            self.started_at = data.get('started_at', self.started_at)
+            print(f"↩️  Resuming from checkpoint: {len(self.processed)} issues already done")
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'started_at': self.started_at,
+                'updated_at': datetime.now().isoformat(),
+                'processed': sorted(self.processed)
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+def record_to_issue_data(record) -> Dict:
+    return {
+        'id': record.number,
+        'title': record.title,
+        'body': record.body or '',
+        'author': record.author,
+        'created_at': record.created_at.isoformat() if record.created_at else None,
+        'labels': list(record.labels)
+    }
+
+
+def iter_snapshot(path: str) -> Iterator[Dict]:
+    """Read issues from a JSON array, {"issues": [...]} or JSON lines file"""
+    with open(path, 'r') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield _normalise_snapshot_issue(json.loads(line))
+            return
+        data = json.load(f)
+    for issue in data['issues'] if isinstance(data, dict) else data:
+        yield _normalise_snapshot_issue(issue)
+
+
+def _normalise_snapshot_issue(issue: Dict) -> Dict:
+    labels = issue.get('labels', [])
+    return {
+        'id': issue.get('id', issue.get('number')),
+        'title': issue.get('title', ''),
+        'body': issue.get('body') or '',
+        'author': issue.get('author', ''),
+        'created_at': issue.get('created_at'),
+        'labels': [l['name'] if isinstance(l, dict) else l for l in labels]
+    }
+
+
+class Backfill:
+    def __init__(self, workers: int = 4, apply: bool = False, checkpoint_path: str = '.backfill_checkpoint.json',
+                 output_path: str = 'backfill_results.jsonl'):
+        self.classifier = build_classifier()
+        self.workers = workers
+        self.apply = apply
+        self.checkpoint = BackfillCheckpoint(checkpoint_path)
+        self.output_path = output_path
+        self.executor = ActionPlanExecutor()
+        self.repo = None
+        if apply:
+            self.repo = Github(os.getenv('GITHUB_TOKEN')).get_repo('naman-msft/AKS')
+
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def classify(self, issue_data: Dict) -> Dict:
+        """Classify one issue, backing off on rate limits; runs on a worker thread"""
+        backoff = 30
+        while True:
+            try:
+                started = time.monotonic()
+                if self.apply and not self.classifier.should_ai_classify(issue_data['labels']):
+                    return {'id': issue_data['id'], 'skipped': 'human-labeled'}
+
+                result = self.classifier.classify_issue_enhanced(issue_data)
+                outcome = {
+                    'id': issue_data['id'],
+                    'classification': result.classification,
+                    'confidence': result.confidence,
+                    'suggested_labels': result.suggested_labels,
+                    'existing_labels': issue_data['labels'],
+                    'latency_ms': round((time.monotonic() - started) * 1000)
+                }
+                if self.apply:
+                    issue = self.repo.get_issue(issue_data['id'])
+                    plan = build_triage_plan(issue, result)
+                    outcome['api_calls'] = self.executor.execute(issue, plan)
+                return outcome
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                print(f"⏳ Rate limited on #{issue_data['id']}, backing off {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+    def progress(self, total: Optional[int]) -> str:
+        elapsed_min = max((time.monotonic() - self.started) / 60, 1e-6)
+        rate = self.done / elapsed_min
+        line = f"{len(self.checkpoint.processed)} done, {rate:.1f} issues/min"
+        if total:
+            remaining = max(total - len(self.checkpoint.processed), 0)
+            eta = f"{remaining / rate:.0f} min" if rate else "unknown"
+            line += f", {remaining} left, ETA {eta}"
+        return line
+
+    def run(self, issues: Iterator[Dict], total_fn=lambda: None):
+        pending = {}
+        with open(self.output_path, 'a') as output, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def drain(block_until_below: int):
+                nonlocal pending
+                while len(pending) >= block_until_below and pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        number = pending.pop(future)
+                        try:
+                            output.write(json.dumps(future.result()) + '\n')
+                            self.done += 1
+                        except Exception as e:
+                            self.failed += 1
+                            print(f"❌ #{number} failed: {e}")
+                            continue
+                        self.checkpoint.processed.add(number)
+                        if len(self.checkpoint.processed) % CHECKPOINT_EVERY == 0:
+                            output.flush()
+                            self.checkpoint.save()
+                            print(f"📈 {self.progress(total_fn())}")
+
+            try:
+                for issue_data in issues:
+                    if issue_data['id'] in self.checkpoint.processed:
+                        continue
+                    # Keep a bounded number of issues in flight so memory stays flat
+                    drain(self.workers * 2)
+                    pending[pool.submit(self.classify, issue_data)] = issue_data['id']
+                drain(1)
+            except KeyboardInterrupt:
+                print("🛑 Interrupted, saving checkpoint...")
+                for future in pending:
+                    future.cancel()
+                raise
+            finally:
+                output.flush()
+                self.checkpoint.save()
+
+        print(f"✓ Backfill finished: {self.progress(total_fn())}, {self.failed} failed")
+        if self.apply:
+            print(f"📊 GitHub write calls: {self.executor.api_calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify historical issues in bulk")
+    parser.add_argument('--source', choices=['github', 'snapshot'], default='github')
+    parser.add_argument('--snapshot', help='Local issue snapshot (.json or .jsonl)')
+    parser.add_argument('--state', choices=['open', 'closed', 'all'], default='all')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--apply', action='store_true', help='Write labels and comments back to GitHub')
+    parser.add_argument('--checkpoint', default='.backfill_checkpoint.json')
+    parser.add_argument('--output', default='backfill_results.jsonl')
+    args = parser.parse_args()
+
+    if args.source == 'snapshot' and not args.snapshot:
+        parser.error("--snapshot is required with --source snapshot")
+    if args.apply and args.source != 'github':
+        parser.error("--apply is only supported with --source github")
+
+    backfill = Backfill(workers=args.workers, apply=args.apply,
+                        checkpoint_path=args.checkpoint, output_path=args.output)
+    print(f"🚚 Backfill in {'APPLY' if args.apply else 'DRY-RUN'} mode with {args.workers} workers")
+
+    if args.source == 'github':
+        fetcher = GraphQLBulkFetcher('naman-msft/AKS')
+        issues = (record_to_issue_data(r) for r in fetcher.iter_issues(state=args.state))
+        backfill.run(issues, total_fn=lambda: fetcher.total_count)
+        print(f"📡 {fetcher.stats()}")
+    else:
+        total = sum(1 for _ in iter_snapshot(args.snapshot))
+        backfill.run(iter_snapshot(args.snapshot), total_fn=lambda: total)
+
+
+if __name__ == "__main__":
+    main()
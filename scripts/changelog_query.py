@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Search CHANGELOG.md the way triage does.
+
+Prints the best-matching release-note entries for some issue text and whether
+it would take the known-fix fast path, with index build and lookup times.
+
+Usage:
+    python scripts/changelog_query.py "Calico pods stuck terminating after upgrade"
+    python scripts/changelog_query.py "Teleport pulls failing" --section Announcements
+    python scripts/changelog_query.py --version 1.31.9
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.changelog_index import SECTION_ALIASES, ChangelogIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the AKS changelog by issue text or version")
+    parser.add_argument('text', nargs='?', help='Issue title and/or body')
+    parser.add_argument('--section', action='append', choices=sorted(set(SECTION_ALIASES.values())),
+                        help='Only search these sections (repeatable)')
+    parser.add_argument('--version', help='Entries naming this version instead of a text search')
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--changelog', default='CHANGELOG.md')
+    args = parser.parse_args()
+
+    index = ChangelogIndex(args.changelog).load()
+    print(f"🗂️  Indexed {len(index.entries)} entries from {len(index.releases)} releases "
+          f"in {index.timings['build_ms']} ms", file=sys.stderr)
+
+    started = time.perf_counter()
+    if args.version:
+        for entry in index.mentions(args.version, tuple(args.section) if args.section else None)[:args.limit]:
+            print(f"{entry.release:<11} {entry.section:<20} {entry.text[:120]}")
+    elif args.text:
+        for score, position, words in index.search(args.text, tuple(args.section) if args.section else None,
+                                                   args.limit):
+            entry = index.entries[position]
+            print(f"{score:.3f}  {entry.release:<11} {entry.section:<20} {entry.text[:100]}")
+            print(f"       matched: {', '.join(words[:8])}")
+        known_fix = index.known_fix(args.text)
+        if known_fix and known_fix.kind == 'fix':
+            print(f"\n✅ Fast path: fix from {known_fix.entry.release} ({known_fix.entry.anchor})")
+        elif known_fix:
+            print(f"\n📢 Suggested alongside classification: {known_fix.kind} from {known_fix.entry.release} "
+                  f"({known_fix.entry.anchor})")
+        else:
+            print("\n➡️  No known fix; triage would classify with the model")
+    else:
+        parser.error("TEXT or --version is required")
+    print(f"⚡ {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
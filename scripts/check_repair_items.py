@@ -1,52 +1,84 @@
 import os
+import sys
+import argparse
 from github import Github
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_journal import ActionJournal
+from src.action_plan import ActionPlanExecutor, IssueActionPlan
+from src.event_log import EVENT_RULE, EventLog
+from src.lifecycle import add_repair_item_reminder, reminder_cycle
+from src.repair_items import RepairItemIndex
 
 load_dotenv()
 
 class RepairItemChecker:
-    def __init__(self):
-        self.github = Github(os.getenv('GITHUB_TOKEN'))
+    def __init__(self, index_path='.repair_item_index.json', journal_path='.lifecycle_journal.jsonl',
+                 dry_run=False, events_dir='.triage_events'):
+        self.github = Github(os.getenv('GITHUB_TOKEN'), per_page=100)
         self.repo = self.github.get_repo('naman-msft/AKS')
-        
-    def check_missing_repair_items(self):
-        """Check bugs that need repair items"""
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        
-        # Get all bug issues
-        bug_issues = self.repo.get_issues(labels=['bug'], state='open')
-        
-        for issue in bug_issues:
-            if issue.created_at < seven_days_ago:
-                # Check if repair item exists (look for specific comment pattern)
-                has_repair_item = False
-                for comment in issue.get_comments():
-                    if "Repair Item:" in comment.body or "ADO Link:" in comment.body:
-                        has_repair_item = True
-                        break
-                
-                if not has_repair_item:
-                    print(f"Issue #{issue.number} needs repair item")
-                    self.create_repair_item_reminder(issue)
-    
-    def create_repair_item_reminder(self, issue):
-        """Post reminder to create repair item"""
-        assignees = ' '.join([f"@{a.login}" for a in issue.assignees])
-        
-        issue.create_comment(
-            f"{assignees} This bug issue has been open for 7+ days without a repair item. "
-            f"Please create a repair item in Azure DevOps and link it here.\n\n"
-            f"To link a repair item, comment with:\n"
-            f"```\n"
-            f"Repair Item: [ADO-12345](https://dev.azure.com/...)\n"
-            f"```"
-        )
-        issue.add_to_labels('needs-repair-item')
+        self.index = RepairItemIndex(index_path)
+        self.journal = ActionJournal(journal_path) if journal_path else None
+        self.events = EventLog(events_dir) if events_dir else None
+        self.executor = ActionPlanExecutor(dry_run=dry_run, journal=self.journal, events=self.events)
+
+    def check_missing_repair_items(self, days=7):
+        """Check bugs that need repair items, reading only comments added since the last run"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        open_bugs = set()
+        scanned = 0
+        plans = []
+
+        # The issue list carries labels and updated_at, so most bugs are settled without reading comments
+        for issue in self.repo.get_issues(state='open', labels=['bug']):
+            if issue.pull_request:
+                continue
+            open_bugs.add(issue.number)
+            if issue.created_at >= cutoff:
+                continue
+            reminded = any(label.name.lower() == 'needs-repair-item' for label in issue.labels)
+            # Already reminded: only again once the issue has been quiet for another `days`
+            repeat = reminder_cycle(reminded, issue.updated_at, cutoff)
+            if repeat is None:
+                continue
+
+            if self.index.needs_scan(issue.number, issue.updated_at):
+                self.index.scan(issue)
+                scanned += 1
+            if self.index.get(issue.number).links:
+                continue
+
+            print(f"Issue #{issue.number} needs repair item")
+            plan = IssueActionPlan.for_issue(issue)
+            add_repair_item_reminder(plan, [a.login for a in issue.assignees], days, repeat)
+            plan.record(EVENT_RULE, rule='repair-items')
+            plans.append((issue, plan))
+
+        self.index.prune(open_bugs)
+        self.index.save()
+
+        self.executor.execute_all(plans)
+        if self.journal is not None:
+            self.journal.compact()
+        print(f"🔗 {len(open_bugs)} open bugs, {scanned} with new activity, "
+              f"{self.index.comments_read} comments read, {len(plans)} reminders")
+        print(f"📊 {self.executor.summary()}")
+        return plans
 
 def main():
-    checker = RepairItemChecker()
-    checker.check_missing_repair_items()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--index', default='.repair_item_index.json')
+    parser.add_argument('--journal', default='.lifecycle_journal.jsonl', help="Action journal path ('' to disable)")
+    parser.add_argument('--events', default='.triage_events', help="Event log directory ('' to disable)")
+    parser.add_argument('--dry-run', action='store_true', help='Print the planned changes without writing')
+    args = parser.parse_args()
+
+    checker = RepairItemChecker(index_path=args.index, journal_path=args.journal, dry_run=args.dry_run,
+                                events_dir=args.events)
+    checker.check_missing_repair_items(args.days)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
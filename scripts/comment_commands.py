@@ -1,15 +1,83 @@
 import os
 import re
+import sys
+import json
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
 from github import Github
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_plan import ActionPlanExecutor, IssueActionPlan, is_rate_limit_error
+from src.event_log import EVENT_ASSIGNED, EVENT_COMMAND, EVENT_OVERRIDE, EventLog
+from src.issue_facts import classification_for_labels
+
 load_dotenv()
 
+AUTHORIZED_USERS = ['aritraghosh', 'julia-yin', 'AllenWen-at-Azure', 'github-actions[bot]']
+COLLABORATOR_ASSOCIATIONS = {'OWNER', 'MEMBER', 'COLLABORATOR'}
+
+
+@dataclass
+class CommentEvent:
+    """A comment to process; body, login and association skip the comment fetch when known"""
+    issue_number: int
+    comment_id: int
+    body: Optional[str] = None
+    login: Optional[str] = None
+    association: Optional[str] = None
+
+
+class PermissionCache:
+    """Collaborator lookups per user, remembered for `ttl` seconds"""
+
+    def __init__(self, repo, ttl: int = 600):
+        self.repo = repo
+        self.ttl = ttl
+        self._owner = None
+        self._lookups: Dict[str, Tuple[bool, float]] = {}
+        self._lock = Lock()
+
+    @property
+    def owner(self) -> str:
+        if self._owner is None:
+            self._owner = self.repo.owner.login
+        return self._owner
+
+    def lookup_ok(self, login: str, association: Optional[str] = None) -> bool:
+        """True unless the collaborator lookup for `login` fails"""
+        if login == self.owner or association in COLLABORATOR_ASSOCIATIONS:
+            return True
+        with self._lock:
+            cached = self._lookups.get(login)
+            if cached and time.monotonic() - cached[1] < self.ttl:
+                return cached[0]
+        try:
+            self.repo.has_in_collaborators(login)
+            ok = True
+        except Exception:
+            ok = False
+        with self._lock:
+            self._lookups[login] = (ok, time.monotonic())
+        return ok
+
+
 class CommentCommandProcessor:
-    def __init__(self):
+    def __init__(self, config_path='.github/triage-config.json', permission_ttl=600, executor=None,
+                 events=None):
         self.github = Github(os.getenv('GITHUB_TOKEN'))
         self.repo = self.github.get_repo('naman-msft/AKS')
-        
+        self.permissions = PermissionCache(self.repo, ttl=permission_ttl)
+        self.events = events if events is not None else EventLog()
+        self.executor = executor or ActionPlanExecutor(events=self.events)
+
+        self.config = {}
+        if os.path.exists(config_path):
+            with open(config_path, 'r') as f:
+                self.config = json.load(f)
+
         self.commands = {
             '/override-classification': self.override_classification,
             '/assign': self.assign_user,
@@ -19,136 +87,172 @@ class CommentCommandProcessor:
             '/request-info': self.request_info,
             '/add-label': self.add_label
         }
-    
+        # One pass per comment: commands are prefixes of a line, longest first so none shadows another
+        names = sorted(self.commands, key=len, reverse=True)
+        self.command_pattern = re.compile(
+            r'^[ \t]*(' + '|'.join(re.escape(name) for name in names) + r')(.*)$', re.MULTILINE)
+
+    def parse_commands(self, body: str) -> List[Tuple[str, str]]:
+        """(command, args) for every command line in a comment, in order"""
+        return [(cmd, args.strip()) for cmd, args in self.command_pattern.findall(body or '')]
+
+    def is_authorized(self, login: str, association: Optional[str] = None) -> bool:
+        # Only process comments from authorized users (check if user is repo owner or has write access)
+        if login not in AUTHORIZED_USERS:
+            print(f"Unauthorized user: {login}")
+            return False
+        if not self.permissions.lookup_ok(login, association):
+            print(f"Unauthorized user: {login}")
+            return False
+        return True
+
     def process_comment(self, issue_number: int, comment_id: int):
         """Process commands in a comment"""
-        issue = self.repo.get_issue(issue_number)
-        comment = issue.get_comment(comment_id)
-        
-        # # Only process comments from authorized users (maintainers)
-        # if comment.author_association not in ['OWNER', 'MEMBER', 'COLLABORATOR']:
-        #     print(f"User {comment.user.login} not authorized to use commands")
-        #     return
+        self.process_events([CommentEvent(issue_number, comment_id)])
 
-        # Only process comments from authorized users (check if user is repo owner or has write access)
-        if comment.user.login != self.repo.owner.login:
-            # Check if user has write access
-            try:
-                self.repo.has_in_collaborators(comment.user.login)
-            except:
-                print(f"Unauthorized user: {comment.user.login}")
-                return
-
-        # Or simpler - for testing, just check if it's you:
-        if comment.user.login not in ['aritraghosh', 'julia-yin', 'AllenWen-at-Azure', 'github-actions[bot]']:
-            print(f"Unauthorized user: {comment.user.login}")
-            return
-        
-        for line in comment.body.split('\n'):
-            line = line.strip()
-            for cmd, handler in self.commands.items():
-                if line.startswith(cmd):
-                    args = line[len(cmd):].strip()
-                    handler(issue, args)
-    
-    def override_classification(self, issue, classification):
+    def process_events(self, events: Iterable[CommentEvent]) -> Dict:
+        """
+        Process a burst of comments: each issue is fetched once, and the effects of every
+        command on it are combined into one label/state update and one reply.
+        """
+        by_issue: Dict[int, List[CommentEvent]] = {}
+        for event in events:
+            by_issue.setdefault(event.issue_number, []).append(event)
+
+        items = []
+        for issue_number, issue_events in by_issue.items():
+            issue = None
+            plan = None
+            for event in issue_events:
+                commands = self.parse_commands(event.body) if event.body is not None else None
+                if commands == []:
+                    continue
+                if issue is None:
+                    try:
+                        issue = self.repo.get_issue(issue_number)
+                    except Exception as e:
+                        if is_rate_limit_error(e):
+                            raise
+                        # Deleted or transferred since the comment was made; the other issues still apply
+                        self.executor.failures += 1
+                        print(f"❌ Failed to fetch #{issue_number}: {e}")
+                        break
+                    plan = IssueActionPlan.for_issue(issue)
+
+                login, association = event.login, event.association
+                if event.body is None or login is None:
+                    comment = issue.get_comment(event.comment_id)
+                    commands = self.parse_commands(comment.body)
+                    login, association = comment.user.login, comment.author_association
+
+                if not commands or not self.is_authorized(login, association):
+                    continue
+                for cmd, args in commands:
+                    plan.record(EVENT_COMMAND, command=cmd, args=args, user=login)
+                    self.commands[cmd](issue, plan, args)
+
+            if plan is not None:
+                items.append((issue, plan))
+
+        return self.executor.execute_all(items)
+
+    def override_classification(self, issue, plan, classification):
         """Override AI classification"""
         valid_classifications = ['BUG', 'SUPPORT', 'FEATURE', 'INFO_NEEDED']
-        
+
         if classification.upper() in valid_classifications:
             # Remove existing classification labels
-            for label in issue.labels:
-                if label.name in ['bug', 'support', 'feature', 'info_needed']:
-                    issue.remove_from_labels(label)
-            
+            plan.remove_labels('bug', 'support', 'feature', 'info_needed')
+
             # Add new classification
             label_map = {
                 'BUG': 'bug',
-                'SUPPORT': 'SR-Support Request', 
+                'SUPPORT': 'SR-Support Request',
                 'FEATURE': 'feature-request',  # Changed from 'feature'
                 'INFO_NEEDED': 'Needs Author Feedback'  # Changed from 'Needs Author Information'
             }
-                        
-            issue.add_to_labels(label_map[classification.upper()])
-            issue.create_comment(f"✅ Classification overridden to: {classification.upper()}")
-    
-    def assign_user(self, issue, username):
+
+            plan.add_labels(label_map[classification.upper()])
+            plan.record(EVENT_OVERRIDE, previous=classification_for_labels(plan.current_labels),
+                        classification=classification.upper())
+            plan.comment(f"✅ Classification overridden to: {classification.upper()}")
+
+    def assign_user(self, issue, plan, username):
         """Assign issue to user"""
         username = username.strip('@')
+        # Applied right away rather than through the plan so the reply can report a failure
         try:
             issue.add_to_assignees(username)
-            issue.create_comment(f"✅ Assigned to @{username}")
+            self.events.emit(EVENT_ASSIGNED, issue.number, assignees=[username], causes=['/assign'])
+            plan.comment(f"✅ Assigned to @{username}")
         except Exception as e:
-            issue.create_comment(f"❌ Could not assign to @{username}: {str(e)}")
-    
-    def mark_as_cri(self, issue, severity='P0'):
+            plan.comment(f"❌ Could not assign to @{username}: {str(e)}")
+
+    def mark_as_cri(self, issue, plan, severity='P0'):
         """Mark issue as Customer Reported Incident"""
-        # Get current labels to avoid duplicates
-        current_labels = {label.name for label in issue.labels}
-        
-        # Add labels one by one if they don't exist
-        labels_to_add = ['CRI', severity, 'needs-immediate-attention']
-        for label in labels_to_add:
-            if label not in current_labels:
-                issue.add_to_labels(label)
-                print(f"Added label: {label}")
-            else:
-                print(f"Label already exists: {label}")
-        
-        # Add comment
-        issue.create_comment("🚨 This issue has been marked as a Customer Reported Incident (CRI) and requires immediate attention.")
-    
-    def mark_duplicate(self, issue, duplicate_number):
+        plan.add_labels('CRI', severity or 'P0', 'needs-immediate-attention')
+        plan.comment("🚨 This issue has been marked as a Customer Reported Incident (CRI) and requires immediate attention.")
+
+    def mark_duplicate(self, issue, plan, duplicate_number):
         """Mark as duplicate of another issue"""
         try:
             duplicate_issue = self.repo.get_issue(int(duplicate_number))
-            issue.add_to_labels('duplicate')
-            issue.create_comment(
+            plan.add_labels('duplicate')
+            plan.comment(
                 f"This issue has been marked as a duplicate of #{duplicate_number}\n"
                 f"Original issue: {duplicate_issue.title}"
             )
-            issue.edit(state='closed')
-        except:
-            issue.create_comment(f"❌ Could not find issue #{duplicate_number}")
-    
-    def create_repair_item(self, issue, args):
+            plan.close()
+        except Exception:
+            plan.comment(f"❌ Could not find issue #{duplicate_number}")
+
+    def create_repair_item(self, issue, plan, args):
         """Remind to create repair item"""
-        issue.create_comment(
+        plan.comment(
             "📋 Please create a repair item in Azure DevOps using this template:\n"
             "https://aka.ms/aks/github-repair-item\n\n"
             "Once created, link it here with:\n"
             "```\nRepair Item: [ADO-12345](https://dev.azure.com/...)\n```"
         )
-        issue.add_to_labels('needs-repair-item')
+        plan.add_labels('needs-repair-item')
 
-    def request_info(self, issue, info_type):
+    def request_info(self, issue, plan, info_type):
         """Request specific information"""
         templates = {
             'logs': "Please provide the pod logs using:\n```\nkubectl logs -n <namespace> <pod-name>\n```",
             'version': "Please provide your AKS version:\n```\naz aks show -g <resource-group> -n <cluster-name> --query kubernetesVersion\n```",
             'yaml': "Please share your deployment YAML files (remove any sensitive data)"
         }
-        
-        response = templates.get(info_type, self.config['templates']['need_more_info'])
-        issue.create_comment(response)
-        issue.add_to_labels('Needs Author Feedback')
 
-    def add_label(self, issue, label_name):
+        response = templates.get(info_type) or self.config.get('templates', {}).get(
+            'need_more_info', "Please provide more information about this issue.")
+        plan.comment(response)
+        plan.add_labels('Needs Author Feedback')
+
+    def add_label(self, issue, plan, label_name):
         """Add a label to the issue"""
         if label_name:
-            issue.add_to_labels(label_name)
+            plan.add_labels(label_name)
             print(f"Added label: {label_name}")
-            issue.create_comment(f"✅ Added label: `{label_name}`")
+            plan.comment(f"✅ Added label: `{label_name}`")
 
 def main():
     # This would be called by a GitHub Action when comments are posted
-    import sys
+    if len(sys.argv) == 3 and sys.argv[1] == '--batch':
+        # JSON list of {"issue_number": ..., "comment_id": ...}, e.g. replaying a burst of deliveries
+        with open(sys.argv[2], 'r') as f:
+            events = [CommentEvent(**event) for event in json.load(f)]
+        processor = CommentCommandProcessor()
+        print(f"📊 {processor.process_events(events)}")
+        return
+
     if len(sys.argv) != 3:
         print("Usage: comment_commands.py <issue_number> <comment_id>")
+        print("       comment_commands.py --batch <events.json>")
         return
-    
+
     processor = CommentCommandProcessor()
     processor.process_comment(int(sys.argv[1]), int(sys.argv[2]))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Show the duplicate-detection shortlist triage would build for an issue.
+
+Runs the targeted GitHub searches for the issue, prints the queries, the
+candidates and the similar issues found among them, with the API calls and
+time spent. --compare also lists every open issue the old way and reports
+whether both approaches find the same similar issues.
+
+Usage:
+    python scripts/duplicate_candidates.py 4821
+    python scripts/duplicate_candidates.py 4821 --compare
+"""
+import os
+import sys
+import time
+import argparse
+from github import Github
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.duplicate_search import DuplicateCandidateSearch, build_search_queries
+from triage_enhanced import build_classifier, load_existing_issues
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search-based duplicate candidates for one issue")
+    parser.add_argument('issue', type=int, help='Issue number')
+    parser.add_argument('--repo', default='naman-msft/AKS')
+    parser.add_argument('--per-query', type=int, default=10, help='Results kept from each search')
+    parser.add_argument('--compare', action='store_true', help='Also list every open issue and compare')
+    args = parser.parse_args()
+
+    g = Github(os.getenv('GITHUB_TOKEN'))
+    repo = g.get_repo(args.repo)
+    issue = repo.get_issue(args.issue)
+    issue_data = {'id': issue.number, 'title': issue.title, 'body': issue.body or ''}
+    classifier = build_classifier()
+
+    search = DuplicateCandidateSearch(g, repo, per_query=args.per_query)
+    for query in build_search_queries(issue_data, repo.full_name)[:search.max_queries]:
+        print(f"🔎 {query}")
+    candidates = search.candidates(issue_data)
+    similar = classifier.find_similar_issues(issue_data, candidates)
+    print(f"\n{len(candidates)} candidates from {search.stats['search_calls']} search calls "
+          f"in {search.stats['elapsed_ms']:.0f} ms")
+    for match in similar:
+        print(f"  #{match['issue_number']:<6} {match['similarity_score']:.2f}  {match['title'][:90]}")
+
+    if args.compare:
+        remaining = g.rate_limiting[0]
+        started = time.perf_counter()
+        existing = load_existing_issues(repo, issue.number)
+        listing_ms = (time.perf_counter() - started) * 1000
+        listing_calls = remaining - g.rate_limiting[0]
+        full = classifier.find_similar_issues(issue_data, existing)
+        print(f"\nListing: {len(existing)} open issues from {listing_calls} calls in {listing_ms:.0f} ms")
+        for match in full:
+            print(f"  #{match['issue_number']:<6} {match['similarity_score']:.2f}  {match['title'][:90]}")
+        missed = {m['issue_number'] for m in full} - {m['issue_number'] for m in similar}
+        print(f"\n{'✅ Same similar issues' if not missed else f'⚠️  Search missed {sorted(missed)}'}; "
+              f"{listing_calls - search.stats['search_calls']} fewer calls, "
+              f"{listing_ms - search.stats['elapsed_ms']:.0f} ms faster")
+
+
+if __name__ == "__main__":
+    main()
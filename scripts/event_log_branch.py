@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Keep the triage event log on a data branch of the repository.
+
+Runs write their events to segments named after the run (see
+EventLog.writer) and `push` adds just those files to the branch as one new
+commit. Concurrent runs never touch the same file, so a rejected push is
+retried on top of the new branch tip. `pull` extracts every segment on the
+branch into the event log directory for the analytics report.
+
+That is one file per run, so the weekly analytics job also runs `compact`,
+which replaces the segments of each finished week with one merged segment
+(EventLog.compact) in a single commit. A run that pushes at the same time
+only adds files, so whichever push loses is rebuilt on the other's tip.
+
+Usage:
+    python scripts/event_log_branch.py pull
+    TRIAGE_EVENTS_WRITER=1234-1 python scripts/event_log_branch.py push
+    python scripts/event_log_branch.py compact
+"""
+import io
+import os
+import sys
+import tarfile
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.event_log import SEGMENT_PATTERN, EventLog
+
+BRANCH = 'triage-events'
+
+
+def git(*args, stdin=None, check=True) -> subprocess.CompletedProcess:
+    return subprocess.run(['git', *args], input=stdin, capture_output=True, check=check)
+
+
+def fetch_tip(remote: str, branch: str):
+    """Commit the branch points at, or None before the first push"""
+    if git('fetch', '--quiet', '--depth=1', remote, branch, check=False).returncode != 0:
+        return None
+    return git('rev-parse', 'FETCH_HEAD').stdout.decode().strip()
+
+
+def extract(tip: str, directory: str) -> int:
+    os.makedirs(directory, exist_ok=True)
+    archive = tarfile.open(fileobj=io.BytesIO(git('archive', '--format=tar', tip).stdout))
+    members = [m for m in archive.getmembers() if m.isfile() and SEGMENT_PATTERN.fullmatch(m.name)]
+    archive.extractall(directory, members=members)
+    return len(members)
+
+
+def tree_entries(tip) -> dict:
+    entries = {}
+    if tip:
+        for line in git('ls-tree', tip).stdout.decode().splitlines():
+            meta, name = line.split('\t', 1)
+            entries[name] = meta
+    return entries
+
+
+def commit_and_push(tip, entries: dict, message: str, remote: str, branch: str) -> bool:
+    tree = git('mktree', stdin=''.join(f"{meta}\t{name}\n" for name, meta in sorted(entries.items())).encode())
+    parents = ['-p', tip] if tip else []
+    commit = git('commit-tree', tree.stdout.decode().strip(), *parents, '-m', message).stdout.decode().strip()
+    return git('push', '--quiet', remote, f"{commit}:refs/heads/{branch}", check=False).returncode == 0
+
+
+def blob(path: str) -> str:
+    return f"100644 blob {git('hash-object', '-w', path).stdout.decode().strip()}"
+
+
+def pull(directory: str, remote: str, branch: str) -> int:
+    tip = fetch_tip(remote, branch)
+    if tip is None:
+        print(f"No {branch} branch yet, starting with an empty event log")
+        return 0
+    count = extract(tip, directory)
+    print(f"Restored {count} event log segments from {branch}")
+    return count
+
+
+def push(directory: str, remote: str, branch: str, attempts: int = 5) -> int:
+    log = EventLog(directory)
+    if not log.writer:
+        raise SystemExit("Set TRIAGE_EVENTS_WRITER to the name the run wrote its segments under")
+    own = log.own_segments()
+    if not own:
+        print("No events written by this run")
+        return 0
+    blobs = {os.path.basename(path): blob(path) for path in own}
+
+    for attempt in range(1, attempts + 1):
+        tip = fetch_tip(remote, branch)
+        entries = tree_entries(tip)
+        entries.update(blobs)
+        if commit_and_push(tip, entries, f"Event log segments from {log.writer}", remote, branch):
+            print(f"Pushed {len(blobs)} event log segments to {branch}")
+            return len(blobs)
+        # Another run pushed first; its files are disjoint from ours, so rebuild on its tip
+        print(f"Push to {branch} rejected (attempt {attempt}), retrying")
+    raise SystemExit(f"Could not push the event log to {branch} after {attempts} attempts")
+
+
+def compact(remote: str, branch: str, attempts: int = 5) -> int:
+    """Merge the segments of every finished week on the branch, one commit for all of them"""
+    now = datetime.now(timezone.utc)
+    this_week = datetime.combine((now - timedelta(days=now.weekday())).date(), datetime.min.time(), timezone.utc)
+    for attempt in range(1, attempts + 1):
+        tip = fetch_tip(remote, branch)
+        if tip is None:
+            print(f"No {branch} branch yet, nothing to compact")
+            return 0
+        with tempfile.TemporaryDirectory() as directory:
+            extract(tip, directory)
+            merged = EventLog(directory).compact(before=this_week)
+            if not merged:
+                print(f"Every finished week on {branch} is already one segment")
+                return 0
+            entries = tree_entries(tip)
+            for target, paths in merged.items():
+                for path in paths:
+                    entries.pop(os.path.basename(path), None)
+                entries[os.path.basename(target)] = blob(target)
+        replaced = sum(len(paths) for paths in merged.values())
+        if commit_and_push(tip, entries, f"Compact {replaced} event log segments into {len(merged)} weeks",
+                           remote, branch):
+            print(f"Compacted {replaced} segments on {branch} into {len(merged)} weekly segments")
+            return replaced
+        # A run added segments meanwhile; compact again on top of them
+        print(f"Push to {branch} rejected (attempt {attempt}), retrying")
+    raise SystemExit(f"Could not push the compacted event log to {branch} after {attempts} attempts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the triage event log with its data branch")
+    parser.add_argument('action', choices=['pull', 'push', 'compact'])
+    parser.add_argument('--events', default='.triage_events', help='Event log directory')
+    parser.add_argument('--remote', default='origin')
+    parser.add_argument('--branch', default=BRANCH)
+    args = parser.parse_args()
+
+    if args.action == 'pull':
+        pull(args.events, args.remote, args.branch)
+    elif args.action == 'compact':
+        compact(args.remote, args.branch)
+    else:
+        push(args.events, args.remote, args.branch)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,103 @@
 import os
 import sys
 import argparse
-from datetime import datetime, timedelta
+from dataclasses import replace
 from github import Github
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_journal import DEFAULT_REPEAT_AFTER_DAYS, ActionJournal
+from src.action_plan import ActionPlanExecutor
+from src.event_log import EventLog
+from src.github_graphql import GraphQLBulkFetcher
+from src.lifecycle import DEFAULT_RULES, RULES_BY_NAME, LifecycleSweep
+from src.policy_engine import PolicyEngine
+
 load_dotenv()
 
 class LifecycleManager:
-    def __init__(self):
-        self.github = Github(os.getenv('GITHUB_TOKEN'))
+    def __init__(self, dry_run=False, journal_path='.lifecycle_journal.jsonl', repeat_after_days=DEFAULT_REPEAT_AFTER_DAYS,
+                 events_dir='.triage_events'):
+        # Lazy objects let plans be applied without re-reading each issue first
+        self.github = Github(os.getenv('GITHUB_TOKEN'), lazy=True)
         self.repo = self.github.get_repo('naman-msft/AKS')
-    
+        self.fetcher = GraphQLBulkFetcher('naman-msft/AKS')
+        self.journal = ActionJournal(journal_path, repeat_after_days) if journal_path else None
+        self.events = EventLog(events_dir) if events_dir else None
+        self.executor = ActionPlanExecutor(dry_run=dry_run, journal=self.journal, events=self.events)
+
+    def apply(self, plans):
+        """Apply plans through the journal so repeated comments are skipped and a stopped run can resume"""
+        self.executor.execute_all([(self.repo.get_issue(plan.issue_number), plan) for plan in plans])
+        if self.journal is not None:
+            self.journal.compact()
+        print(f"📊 {self.executor.summary()}")
+
+    def sweep(self, rules=None):
+        """Fetch the open issues once and apply every rule's actions as one combined plan per issue"""
+        lifecycle = LifecycleSweep(rules)
+        plans = lifecycle.run(self.fetcher.iter_issues(state='open', labels=lifecycle.labels))
+
+        print(f"♻️  {lifecycle.summary()}")
+        self.apply(plans)
+        return plans
+
+    def run_policies(self, policy_dir='.github/policies'):
+        """Evaluate the scheduledSearches from the policy files against one snapshot of open issues"""
+        engine = PolicyEngine(policy_dir)
+        for reason in engine.skipped:
+            print(f"⚠️  Skipped search: {reason}")
+
+        snapshot = engine.snapshot(self.fetcher.iter_issues(state='open'))
+        plans, stats = engine.plan(snapshot)
+        for description, count in stats['matches']:
+            if count:
+                print(f"🔎 {count:>4}  {description}")
+        print(f"⚡ {stats['searches']} searches over {stats['issues']} issues in {stats['evaluate_ms']} ms")
+
+        self.apply(plans)
+        return plans
+
     def check_needs_attention(self, days=5):
         """Check issues that need attention after X days"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-
-        # Check "Needs Author Feedback" labels
-        needs_info_issues = self.repo.get_issues(labels=['Needs Author Feedback'], state='open')
-        
-        for issue in needs_info_issues:
-            last_comment = None
-            for comment in issue.get_comments().reversed:
-                if comment.user.login == issue.user.login:
-                    last_comment = comment
-                    break
-            
-            if not last_comment or last_comment.created_at < cutoff_date:
-                print(f"Issue #{issue.number} needs attention - no author response for {days} days")
-                issue.add_to_labels('stale')
-                issue.create_comment(
-                    f"This issue has been marked as stale because we haven't heard from you in {days} days. "
-                    f"Please provide the requested information or this issue will be closed in 7 days."
-                )
-    
+        return self.sweep([replace(RULES_BY_NAME['needs-attention'], days=days)])
+
     def check_investigation_status(self, days=14):
         """Check issues under investigation for too long"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        investigation_issues = self.repo.get_issues(labels=['Under Investigation'], state='open')
-        
-        for issue in investigation_issues:
-            if issue.created_at < cutoff_date:
-                print(f"Issue #{issue.number} has been under investigation for {days}+ days")
-                issue.add_to_labels('Needs Attention :wave:', 'investigation-overdue')
-                
-                # Find assignees and mention them
-                assignees = issue.assignees
-                mentions = ' '.join([f"@{a.login}" for a in assignees])
-                
-                issue.create_comment(
-                    f"{mentions} This issue has been under investigation for {days} days. "
-                    f"Please provide an update on the investigation status."
-                )
-    
+        return self.sweep([replace(RULES_BY_NAME['escalate'], days=days)])
+
     def close_stale_issues(self, days=7):
         """Close issues that have been stale for X days"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        stale_issues = self.repo.get_issues(labels=['stale'], state='open')
-        
-        for issue in stale_issues:
-            # Check when 'stale' label was added
-            stale_event = None
-            for event in issue.get_events():
-                if event.event == 'labeled' and event.label.name == 'stale':
-                    stale_event = event
-                    break
-            
-            if stale_event and stale_event.created_at < cutoff_date:
-                print(f"Closing stale issue #{issue.number}")
-                issue.create_comment(
-                    "This issue has been automatically closed due to inactivity. "
-                    "If you still need assistance, please open a new issue with updated information."
-                )
-                issue.edit(state='closed')
-                issue.add_to_labels('auto-closed')
+        return self.sweep([replace(RULES_BY_NAME['close-stale'], days=days)])
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--days', type=int, required=True)
-    parser.add_argument('--action', choices=['needs-attention', 'escalate', 'close-stale'])
+    parser.add_argument('--days', type=int, help='Override the threshold of a single --action')
+    parser.add_argument('--action', choices=['sweep', 'policies', 'needs-attention', 'escalate', 'close-stale'],
+                        default='sweep')
+    parser.add_argument('--policies', default='.github/policies', help='Policy directory for --action policies')
+    parser.add_argument('--dry-run', action='store_true', help='Print the planned changes without writing')
+    parser.add_argument('--journal', default='.lifecycle_journal.jsonl', help="Action journal path ('' to disable)")
+    parser.add_argument('--events', default='.triage_events', help="Event log directory ('' to disable)")
+    parser.add_argument('--repeat-after-days', type=float, default=DEFAULT_REPEAT_AFTER_DAYS,
+                        help='Allow an identical comment again after this long')
     args = parser.parse_args()
-    
-    manager = LifecycleManager()
-    
-    if args.action == 'needs-attention':
-        manager.check_needs_attention(args.days)
+
+    manager = LifecycleManager(dry_run=args.dry_run, journal_path=args.journal,
+                               repeat_after_days=args.repeat_after_days, events_dir=args.events)
+
+    if args.action == 'sweep':
+        manager.sweep(DEFAULT_RULES)
+    elif args.action == 'policies':
+        manager.run_policies(args.policies)
+    elif args.action == 'needs-attention':
+        manager.check_needs_attention(args.days or 5)
     elif args.action == 'escalate':
-        manager.check_investigation_status(args.days)
+        manager.check_investigation_status(args.days or 14)
     elif args.action == 'close-stale':
-        manager.close_stale_issues(args.days)
+        manager.close_stale_issues(args.days or 7)
+
+    print(f"📡 {manager.fetcher.stats()}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
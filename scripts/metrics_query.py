@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Query response and close time percentiles from the local metrics history.
+
+Usage:
+    python scripts/metrics_query.py --days 90
+    python scripts/metrics_query.py --kind close --since 2024-01-01 --by area
+    python scripts/metrics_query.py --area networking --classification BUG
+    python scripts/metrics_query.py --period quarter --kind close
+    python scripts/metrics_query.py --rolling 4 --days 180
+
+--by and the default query scan the raw durations; --period and --rolling
+merge the stored weekly sketches, so they round windows out to whole weeks.
+"""
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.metrics_history import KIND_CLOSE, KIND_FIRST_RESPONSE, MetricsHistory
+
+
+def format_row(name, result):
+    values = "  ".join(f"{key} {result[key]:>9.1f}" if result[key] is not None else f"{key} {'-':>9}"
+                       for key in result if key != 'count')
+    return f"{name:<40} n={result['count']:<6} {values}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentiles over the triage metrics history")
+    parser.add_argument('--db', default='triage_metrics.db')
+    parser.add_argument('--kind', choices=[KIND_FIRST_RESPONSE, KIND_CLOSE], default=KIND_FIRST_RESPONSE)
+    parser.add_argument('--days', type=int, help='Only the last N days')
+    parser.add_argument('--since', help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--until', help='End date (YYYY-MM-DD), exclusive')
+    parser.add_argument('--area')
+    parser.add_argument('--classification')
+    parser.add_argument('--by', choices=['area', 'classification'])
+    parser.add_argument('--period', choices=['week', 'month', 'quarter'], help='One row per period, from sketches')
+    parser.add_argument('--rolling', type=int, metavar='WEEKS', help='Rolling window percentiles, from sketches')
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.since).replace(tzinfo=timezone.utc) if args.since else None
+    end = datetime.fromisoformat(args.until).replace(tzinfo=timezone.utc) if args.until else None
+    if args.days:
+        start = datetime.now(timezone.utc) - timedelta(days=args.days)
+
+    history = MetricsHistory(args.db)
+    try:
+        print(f"⏱️  {args.kind} time in minutes")
+        if args.period:
+            results = history.period_percentiles(args.period, args.kind, start, end, args.area, args.classification)
+            for label, result in results.items():
+                print(format_row(label, result))
+        elif args.rolling:
+            results = history.rolling_percentiles(args.rolling, args.kind, start, end, args.area, args.classification)
+            for week, result in results.items():
+                print(format_row(f"{args.rolling} weeks to {week}", result))
+        elif args.by:
+            for group, result in sorted(history.breakdown(args.by, args.kind, start, end).items()):
+                print(format_row(group, result))
+        else:
+            result = history.percentiles(args.kind, start, end, args.area, args.classification)
+            print(format_row(args.area or args.classification or 'all', result))
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Record a real triage run and replay it offline for benchmarking and profiling.
+
+Recording runs the normal triage_enhanced path against live GitHub and Azure
+OpenAI (so it performs the real writes) and saves every HTTP exchange:
+    python scripts/replay_bench.py record 1234 --cassette cassettes/issue-1234.json
+
+Replay serves the cassette locally, optionally with the recorded latencies:
+    python scripts/replay_bench.py replay --cassette cassettes/issue-1234.json --runs 20 --concurrency 4
+    python scripts/replay_bench.py replay --cassette cassettes/issue-1234.json --latency --profile triage.prof
+"""
+import os
+import sys
+import time
+import argparse
+import cProfile
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, redirect_stdout
+from io import StringIO
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.replay import cassette
+
+# Environment that shapes request URLs and bodies, restored on replay so keys match
+RECORDED_ENV = ['AZURE_OPENAI_ENDPOINT', 'AZURE_OPENAI_DEPLOYMENT_NAME', 'PROJECT_ENDPOINT',
+                'MODEL_DEPLOYMENT_NAME', 'AZURE_BING_CONNECTION_ID']
+
+
+def record(issue_number: int, path: str):
+    import triage_enhanced
+    metadata = {
+        'issue_number': issue_number,
+        'env': {name: os.getenv(name) for name in RECORDED_ENV if os.getenv(name)}
+    }
+    with cassette(path, mode='record', metadata=metadata):
+        triage_enhanced.main(issue_number)
+
+
+def replay(path: str, runs: int, concurrency: int, latency: bool, latency_scale: float,
+           profile_path: str = None, quiet: bool = True):
+    from src.replay import Cassette
+    metadata = Cassette.load(path).metadata
+    for name, value in metadata.get('env', {}).items():
+        os.environ[name] = value
+    # Credentials are never sent upstream in replay, they only need to look real
+    os.environ.setdefault('GITHUB_TOKEN', 'replay-token')
+    os.environ['AZURE_OPENAI_API_KEY'] = 'replay-key'
+    os.environ['USE_MOCK_API'] = 'false'
+
+    import triage_enhanced
+    issue_number = metadata['issue_number']
+
+    def one_run(_):
+        started = time.perf_counter()
+        triage_enhanced.main(issue_number)
+        return time.perf_counter() - started
+
+    # stdout is process-wide, so silence it once around all runs rather than per thread
+    output = redirect_stdout(StringIO()) if quiet else nullcontext()
+    profiler = cProfile.Profile() if profile_path else None
+    with cassette(path, mode='replay', replay_latency=latency, latency_scale=latency_scale) as tape, output:
+        wall_started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        if concurrency <= 1:
+            durations = []
+            for i in range(runs):
+                tape.rewind()
+                durations.append(one_run(i))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                durations = list(pool.map(one_run, range(runs)))
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - wall_started
+
+    durations.sort()
+    print(f"📼 Replayed issue #{issue_number} {runs}x at concurrency {concurrency}"
+          f"{' with recorded latency' if latency else ''}")
+    print(f"   wall: {wall:.3f}s, throughput: {runs / wall:.2f} runs/s")
+    print(f"   per run: p50 {durations[len(durations) // 2] * 1000:.1f} ms, "
+          f"p95 {durations[min(len(durations) - 1, int(0.95 * len(durations)))] * 1000:.1f} ms, "
+          f"max {durations[-1] * 1000:.1f} ms")
+
+    if profiler:
+        profiler.dump_stats(profile_path)
+        print(f"   profile written to {profile_path}")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay triage runs")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help='Run live triage for an issue and save a cassette')
+    rec.add_argument('issue_number', type=int)
+    rec.add_argument('--cassette', required=True)
+
+    rep = sub.add_parser('replay', help='Benchmark triage against a recorded cassette')
+    rep.add_argument('--cassette', required=True)
+    rep.add_argument('--runs', type=int, default=10)
+    rep.add_argument('--concurrency', type=int, default=1)
+    rep.add_argument('--latency', action='store_true', help='Sleep for the recorded latency of each request')
+    rep.add_argument('--latency-scale', type=float, default=1.0)
+    rep.add_argument('--profile', help='Write cProfile stats to this path')
+    rep.add_argument('--verbose', action='store_true', help='Show triage output for every run')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.issue_number, args.cassette)
+    else:
+        replay(args.cassette, args.runs, args.concurrency, args.latency, args.latency_scale,
+               args.profile, quiet=not args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+What-if simulator for the lifecycle day thresholds.
+
+Replays a year of issue history (label events, comments, closures) against a
+grid of needs-attention, close-stale and escalate thresholds and reports how
+many issues each setting would have marked stale, auto-closed or escalated.
+
+Waits the bot's own auto-close ended (or that are still running) never show
+how long they would have lasted, so the stale and close counts are lower
+bounds; the report gives how many such waits could raise each one.
+
+Usage:
+    python scripts/simulate_thresholds.py
+    python scripts/simulate_thresholds.py --attention 3:10 --close 5:21:2 --escalate 7:28
+    python scripts/simulate_thresholds.py --cache timelines.npz   # reuse fetched history
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.github_graphql import GraphQLBulkFetcher
+from src.lifecycle import RULES_BY_NAME
+from src.threshold_simulator import IssueTimelines, simulate
+
+load_dotenv()
+
+
+def day_range(spec):
+    """'start:stop[:step]' inclusive, or a single number"""
+    parts = [float(p) for p in spec.split(':')]
+    if len(parts) == 1:
+        return np.asarray(parts)
+    start, stop = parts[:2]
+    step = parts[2] if len(parts) > 2 else 1
+    return np.arange(start, stop + step / 2, step)
+
+
+def current_thresholds(config_path='.github/triage-config.json'):
+    close_days = RULES_BY_NAME['close-stale'].days
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            close_days = json.load(f).get('auto_close_days', {}).get('stale', close_days)
+    return RULES_BY_NAME['needs-attention'].days, close_days, RULES_BY_NAME['escalate'].days
+
+
+def load_timelines(history_days, cache_path=None, refresh=False):
+    if cache_path and os.path.exists(cache_path) and not refresh:
+        print(f"📦 Loading history from {cache_path}")
+        try:
+            return IssueTimelines.load(cache_path)
+        except ValueError as e:
+            print(f"⚠️  {e}")
+
+    fetcher = GraphQLBulkFetcher('naman-msft/AKS')
+    since = datetime.now(timezone.utc) - timedelta(days=history_days)
+    started = time.monotonic()
+    timelines = IssueTimelines.from_records(fetcher.iter_issues(state='all', since=since))
+    print(f"📡 Loaded {timelines.issue_count} issues in {time.monotonic() - started:.1f}s ({fetcher.stats()})")
+    if cache_path:
+        timelines.save(cache_path)
+    return timelines
+
+
+def _unknown(count):
+    return f" (+ up to {count} cut short)" if count else ''
+
+
+def print_grid(results, timelines, current):
+    attention, close = results['attention_days'], results['close_days']
+    print("\n## Auto-closed (closed before the author replied) by attention days × close days")
+    print("attn\\close " + "".join(f"{c:>12g}" for c in close))
+    for i, a in enumerate(attention):
+        cells = "".join(f"{results['auto_closed'][i, j]:>6d} ({results['closed_then_replied'][i, j]:>3d})"
+                        for j in range(len(close)))
+        print(f"{a:>10g} {cells}")
+
+    censored = int(timelines.feedback_censored.sum())
+    if censored:
+        print("\n## Waits cut short before the close (up to this many more auto-closes)")
+        print(f"{censored} waits ended in a bot close or are still running; each lasted at least as long as "
+              "recorded, and counts above only include those that reached the threshold")
+        print("attn\\close " + "".join(f"{c:>12g}" for c in close))
+        for i, a in enumerate(attention):
+            print(f"{a:>10g} " + "".join(f"{results['close_unknown'][i, j]:>12d}" for j in range(len(close))))
+
+    print("\n## Marked stale by attention days")
+    for i, a in enumerate(attention):
+        print(f"- {a:g} days: {results['marked_stale'][i, 0]}{_unknown(results['stale_unknown'][i, 0])}")
+
+    print("\n## Escalated by investigation days")
+    for k, e in enumerate(results['escalate_days']):
+        print(f"- {e:g} days: {results['escalated'][k]}")
+
+    attention_now, close_now, escalate_now = current
+    single = simulate(timelines, [attention_now], [close_now], [escalate_now])
+    print(f"\n## Current settings (attention {attention_now}, close {close_now}, escalate {escalate_now})")
+    print(f"- Marked stale: {single['marked_stale'][0, 0]}{_unknown(single['stale_unknown'][0, 0])}")
+    print(f"- Auto-closed: {single['auto_closed'][0, 0]} ({single['closed_then_replied'][0, 0]} before the author replied)"
+          f"{_unknown(single['close_unknown'][0, 0])}")
+    print(f"- Escalated: {single['escalated'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate lifecycle thresholds against issue history")
+    parser.add_argument('--history-days', type=int, default=365)
+    parser.add_argument('--attention', default='2:14', help='needs-attention days grid (start:stop[:step])')
+    parser.add_argument('--close', default='3:21:2', help='close-stale days grid')
+    parser.add_argument('--escalate', default='7:28:7', help='escalate days grid')
+    parser.add_argument('--cache', help='Save fetched timelines here (.npz) and reuse them on later runs')
+    parser.add_argument('--refresh', action='store_true', help='Ignore --cache and fetch again')
+    args = parser.parse_args()
+
+    timelines = load_timelines(args.history_days, args.cache, args.refresh)
+    print(f"🧮 {len(timelines.feedback_wait_days)} author-feedback waits, "
+          f"{len(timelines.investigation_age_days)} investigations")
+
+    started = time.perf_counter()
+    results = simulate(timelines, day_range(args.attention), day_range(args.close), day_range(args.escalate))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    settings = results['auto_closed'].size + results['escalated'].size
+
+    print_grid(results, timelines, current_thresholds())
+    print(f"\n⚡ Evaluated {settings} threshold settings in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test that the action journal only suppresses replays, not a new lifecycle cycle"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_journal import ActionJournal
+from src.action_plan import ActionPlanExecutor
+from src.github_graphql import IssueRecord, LabelEvent
+from src.lifecycle import LifecycleSweep
+
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+class FakeIssue:
+    def __init__(self):
+        self.labels, self.assignees = [], []
+        self.comments = []
+        self.edits = []
+
+    def update(self):
+        pass
+
+    def create_comment(self, body):
+        self.comments.append(body)
+
+    def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+def stale_record(labeled_days_ago):
+    """An issue labeled stale `labeled_days_ago`, after an earlier stale cycle 60 days back"""
+    events = [
+        LabelEvent('labeled', 'stale', 'bot', NOW - timedelta(days=60)),
+        LabelEvent('unlabeled', 'stale', 'author', NOW - timedelta(days=55)),
+        LabelEvent('labeled', 'stale', 'bot', NOW - timedelta(days=labeled_days_ago)),
+    ]
+    return IssueRecord(1, 'Pods stuck', '', 'open', 'author', NOW - timedelta(days=90), NOW, None,
+                       labels=['stale'], label_events=events)
+
+
+def close_plan(record):
+    return LifecycleSweep(now=NOW).evaluate(record)
+
+
+def test_replay_is_suppressed():
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = ActionJournal(os.path.join(tmp, 'journal.jsonl'))
+        issue = FakeIssue()
+        ActionPlanExecutor(journal=journal).execute(issue, close_plan(stale_record(10)))
+        # The run is resumed: same cycle, so the close comment is not posted again
+        reopened = ActionJournal(journal.path)
+        ActionPlanExecutor(journal=reopened).execute(issue, close_plan(stale_record(10)))
+        assert len(issue.comments) == 1
+
+
+def test_new_cycle_comments_again():
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = ActionJournal(os.path.join(tmp, 'journal.jsonl'))
+        first, second = FakeIssue(), FakeIssue()
+        ActionPlanExecutor(journal=journal).execute(first, close_plan(stale_record(10)))
+        # Reopened and marked stale again: a new cycle gets its own close comment
+        ActionPlanExecutor(journal=journal).execute(second, close_plan(stale_record(8)))
+        assert len(first.comments) == 1 and len(second.comments) == 1
+
+
+def test_repeat_window_defaults_to_days():
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = ActionJournal(os.path.join(tmp, 'journal.jsonl'))
+        journal.commit(1, 'comment', 'abc')
+        assert journal.seen(1, 'comment', 'abc')
+        journal.entries[(1, 'comment', 'abc')] -= timedelta(days=30)
+        assert not journal.seen(1, 'comment', 'abc')
+        journal.compact()
+        assert len(ActionJournal(journal.path)) == 0
+
+
+if __name__ == "__main__":
+    test_replay_is_suppressed()
+    test_new_cycle_comments_again()
+    test_repeat_window_defaults_to_days()
+    print("✅ Action journal tests passed")
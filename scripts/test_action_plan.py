@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test that applying an action plan is one edit that keeps changes made since the plan's snapshot"""
+
+import os
+import sys
+from collections import namedtuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_plan import ActionPlanExecutor, IssueActionPlan
+
+Label = namedtuple('Label', ['name'])
+User = namedtuple('User', ['login'])
+
+
+class Rejected(Exception):
+    status = 422
+
+
+class FakeIssue:
+    """Issue whose labels and assignees a maintainer changed after the plan's snapshot was taken"""
+
+    def __init__(self, labels, assignees=(), unassignable=()):
+        self.labels = [Label(name) for name in labels]
+        self.assignees = [User(login) for login in assignees]
+        self.unassignable = set(unassignable)
+        self.state = 'open'
+        self.comments = []
+        self.edits = []
+        self.refreshes = 0
+
+    def update(self):
+        self.refreshes += 1
+
+    def create_comment(self, body):
+        self.comments.append(body)
+
+    def edit(self, **kwargs):
+        if self.unassignable & set(kwargs.get('assignees', ())):
+            raise Rejected('Validation Failed')
+        self.edits.append(kwargs)
+        self.labels = [Label(name) for name in kwargs.get('labels', [l.name for l in self.labels])]
+        self.assignees = [User(login) for login in kwargs.get('assignees', [a.login for a in self.assignees])]
+        self.state = kwargs.get('state', self.state)
+
+
+def test_one_edit_keeps_concurrent_changes():
+    plan = IssueActionPlan(1, current_labels=['needs-triage', 'stale'], current_assignees=[])
+    plan.add_labels('bug')
+    plan.remove_labels('needs-triage', 'stale')
+    plan.assign('alice')
+    plan.close()
+    # A maintainer added 'area/networking', removed 'stale' and assigned bob after the snapshot
+    issue = FakeIssue(['needs-triage', 'area/networking'], ['bob'])
+    calls = ActionPlanExecutor().execute(issue, plan)
+    assert issue.edits == [{'labels': ['area/networking', 'bug'], 'assignees': ['bob', 'alice'], 'state': 'closed'}]
+    assert issue.refreshes == 1
+    assert calls == plan.api_calls == 1
+
+
+def test_close_with_comment_skips_the_refresh():
+    plan = IssueActionPlan(1, current_labels=['stale'], current_assignees=[])
+    plan.close()
+    plan.comment('Closing')
+    issue = FakeIssue(['stale'])
+    calls = ActionPlanExecutor().execute(issue, plan)
+    assert issue.edits == [{'state': 'closed'}] and issue.comments == ['Closing']
+    assert issue.refreshes == 0 and calls == plan.api_calls == 2
+
+
+def test_rejected_assignee_still_applies_the_labels():
+    plan = IssueActionPlan(1, current_labels=[], current_assignees=[])
+    plan.add_labels('bug')
+    plan.assign('outsider')
+    issue = FakeIssue([], unassignable=['outsider'])
+    executor = ActionPlanExecutor()
+    assert executor.execute(issue, plan) == 2
+    assert issue.edits == [{'labels': ['bug']}] and plan.assignees_to_add == []
+
+
+if __name__ == "__main__":
+    test_one_edit_keeps_concurrent_changes()
+    test_close_with_comment_skips_the_refresh()
+    test_rejected_assignee_still_applies_the_labels()
+    print("✅ Action plan tests passed")
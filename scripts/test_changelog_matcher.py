@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Test CHANGELOG known-fix matching and where it sits in classification"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+from src.changelog_index import ChangelogIndex, parse_changelog
+from src.issue_classifier import IssueClassifier
+
+CHANGELOG = os.path.join(REPO_ROOT, 'CHANGELOG.md')
+GATEKEEPER_ISSUE = {
+    'id': 1,
+    'title': 'Azure Policy addon Gatekeeper crash loop',
+    'body': 'After the Gatekeeper regression our clusters on Kubernetes versions < 1.27 show the addon in a crash loop.'
+}
+
+
+def index():
+    return ChangelogIndex(CHANGELOG)
+
+
+def classifier():
+    os.environ['USE_MOCK_API'] = 'true'
+    return IssueClassifier(os.path.join(REPO_ROOT, '.github/triage-config.json'), '', 'mock-api-key', 'mock',
+                           vhd_notes_dir=os.path.join(REPO_ROOT, 'missing-vhd-notes'), changelog_path=CHANGELOG)
+
+
+def test_parse_sections_and_continuations():
+    entries = parse_changelog(
+        "## Release 2025-01-01\n\n### Bug Fixes\n\n* Fixed a crash\n  in the agent.\n\n"
+        "### Announcements\n\n* Teleport will be retired.\n"
+    )
+    assert [(e.section, e.text) for e in entries] == [
+        ('Bug Fixes', 'Fixed a crash in the agent.'),
+        ('Announcements', 'Teleport will be retired.'),
+    ]
+
+
+def test_retirement_needs_the_question():
+    # Running an old OS is not asking about its retirement
+    assert index().known_fix("Pods crash after upgrade\nOur ubuntu 18.04 nodes restart pods. Production down!") is None
+    found = index().known_fix("Ubuntu 18.04 node pool blocked\nCan't create a node pool with ubuntu 18.04, is it retired?")
+    assert found and found.kind == 'retirement' and '18.04' in found.matched_terms
+
+
+def test_retirement_keeps_the_version():
+    assert index().known_fix("Windows Server 2019 node NotReady\nThe node goes NotReady, is it deprecated?") is None
+    found = index().known_fix("Windows Server 2022 pool creation blocked\nIs Windows Server 2022 retired already?")
+    assert found and '2022' in found.matched_terms
+
+
+def test_fix_takes_the_fast_path():
+    result = classifier().classify_issue_enhanced(GATEKEEPER_ISSUE)
+    assert result.suggested_labels == ['resolution/fix-released']
+
+
+def test_escalations_skip_the_fast_path():
+    issue = dict(GATEKEEPER_ISSUE, title='URGENT: ' + GATEKEEPER_ISSUE['title'])
+    result = classifier().classify_issue_enhanced(issue)
+    assert 'CRI' in result.suggested_labels
+    assert 'resolution/fix-released' not in result.suggested_labels
+    assert result.known_fix is not None
+
+
+def test_retirement_is_only_suggested():
+    issue = {'id': 2, 'title': 'Ubuntu 18.04 node pool blocked',
+             'body': "Can't create a node pool with ubuntu 18.04, is it retired?"}
+    result = classifier().classify_issue_enhanced(issue)
+    assert result.known_fix is not None
+    assert 'resolution/answer-provided' not in result.suggested_labels
+
+
+if __name__ == "__main__":
+    test_parse_sections_and_continuations()
+    test_retirement_needs_the_question()
+    test_retirement_keeps_the_version()
+    test_fix_takes_the_fast_path()
+    test_escalations_skip_the_fast_path()
+    test_retirement_is_only_suggested()
+    print("✅ Changelog matcher tests passed")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test that event log segments of concurrent runs merge without losing events"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.event_log import EVENT_CLASSIFIED, EventLog
+
+START = datetime(2026, 10, 1, 10, tzinfo=timezone.utc)
+
+
+def test_writers_keep_their_own_segments():
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = EventLog(tmp, writer='run-1'), EventLog(tmp, writer='run-2')
+        first.emit(EVENT_CLASSIFIED, 1, at=START)
+        second.emit(EVENT_CLASSIFIED, 2, at=START + timedelta(minutes=1))
+        first.emit(EVENT_CLASSIFIED, 3, at=START + timedelta(minutes=5))
+        first.close()
+        second.close()
+        assert [os.path.basename(p) for p in first.own_segments()] == ['events-000001-run-1.jsonl']
+        assert len(EventLog(tmp).segments()) == 2
+
+
+def test_overlapping_segments_are_not_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        # run-1 started first but outlived run-2, so its segment holds the latest events
+        first, second = EventLog(tmp, writer='run-1'), EventLog(tmp, writer='run-2')
+        first.emit(EVENT_CLASSIFIED, 1, at=START)
+        second.emit(EVENT_CLASSIFIED, 2, at=START + timedelta(minutes=1))
+        first.emit(EVENT_CLASSIFIED, 3, at=START + timedelta(minutes=5))
+        first.close()
+        second.close()
+        issues = [e['issue'] for e in EventLog(tmp).iter_events(start=START + timedelta(minutes=3))]
+        assert issues == [3]
+
+
+def test_unnamed_log_keeps_numbered_segments():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp, segment_bytes=1)
+        log.emit(EVENT_CLASSIFIED, 1, at=START)
+        log.emit(EVENT_CLASSIFIED, 2, at=START + timedelta(minutes=1))
+        log.close()
+        assert [os.path.basename(p) for p in log.segments()] == ['events-000001.jsonl', 'events-000002.jsonl']
+        assert [e['issue'] for e in log.iter_events()] == [1, 2]
+
+
+def test_compaction_merges_finished_weeks():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Three runs in the week of Monday 2026-09-28, one in the current week
+        for run, (issue, at) in enumerate([(3, START), (1, START - timedelta(days=2)), (2, START - timedelta(days=1)),
+                                           (4, START + timedelta(days=5))]):
+            log = EventLog(tmp, writer=f'run-{run}')
+            log.emit(EVENT_CLASSIFIED, issue, at=at)
+            log.close()
+        merged = EventLog(tmp).compact(before=datetime(2026, 10, 5, tzinfo=timezone.utc))
+        assert [os.path.basename(p) for p in merged] == ['events-000001-week-2026-09-28.jsonl']
+        assert [os.path.basename(p) for p in EventLog(tmp).segments()] == [
+            'events-000001-week-2026-09-28.jsonl', 'events-000004-run-3.jsonl']
+        assert [e['issue'] for e in EventLog(tmp).iter_events()] == [1, 2, 3, 4]
+
+        # A run that pushed late is merged into its week's segment next time
+        late = EventLog(tmp, writer='run-late')
+        late.emit(EVENT_CLASSIFIED, 5, at=START + timedelta(hours=1))
+        late.close()
+        assert EventLog(tmp).compact(before=datetime(2026, 10, 5, tzinfo=timezone.utc))
+        assert [e['issue'] for e in EventLog(tmp).iter_events()] == [1, 2, 3, 5, 4]
+
+
+if __name__ == "__main__":
+    os.environ.pop('TRIAGE_EVENTS_WRITER', None)
+    test_writers_keep_their_own_segments()
+    test_overlapping_segments_are_not_skipped()
+    test_unnamed_log_keeps_numbered_segments()
+    test_compaction_merges_finished_weeks()
+    print("✅ Event log tests passed")
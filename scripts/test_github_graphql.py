@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test how the GraphQL fetcher handles rate limits"""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.github_graphql import GraphQLBulkFetcher
+
+RESET = 1790000000
+
+
+class Response:
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload, self.status_code, self.headers = payload, status_code, headers or {}
+        self.text = str(payload)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def post(self, url, json, timeout):
+        return self.responses.pop(0)
+
+
+class Fetcher(GraphQLBulkFetcher):
+    """Records the sleeps instead of taking them"""
+    slept_until = []
+
+    @staticmethod
+    def _sleep_until(moment, reason):
+        Fetcher.slept_until.append(moment)
+
+
+def test_rate_limited_payload_waits_for_the_reset():
+    fetcher = Fetcher(token='token')
+    fetcher.session = Session([
+        Response({'data': None, 'errors': [{'type': 'RATE_LIMITED', 'message': 'API rate limit exceeded'}]},
+                 headers={'X-RateLimit-Reset': str(RESET)}),
+        Response({'data': {'rateLimit': {'cost': 1, 'remaining': 4000, 'resetAt': '2026-09-21T12:00:00Z'},
+                           'viewer': {'login': 'bot'}}}),
+    ])
+    assert fetcher._post('query { viewer { login } }', {})['viewer'] == {'login': 'bot'}
+    assert Fetcher.slept_until == [datetime.fromtimestamp(RESET, timezone.utc)]
+    assert fetcher.request_count == 2
+
+
+def test_other_errors_still_raise():
+    fetcher = Fetcher(token='token')
+    fetcher.session = Session([Response({'data': None, 'errors': [{'type': 'NOT_FOUND', 'message': 'no repo'}]})])
+    try:
+        fetcher._post('query { viewer { login } }', {})
+    except RuntimeError as e:
+        assert 'NOT_FOUND' in str(e)
+    else:
+        raise AssertionError("expected a GraphQL error")
+
+
+if __name__ == "__main__":
+    test_rate_limited_payload_waits_for_the_reset()
+    test_other_errors_still_raise()
+    print("✅ GraphQL fetcher tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Test that diffs composed from consecutive release deltas match diffing the two releases directly"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.image_diff import ImageDiffEngine, compose, invert
+
+NOTES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vhd-notes')
+DISTRO = 'AzureLinux'
+
+A, B, C = frozenset([1]), frozenset([2]), frozenset([3])
+NONE = frozenset()
+
+
+def test_compose():
+    first = {('pkg', 'glibc'): (A, B), ('pkg', 'curl'): (NONE, A), ('pkg', 'zlib'): (A, B)}
+    second = {('pkg', 'glibc'): (B, C), ('pkg', 'curl'): (A, NONE), ('pkg', 'zlib'): (B, A),
+              ('pkg', 'vim'): (A, NONE)}
+    # Added then removed, or changed and changed back, drops out
+    assert compose(first, second) == {('pkg', 'glibc'): (A, C), ('pkg', 'vim'): (A, NONE)}
+    assert compose(compose(first, second), invert(second)) == first
+
+
+def direct(engine, older, newer):
+    """Delta between two releases from their note rows, as if they were adjacent"""
+    before, after = engine._contents(older[2]), engine._contents(newer[2])
+    return {key: (before.get(key, NONE), after.get(key, NONE))
+            for key in before.keys() | after.keys() if before.get(key) != after.get(key)}
+
+
+def test_composed_diffs_match_direct_diffs():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'vhd-notes')
+        shutil.copytree(os.path.join(NOTES, DISTRO), os.path.join(root, DISTRO))
+        engine = ImageDiffEngine(db_path=os.path.join(tmp, 'notes.db'), notes_root=root)
+        releases = engine.releases(DISTRO)
+        first, middle, last = releases[0], releases[len(releases) // 2], releases[-1]
+        for older, newer in ((first, last), (first, middle), (middle, last)):
+            expected = engine._changes(direct(engine, older, newer), None)
+            diff = engine.diff(DISTRO, older[0], newer[0])
+            assert diff.changes == expected and diff.changes
+            # The reverse diff swaps every change
+            reverse = engine.diff(DISTRO, newer[0], older[0])
+            assert sorted((c.kind, c.name, c.new, c.old) for c in reverse.changes) == \
+                sorted((c.kind, c.name, c.old, c.new) for c in diff.changes)
+        assert engine.stats['computed'] == len(releases) - 1
+        engine.close()
+
+        # A second engine reads the stored deltas instead of the note rows
+        engine = ImageDiffEngine(db_path=os.path.join(tmp, 'notes.db'), notes_root=root)
+        again = engine.diff(DISTRO, first[0], last[0])
+        assert again.changes == engine._changes(direct(engine, first, last), None)
+        assert engine.stats == {'computed': 0, 'cached': len(releases) - 1}
+        engine.close()
+
+
+if __name__ == "__main__":
+    test_compose()
+    test_composed_diffs_match_direct_diffs()
+    print("✅ Image diff tests passed")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test what the open-issue corpus keeps per issue and when a refresh reuses a record"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.issue_corpus import MAX_ERROR_CHARS, IssueCorpus
+
+
+class Label:
+    def __init__(self, name):
+        self.name = name
+
+
+class Issue:
+    def __init__(self, number, body, labels=()):
+        self.number, self.title, self.body = number, f"Issue {number}", body
+        self.labels = [Label(name) for name in labels]
+
+
+class Listing:
+    """Pages like a PyGithub PaginatedList"""
+
+    def __init__(self, issues, per_page=2):
+        self.issues, self.per_page = issues, per_page
+        self.pages = 0
+
+    def get_page(self, page):
+        self.pages += 1
+        return self.issues[page * self.per_page:(page + 1) * self.per_page]
+
+
+def test_body_text_is_kept_unless_capped():
+    body = 'error: image pull failed\n' + 'x' * 6000 + '\nerror: late failure ' + 'y' * 500
+    [full] = IssueCorpus.from_github([Issue(1, body)])
+    assert full.body_lower == body.lower()
+    assert len(full.errors[1]) > MAX_ERROR_CHARS
+
+    [capped] = IssueCorpus.from_github([Issue(1, body)], max_body_chars=2000)
+    assert len(capped.body_lower) == 2000
+    # Errors still come from the whole body, cut like the text
+    assert capped.errors == ('image pull failed', full.errors[1][:MAX_ERROR_CHARS])
+    assert capped.body == body
+
+
+def test_refresh_reads_every_page_and_rebuilds_relabeled_issues():
+    listing = Listing([Issue(n, 'Pods stuck', ['bug']) for n in range(1, 5)])
+    previous = IssueCorpus.from_github(listing)
+    assert len(previous) == 4 and listing.pages == 3
+
+    listing.issues[0] = Issue(1, 'Pods stuck', ['bug', 'area/networking'])
+    corpus = IssueCorpus.from_github(listing, previous=previous)
+    assert corpus.stats()['reused'] == 3
+    relabeled = next(issue for issue in corpus if issue.id == 1)
+    assert relabeled.labels == ('bug', 'area/networking')
+
+
+if __name__ == "__main__":
+    test_body_text_is_kept_unless_capped()
+    test_refresh_reads_every_page_and_rebuilds_relabeled_issues()
+    print("✅ Issue corpus tests passed")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Test lifecycle rules against issues that went through more than one cycle"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.github_graphql import IssueRecord, LabelEvent
+from src.lifecycle import RULES_BY_NAME, LifecycleSweep
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def record(labels, updated_days_ago=0, events=()):
+    return IssueRecord(1, 'Pods stuck', '', 'open', 'author', NOW - timedelta(days=90),
+                       NOW - timedelta(days=updated_days_ago), None, labels=labels, assignees=['alice'],
+                       label_events=list(events))
+
+
+def labeled(name, days_ago):
+    return LabelEvent('labeled', name, 'bot', NOW - timedelta(days=days_ago))
+
+
+def test_close_stale_uses_the_current_cycle():
+    def stale_again(days_ago):
+        # Stale two months ago, recovered, and marked stale again `days_ago`
+        return record(['stale'], events=[labeled('stale', 60),
+                                         LabelEvent('unlabeled', 'stale', 'author', NOW - timedelta(days=50)),
+                                         labeled('stale', days_ago)])
+
+    assert LifecycleSweep(now=NOW).evaluate(stale_again(2)).target_state is None
+    assert LifecycleSweep(now=NOW).evaluate(stale_again(9)).target_state == 'closed'
+
+
+def test_escalation_repeats_after_a_quiet_period():
+    sweep = LifecycleSweep(now=NOW)
+    first = sweep.evaluate(record(['Under Investigation'], events=[labeled('Under Investigation', 30)]))
+    assert 'investigation-overdue' in first.labels_to_add and first.comments
+    # Escalated before; nobody has touched the issue for three weeks
+    quiet = sweep.evaluate(record(['Under Investigation', 'investigation-overdue'], updated_days_ago=21))
+    assert quiet.comments and 'investigation-overdue' not in quiet.labels_to_add
+    busy = sweep.evaluate(record(['Under Investigation', 'investigation-overdue'], updated_days_ago=3))
+    assert busy.is_noop
+
+
+def test_repair_item_reminder_repeats():
+    sweep = LifecycleSweep([RULES_BY_NAME['repair-items']], now=NOW)
+    assert sweep.evaluate(record(['bug', 'needs-repair-item'], updated_days_ago=10)).comments
+    assert sweep.evaluate(record(['bug', 'needs-repair-item'], updated_days_ago=1)).is_noop
+
+
+if __name__ == "__main__":
+    test_close_stale_uses_the_current_cycle()
+    test_escalation_repeats_after_a_quiet_period()
+    test_repair_item_reminder_repeats()
+    print("✅ Lifecycle tests passed")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Test that the metrics history follows re-classified issues and survives as a text export"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.issue_facts import IssueFacts
+from src.metrics_history import KIND_FIRST_RESPONSE, MetricsHistory
+
+CREATED = datetime(2026, 9, 7, 12, tzinfo=timezone.utc)
+
+
+def facts(labels):
+    return IssueFacts(7, 'author', CREATED, CREATED, first_response_at=CREATED + timedelta(minutes=30), labels=labels)
+
+
+def test_reclassification_updates_the_row_and_sketches():
+    with tempfile.TemporaryDirectory() as tmp:
+        history = MetricsHistory(os.path.join(tmp, 'metrics.db'), text_path=None)
+        assert history.record_facts([facts([])]) == 1
+        before = history.conn.execute("SELECT area, classification FROM durations").fetchone()
+        assert history.record_facts([facts(['bug', 'area/networking'])]) == 0
+        after = history.conn.execute("SELECT area, classification FROM durations").fetchone()
+        assert after != before
+        sketches = history.conn.execute("SELECT area, classification FROM sketches").fetchall()
+        assert sketches == [after]
+        history.close()
+
+
+def test_text_export_rebuilds_the_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, 'metrics.jsonl')
+        history = MetricsHistory(os.path.join(tmp, 'metrics.db'), text_path)
+        history.record_facts([facts(['bug'])])
+        history.append_snapshot({'period': 'week'}, CREATED)
+        assert history.export_text() == 3  # the duration, its weekly sketch and the snapshot
+        history.close()
+
+        restored = MetricsHistory(os.path.join(tmp, 'fresh.db'), text_path)
+        assert restored.percentiles(KIND_FIRST_RESPONSE)['p50'] == 30
+        assert restored.merged_sketch(KIND_FIRST_RESPONSE).count == 1
+        assert len(restored.snapshots()) == 1
+        restored.close()
+
+
+def test_export_appends_only_changed_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, 'metrics.jsonl')
+        history = MetricsHistory(os.path.join(tmp, 'metrics.db'), text_path)
+        history.record_facts([facts(['bug'])])
+        history.export_text()
+        with open(text_path) as f:
+            exported = f.read()
+        assert history.export_text() == 0
+        history.record_facts([facts(['bug'])])
+        assert history.export_text() == 0
+        # Re-classified: the row's new state, its new sketch and the removal of the old one
+        history.record_facts([facts(['feature-request'])])
+        assert history.export_text() == 3
+        with open(text_path) as f:
+            assert f.read().startswith(exported)
+        current = [history.conn.execute(f"SELECT * FROM {table}").fetchall() for table in ('durations', 'sketches')]
+        history.close()
+
+        restored = MetricsHistory(os.path.join(tmp, 'fresh.db'), text_path)
+        assert [restored.conn.execute(f"SELECT * FROM {table}").fetchall()
+                for table in ('durations', 'sketches')] == current
+        restored.close()
+
+
+def test_stored_sketches_are_loaded_not_rebuilt():
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, 'metrics.jsonl')
+        history = MetricsHistory(os.path.join(tmp, 'metrics.db'), text_path)
+        history.record_facts([facts(['bug'])])
+        history.export_text()
+        history.close()
+
+        # Only the sketch lines are kept: the percentiles still come back from them
+        with open(text_path) as f:
+            sketches = [line for line in f if '"sketches"' in line]
+        with open(text_path, 'w') as f:
+            f.writelines(sketches)
+        restored = MetricsHistory(os.path.join(tmp, 'fresh.db'), text_path)
+        assert restored.merged_sketch(KIND_FIRST_RESPONSE).count == 1
+        assert restored.period_percentiles('month', KIND_FIRST_RESPONSE)['2026-09']['count'] == 1
+        restored.close()
+
+
+if __name__ == "__main__":
+    test_reclassification_updates_the_row_and_sketches()
+    test_text_export_rebuilds_the_database()
+    test_export_appends_only_changed_rows()
+    test_stored_sketches_are_loaded_not_rebuilt()
+    print("✅ Metrics history tests passed")
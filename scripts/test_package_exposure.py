@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Test package version ordering, mention parsing and exposure across node image releases"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.package_exposure import PackageExposureIndex
+from src.package_versions import SCHEME_DEB, SCHEME_RPM, compare_versions, in_range
+from src.vhd_notes import KIND_COMPONENT, KIND_PACKAGE
+
+RELEASES = [f"2025{month:02d}.05.0" for month in range(1, 10)]
+
+
+class FakeNotes:
+    """Azure Linux 3 images listing containerd as a component, and as a package only from 202501.05.0 on"""
+
+    def releases(self):
+        return [('Azurelinuxv3', release, None) for release in RELEASES]
+
+    def releases_with(self, package):
+        rows = [{'distro': 'Azurelinuxv3', 'image_version': release, 'kind': KIND_COMPONENT, 'version': '1.7.20'}
+                for release in RELEASES]
+        rows.append({'distro': 'Azurelinuxv3', 'image_version': RELEASES[0], 'kind': KIND_PACKAGE,
+                     'version': '1.7.20-2.azl3'})
+        return [row for row in rows if package == 'containerd']
+
+
+def exposure_index():
+    index = PackageExposureIndex(notes_index=FakeNotes())
+    index._names = {'containerd', 'runc', 'glibc', 'openssl'}
+    return index
+
+
+def test_rpm_ordering():
+    assert compare_versions('1.1.12-2.azl3', '1.1.12-10.azl3') < 0
+    assert compare_versions('1:1.0', '2.0') > 0
+    assert compare_versions('1.0~rc1', '1.0') < 0
+    # A bound without a release matches every release of that version
+    assert compare_versions('1.1.12-2.azl3', '1.1.12') == 0
+    assert in_range('1.1.11-5.cm2', None, '1.1.12', SCHEME_RPM)
+
+
+def test_deb_ordering():
+    assert compare_versions('2.35-0ubuntu3.8', '2.35-0ubuntu3.10', SCHEME_DEB) < 0
+    assert compare_versions('1.0~beta', '1.0', SCHEME_DEB) < 0
+    assert compare_versions('1:0.9', '2.0', SCHEME_DEB) > 0
+    assert compare_versions('v1.31.8', '1.31.10', SCHEME_DEB) < 0
+
+
+def test_history_merges_per_release():
+    found = exposure_index().exposure('containerd', high='9')
+    assert [(e['distro'], e['releases'], e['current']) for e in found] == [('Azurelinuxv3', 9, True)]
+
+
+def test_mentions_take_the_nearest_range():
+    mentions = exposure_index().find_mentions("runc < 1.1.12; glibc from 2.35 to 2.38")
+    assert mentions == [{'package': 'runc', 'low': None, 'high': '1.1.12'},
+                        {'package': 'glibc', 'low': '2.35', 'high': '2.38'}]
+
+
+def test_mentions_stop_at_the_next_package():
+    mentions = exposure_index().find_mentions("runc and glibc >= 2.35, < 2.38")
+    assert mentions == [{'package': 'glibc', 'low': '2.35', 'high': '2.38'}]
+
+
+if __name__ == "__main__":
+    test_rpm_ordering()
+    test_deb_ordering()
+    test_history_merges_per_release()
+    test_mentions_take_the_nearest_range()
+    test_mentions_stop_at_the_next_package()
+    print("✅ Package exposure tests passed")
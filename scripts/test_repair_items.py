@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Test that the repair-item index only reads comments once"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.repair_items import RepairItemIndex
+
+CREATED = datetime(2026, 9, 1, tzinfo=timezone.utc)
+
+
+class Comment:
+    def __init__(self, body, created_at):
+        self.body, self.created_at, self.updated_at = body, created_at, created_at
+
+
+class Issue:
+    def __init__(self, number, comments=()):
+        self.number, self.comments, self.updated_at = number, list(comments), CREATED
+        self.reads = 0
+
+    def get_comments(self, since=None):
+        self.reads += 1
+        return [c for c in self.comments if since is None or c.updated_at >= since]
+
+
+def scan_if_needed(index, issue):
+    if index.needs_scan(issue.number, issue.updated_at):
+        index.scan(issue)
+
+
+def test_issue_without_comments_is_not_rescanned():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.json')
+        issue = Issue(7)
+        index = RepairItemIndex(path)
+        scan_if_needed(index, issue)
+        index.save()
+
+        index = RepairItemIndex(path)
+        scan_if_needed(index, issue)
+        assert issue.reads == 1
+
+        # A comment after the first read is still picked up
+        now = datetime.now(timezone.utc) + timedelta(seconds=1)
+        issue.comments.append(Comment('Repair Item: [ADO-42](https://dev.azure.com/x/42)', now))
+        issue.updated_at = now
+        scan_if_needed(index, issue)
+        assert issue.reads == 2 and index.get(7).links == ['[ADO-42](https://dev.azure.com/x/42)']
+
+
+if __name__ == "__main__":
+    test_issue_without_comments_is_not_rescanned()
+    print("✅ Repair item index tests passed")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Test that waits cut short by the bot's auto-close are reported as censored"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.github_graphql import CommentRecord, IssueRecord, LabelEvent
+from src.threshold_simulator import FEEDBACK_LABEL, IssueTimelines, simulate
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+START = NOW - timedelta(days=60)
+
+
+def waiting(number, closed_after=None, closed_by='', replied_after=None):
+    """An issue waiting on its author from START"""
+    comments = []
+    if replied_after is not None:
+        comments.append(CommentRecord(1, 'author', 'NONE', START + timedelta(days=replied_after), 'Still broken'))
+    closed_at = START + timedelta(days=closed_after) if closed_after is not None else None
+    return IssueRecord(number, 'Pods stuck', '', 'closed' if closed_at else 'open', 'author', START, NOW,
+                       closed_at, comments=comments, closed_by=closed_by,
+                       label_events=[LabelEvent('labeled', FEEDBACK_LABEL, 'maintainer', START)])
+
+
+def timelines():
+    return IssueTimelines.from_records([
+        waiting(1, closed_after=12, closed_by='github-actions[bot]'),
+        waiting(2, closed_after=3, closed_by='maintainer'),
+        waiting(3, replied_after=5),
+        waiting(4, closed_after=20, closed_by='github-actions[bot]', replied_after=15),
+    ], now=NOW)
+
+
+def test_bot_closes_are_censored():
+    results = simulate(timelines(), [7], [3, 10], [14])
+    # Closing after 17 days: issue 1 was closed by the bot at 12, so whether it would have waited that long is unknown
+    assert results['auto_closed'].tolist() == [[2, 0]]
+    assert results['closed_then_replied'].tolist() == [[1, 0]]
+    assert results['close_unknown'].tolist() == [[0, 1]]
+    assert results['stale_unknown'].tolist() == [[0, 0]]
+
+
+def test_cache_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'timelines.npz')
+        timelines().save(path)
+        loaded = IssueTimelines.load(path)
+        assert loaded.feedback_censored.sum() == 1 and loaded.issue_count == 4
+
+
+if __name__ == "__main__":
+    test_bot_closes_are_censored()
+    test_cache_round_trip()
+    print("✅ Threshold simulator tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test how quoted versions are resolved against the node image notes and the CHANGELOG"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.changelog_index import ChangelogIndex
+from src.version_context import VersionContext, format_version_context
+from src.vhd_notes import KIND_COMPONENT, NoteRow
+
+CHANGELOG = """## Release 2025-05-19
+
+### Component Updates
+
+* Azure Policy addon GateKeeper updated to 3.11.
+* Azure Linux base image python updated to 3.11.
+"""
+
+
+class FakeNotes:
+    def releases(self):
+        return [('AzureLinux', '202505.14.0', None), ('aks-ubuntu/AKSUbuntu-2204', '202505.14.0', None)]
+
+    def release_contents(self, distro, image_version):
+        version = '1.6.26-10.cm2' if distro == 'AzureLinux' else '1.7.27-ubuntu22.04u1'
+        return [NoteRow(KIND_COMPONENT, 'containerd', version, '')]
+
+    def first_release_with(self, name, version, kind):
+        return {}
+
+
+class FakeExposure:
+    notes = FakeNotes()
+
+    def known_names(self):
+        return {'python', 'containerd'}
+
+
+def version_context(tmp):
+    path = os.path.join(tmp, 'CHANGELOG.md')
+    with open(path, 'w') as f:
+        f.write(CHANGELOG)
+    return VersionContext(FakeExposure(), ChangelogIndex(path))
+
+
+def test_changelog_hits_name_the_component():
+    with tempfile.TemporaryDirectory() as tmp:
+        [context] = version_context(tmp).enrich("Our app broke after python 3.11 landed")
+        assert [c['text'] for c in context['changelog']] == ['Azure Linux base image python updated to 3.11.']
+
+
+def test_bundled_versions_stay_per_distro():
+    with tempfile.TemporaryDirectory() as tmp:
+        [context] = version_context(tmp).enrich("Nodes on 202505.14.0 lose pods")
+        assert context['bundled'] == {'AzureLinux': {'containerd': ['1.6.26-10.cm2']},
+                                      'aks-ubuntu/AKSUbuntu-2204': {'containerd': ['1.7.27-ubuntu22.04u1']}}
+        assert 'AzureLinux bundles containerd 1.6.26-10.cm2' in format_version_context([context])
+
+
+if __name__ == "__main__":
+    test_changelog_hits_name_the_component()
+    test_bundled_versions_stay_per_distro()
+    print("✅ Version context tests passed")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Test the VHD release-notes parser and the index built from it"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.vhd_notes import (KIND_BINARY, KIND_CACHED, KIND_COMPONENT, KIND_IMAGE, KIND_KERNEL, KIND_OS,
+                           KIND_PACKAGE, KIND_UPDATE, NoteRow, VhdNotesIndex, parse_note)
+
+UBUNTU_NOTE = """\ufeffComponents downloaded in this VHD build (some of the below components might get deleted):
+  - blobfuse=1.4.4
+  - pigz socat
+  - containerd version 1.6.8
+containerd images pre-pulled:
+  - mcr.microsoft.com/oss/kubernetes/pause:3.6
+kubelet/kubectl downloaded:
+-rwxr-xr-x 1 root root    120865016 Jun 21 17:42 /usr/local/bin/kubelet-1.23.8
+=== Installed Packages Begin
+Listing...
+apache2-utils/jammy-updates,jammy-security,now 2.4.52-1ubuntu4.1 amd64 [installed]
+=== Installed Packages End
+=== os-release Begin
+VERSION="22.04.1 LTS (Jammy Jellyfish)"
+=== os-release End
+Using kernel:
+Linux version 5.15.0-1021-azure (buildd@lcy02-amd64-053) #26-Ubuntu SMP
+"""
+
+AZURELINUX_PACKAGES = """=== Installed Packages Begin
+glibc-2.35-3.cm2.x86_64
+mariner-release-2.0-38.cm2.noarch
+=== Installed Packages End
+"""
+
+WINDOWS_NOTE = """System Info
+\tOS Version     : 17763.5329
+
+Installed QFEs
+\tKB5034127 : Security Update : https://support.microsoft.com/kb/5034127
+
+Version: ctr github.com/containerd/containerd v1.6.21+azure
+
+Images:
+REF                                                          TYPE
+mcr.microsoft.com/containernetworking/azure-cns:v1.4.51      application/vnd.oci.image.index.v1+json
+mcr.microsoft.com/containernetworking/azure-cns@sha256:6335  application/vnd.oci.image.index.v1+json
+
+Cached Files:
+
+File                                                   Sha256
+c:\\akse-cache\\win-k8s\\v1.27.7-1int.zip                  0E44289127AB9A66F0EF9BEEA1BAC850F2FABA794040CE96201D4A8A3C319A6F
+"""
+
+
+def test_linux_note():
+    assert parse_note(UBUNTU_NOTE) == [
+        NoteRow(KIND_COMPONENT, 'blobfuse', '1.4.4', ''),
+        NoteRow(KIND_COMPONENT, 'pigz', '', ''),
+        NoteRow(KIND_COMPONENT, 'socat', '', ''),
+        NoteRow(KIND_COMPONENT, 'containerd', '1.6.8', ''),
+        NoteRow(KIND_IMAGE, 'mcr.microsoft.com/oss/kubernetes/pause', '3.6', 'mcr.microsoft.com/oss/kubernetes/pause:3.6'),
+        NoteRow(KIND_BINARY, 'kubelet', '1.23.8', ''),
+        NoteRow(KIND_PACKAGE, 'apache2-utils', '2.4.52-1ubuntu4.1', 'apache2-utils_2.4.52-1ubuntu4.1_amd64'),
+        NoteRow(KIND_OS, 'os-release', '22.04.1 LTS (Jammy Jellyfish)', ''),
+        NoteRow(KIND_KERNEL, 'linux', '5.15.0-1021-azure', ''),
+    ]
+    assert parse_note(AZURELINUX_PACKAGES) == [
+        NoteRow(KIND_PACKAGE, 'glibc', '2.35-3.cm2', 'glibc-2.35-3.cm2.x86_64'),
+        NoteRow(KIND_PACKAGE, 'mariner-release', '2.0-38.cm2', 'mariner-release-2.0-38.cm2.noarch'),
+    ]
+
+
+def test_windows_note():
+    assert parse_note(WINDOWS_NOTE) == [
+        NoteRow(KIND_OS, 'windows', '17763.5329', ''),
+        NoteRow(KIND_UPDATE, 'kb5034127', '', 'Security Update'),
+        NoteRow(KIND_COMPONENT, 'containerd', '1.6.21+azure', ''),
+        NoteRow(KIND_IMAGE, 'mcr.microsoft.com/containernetworking/azure-cns', 'v1.4.51',
+                'mcr.microsoft.com/containernetworking/azure-cns:v1.4.51'),
+        NoteRow(KIND_CACHED, 'win-k8s', '1.27.7-1int', 'v1.27.7-1int.zip'),
+    ]
+
+
+def write_notes(root):
+    for relpath, text in (('AKSUbuntu-2204/2022.10.17.txt', UBUNTU_NOTE),
+                          ('AKSUbuntu-2204/2022.10.24.txt', UBUNTU_NOTE + AZURELINUX_PACKAGES),
+                          ('AKSWindows/2019/17763.5329.240110.txt', WINDOWS_NOTE)):
+        path = os.path.join(root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def test_index_matches_the_parser():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'vhd-notes')
+        write_notes(root)
+        index = VhdNotesIndex(os.path.join(tmp, 'notes.db'), root)
+        assert index.update()['added'] == 3
+        for distro, image_version, _ in index.releases():
+            expected = sorted(set(parse_note(index.read_note(distro, image_version))))
+            assert index.release_contents(distro, image_version) == expected
+        assert [r['image_version'] for r in index.releases_with('containerd', '1.6.8')] == [
+            '2022.10.17', '2022.10.24']
+        assert index.versions_of('win-k8s') == {'1.27.7-1int': 1}
+        assert index.update()['unchanged'] == 3
+        index.close()
+
+        # Written by an older parser: every note is parsed again, once
+        conn = sqlite3.connect(os.path.join(tmp, 'notes.db'))
+        conn.execute("PRAGMA user_version = 0")
+        conn.close()
+        for expected in ('updated', 'unchanged'):
+            index = VhdNotesIndex(os.path.join(tmp, 'notes.db'), root)
+            assert index.update()[expected] == 3
+            index.close()
+
+
+if __name__ == "__main__":
+    test_linux_note()
+    test_windows_note()
+    test_index_matches_the_parser()
+    print("✅ VHD notes tests passed")
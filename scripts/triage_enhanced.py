@@ -1,43 +1,81 @@
 import os
 import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterable
 from github import Github
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.issue_classifier import IssueClassifier
+from src.duplicate_search import DuplicateCandidateSearch
+from src.issue_corpus import IssueCorpus
+from src.action_plan import ActionPlanExecutor, IssueActionPlan
+from src.event_log import EVENT_CLASSIFIED, EventLog
+from src.issue_facts import is_area_label
+from src.package_exposure import format_exposure
+from src.version_context import format_version_context
 
 load_dotenv()
 
 def main(issue_number):
     g = Github(os.getenv('GITHUB_TOKEN'))
     repo = g.get_repo('naman-msft/AKS')
-    issue = repo.get_issue(int(issue_number))
+    remaining_at_start = g.rate_limiting[0]
     
-    print(f"Processing issue #{issue.number}: {issue.title}")
-    
-    # Get existing open issues for duplicate detection
-    existing_issues = []
-    for existing in repo.get_issues(state='open'):
-        if existing.number != issue.number:
-            existing_issues.append({
-                'id': existing.number,
-                'title': existing.title,
-                'body': existing.body or ''
-            })
+    classifier = build_classifier()
+    events = EventLog()
+    executor = ActionPlanExecutor(events=events)
+    candidate_search = DuplicateCandidateSearch(g, repo)
+    triage_issue(repo, classifier, repo.get_issue(int(issue_number)), executor, events=events,
+                 candidate_search=candidate_search)
     
-    # Initialize classifier
-    classifier = IssueClassifier(
+    print(f"📰 Changelog: {classifier.changelog_index().stats()}")
+    if candidate_search.stats['searches']:
+        stats = candidate_search.stats
+        print(f"🔎 Duplicate search: {stats['candidates']} candidates from {stats['search_calls']} search calls "
+              f"in {stats['elapsed_ms']:.0f} ms (listing open issues: ~{stats['listing_calls']} calls)")
+    print(f"📊 GitHub API calls this run: {executor.api_calls} writes, "
+          f"~{remaining_at_start - g.rate_limiting[0]} total")
+
+def build_classifier() -> IssueClassifier:
+    return IssueClassifier(
         config_path=".github/triage-config.json",
         azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
         azure_key=os.getenv('AZURE_OPENAI_API_KEY'),
         deployment_name=os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
     )
 
+def load_existing_issues(repo, exclude_number: int = None, previous: IssueCorpus = None,
+                         max_body_chars: int = None) -> IssueCorpus:
+    """Get existing open issues for duplicate detection"""
+    return IssueCorpus.from_github(repo.get_issues(state='open'), exclude_number, previous=previous,
+                                   max_body_chars=max_body_chars, repo=repo)
+
+def find_duplicate_candidates(repo, issue, candidate_search: DuplicateCandidateSearch = None) -> Iterable:
+    """Open issues to check for duplicates: a search shortlist when possible, else every open issue"""
+    if candidate_search is not None:
+        try:
+            return candidate_search.candidates({'id': issue.number, 'title': issue.title, 'body': issue.body or ''})
+        except Exception as e:
+            print(f"⚠️  Duplicate search unavailable ({e}), listing open issues instead")
+    return load_existing_issues(repo, issue.number)
+
+def triage_issue(repo, classifier: IssueClassifier, issue, executor: ActionPlanExecutor,
+                 existing_issues: Iterable = None, events: EventLog = None,
+                 candidate_search: DuplicateCandidateSearch = None):
+    """Classify one issue and apply the resulting action plan"""
+    print(f"Processing issue #{issue.number}: {issue.title}")
+
     # Check if AI should process this issue
     existing_labels = [label.name for label in issue.labels]
     if not classifier.should_ai_classify(existing_labels):
         print(f"⚠️  Issue already classified by human, skipping AI classification")
-        return
+        return None
+    
+    # find_similar_issues skips the issue itself, so a shared corpus needs no filtering here
+    if existing_issues is None:
+        existing_issues = find_duplicate_candidates(repo, issue, candidate_search)
     
     # Prepare issue data
     issue_data = {
@@ -49,77 +87,116 @@ def main(issue_number):
     }
     
     # Use enhanced classification
+    started = time.perf_counter()
     result = classifier.classify_issue_enhanced(issue_data, existing_issues)
+    latency_ms = (time.perf_counter() - started) * 1000
     
     print(f"Classification: {result.classification} (confidence: {result.confidence:.2f})")
+    if events is not None:
+        response_minutes = (datetime.now(timezone.utc) - issue.created_at).total_seconds() / 60
+        events.emit(EVENT_CLASSIFIED, issue.number, classification=result.classification,
+                    confidence=round(result.confidence, 3), latency_ms=round(latency_ms, 1),
+                    primary_area=result.primary_area, areas=result.suggested_areas or [],
+                    is_cri=result.is_cri, duplicate_of=result.duplicate_of,
+                    response_minutes=round(response_minutes, 1))
     
-    if result.confidence > 0.7:
-        # Apply labels
-        issue.add_to_labels(*result.suggested_labels)
-        print(f"✓ Applied labels: {', '.join(result.suggested_labels)}")
-        
-        # Show AI-detected area labels that will trigger assignments
-        area_labels = [label for label in result.suggested_labels if 
-                      label.startswith('addon/') or label.startswith('azure/') or 
-                      label.startswith('extension/') or label.startswith('upstream/') or 
-                      label.startswith('client/') or 
-                      label in ['Security', 'networking', 'storage', 'windows', 'upgrade', 'docs', 
-                               'fleet', 'keda', 'nodepools', 'resiliency', 'Scale and Performance', 
-                               'Cilium', 'mesh', 'service-mesh', 'AzGov', 'AzChina', 
-                               'app-gateway-for-containers', 'advanced-container-networking-services', 
-                               'pod-identity', 'control-plane']]
-        
-        if area_labels:
-            print(f"🎯 AI-detected area labels (will trigger auto-assignment): {', '.join(area_labels)}")
-        
-        # Post classification comment with wiki integration
-        comment = f"🤖 **AI Issue Analysis**\n\n"
-        comment += f"**Classification**: {result.classification}\n"
-        comment += f"**Confidence**: {result.confidence:.2%}\n"
-        comment += f"**Area**: {', '.join(result.suggested_areas) if result.suggested_areas else 'general'}\n"
-
-        # Add wiki response if available
-        if hasattr(result, 'wiki_response') and result.wiki_response and result.wiki_response.get('found_relevant_docs'):
-            comment += "\n---\n\n"
-            comment += "## 📖 Relevant Documentation Found\n\n"
-            comment += result.wiki_response['response']
-            comment += f"\n\n*Found {result.wiki_response['citations_count']} relevant documentation pages*"
-        elif result.classification in ['BUG', 'SUPPORT']:
-            comment += "\n---\n\n"
-            comment += "## 📖 Documentation Search\n\n"
-            comment += "I searched our documentation but couldn't find specific information about this issue. "
-            comment += "This might be a new issue or require further investigation.\n"
-
-        # Add specific guidance based on classification
-        if result.classification == 'SUPPORT':
-            comment += "\n\n### 🎫 Next Steps\n"
-            comment += "Since this appears to be a support request, please:\n"
-            comment += "1. Review the documentation links above (if any)\n"
-            comment += "2. If the issue persists, [create a support ticket](https://azure.microsoft.com/support/create-ticket/)\n"
-        elif result.classification == 'BUG':
-            comment += "\n\n### 🐛 Bug Report Received\n"
-            comment += "Thank you for reporting this issue. Our team will investigate and provide updates.\n"
-
-        # Post the enhanced comment
-        issue.create_comment(comment)
-        print("✓ Posted enhanced response with wiki integration")
-        
-        # Handle assignments
-        if result.suggested_assignees:
-            assignees = [a.replace('@', '') for a in result.suggested_assignees]
-            try:
-                issue.add_to_assignees(*assignees)
-                print(f"✓ Assigned to: {', '.join(assignees)}")
-            except Exception as e:
-                print(f"⚠️  Could not assign: {e}")
-        
-        # Close if duplicate
-        if result.classification == "DUPLICATE" and hasattr(result, 'duplicate_of'):
-            issue.edit(state='closed')
-            print(f"✓ Closed as duplicate of #{result.duplicate_of}")
-    else:
+    plan = build_triage_plan(issue, result)
+
+    # Labels, assignees and state go out in one issue update on top of what the issue has now, the comment in one more call
+    executor.execute(issue, plan)
+    print(f"✓ {plan.describe()}")
+    return result
+
+def build_triage_comment(result) -> str:
+    """Build the AI analysis comment posted on the issue"""
+    comment = f"🤖 **AI Issue Analysis**\n\n"
+    comment += f"**Classification**: {result.classification}\n"
+    comment += f"**Confidence**: {result.confidence:.2%}\n"
+    comment += f"**Area**: {', '.join(result.suggested_areas) if result.suggested_areas else 'general'}\n"
+
+    known_fix = getattr(result, 'known_fix', None)
+    if known_fix and 'resolution/fix-released' in result.suggested_labels:
+        comment += "\n---\n\n"
+        comment += "## ✅ Known Fix\n\n"
+        comment += result.suggested_response
+        if len(known_fix.releases) > 1:
+            comment += f"\n\n*Also announced in releases {', '.join(known_fix.releases[-5:])}*"
+        comment += f"\n\n*Matched from the [AKS changelog]({known_fix.entry.anchor}); reply if this does not answer your issue.*\n"
+        return comment
+
+    # Add wiki response if available
+    if hasattr(result, 'wiki_response') and result.wiki_response and result.wiki_response.get('found_relevant_docs'):
+        comment += "\n---\n\n"
+        comment += "## 📖 Relevant Documentation Found\n\n"
+        comment += result.wiki_response['response']
+        comment += f"\n\n*Found {result.wiki_response['citations_count']} relevant documentation pages*"
+    elif result.classification in ['BUG', 'SUPPORT']:
+        comment += "\n---\n\n"
+        comment += "## 📖 Documentation Search\n\n"
+        comment += "I searched our documentation but couldn't find specific information about this issue. "
+        comment += "This might be a new issue or require further investigation.\n"
+
+    if known_fix:
+        # A suggestion only: the issue keeps its classification and stays open
+        entry = known_fix.entry
+        comment += "\n---\n\n"
+        comment += "## 📢 Possibly Related Change\n\n"
+        comment += f"The [AKS release {entry.release}]({entry.anchor}) announced:\n\n> {entry.text}\n\n"
+        comment += "*Matched from the AKS changelog; it may not apply to your issue.*\n"
+
+    if getattr(result, 'affected_images', None):
+        comment += "\n---\n\n"
+        comment += "## 📦 Affected Node Images\n\n"
+        comment += "Node image releases that ship a package version mentioned in this issue:\n\n"
+        comment += format_exposure(result.affected_images)
+        comment += "\n"
+
+    if getattr(result, 'version_context', None):
+        comment += "\n---\n\n"
+        comment += "## 🏷️ Versions Mentioned\n\n"
+        comment += format_version_context(result.version_context)
+        comment += "\n"
+
+    # Add specific guidance based on classification
+    if result.classification == 'SUPPORT':
+        comment += "\n\n### 🎫 Next Steps\n"
+        comment += "Since this appears to be a support request, please:\n"
+        comment += "1. Review the documentation links above (if any)\n"
+        comment += "2. If the issue persists, [create a support ticket](https://azure.microsoft.com/support/create-ticket/)\n"
+    elif result.classification == 'BUG':
+        comment += "\n\n### 🐛 Bug Report Received\n"
+        comment += "Thank you for reporting this issue. Our team will investigate and provide updates.\n"
+
+    return comment
+
+def build_triage_plan(issue, result) -> IssueActionPlan:
+    """Turn a classification result into a deduplicated action plan for the issue"""
+    plan = IssueActionPlan.for_issue(issue)
+
+    if result.confidence <= 0.7:
         print("⚠️  Low confidence - manual review needed")
-        issue.add_to_labels("needs-human-review")
+        plan.add_labels("needs-human-review")
+        return plan
+
+    plan.add_labels(*result.suggested_labels)
+
+    # Show AI-detected area labels that will trigger assignments
+    area_labels = [label for label in plan.labels_to_add if is_area_label(label)]
+    
+    if area_labels:
+        print(f"🎯 AI-detected area labels (will trigger auto-assignment): {', '.join(area_labels)}")
+
+    plan.comment(build_triage_comment(result))
+
+    if result.suggested_assignees:
+        plan.assign(*result.suggested_assignees)
+
+    # Close if duplicate
+    if result.classification == "DUPLICATE" and result.duplicate_of:
+        plan.close()
+        print(f"✓ Closing as duplicate of #{result.duplicate_of}")
+
+    return plan
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Long-running triage service.
+
+Accepts GitHub `issues` and `issue_comment` webhook payloads over local HTTP,
+queues them and processes them with a worker pool that shares one warm GitHub
+client, classifier and config instead of cold-starting per event.
+
+Deliveries are scored for urgency from the issue text before classification
+and served from a priority queue with aging; `--reserved-workers` of the pool
+only take CRI and security items so they always have capacity.
+
+Usage:
+    python scripts/triage_service.py --port 8080 --workers 4 --reserved-workers 1
+
+Endpoints:
+    POST /webhook   GitHub webhook delivery (X-GitHub-Event header required)
+    GET  /metrics   Queue depth, in-flight jobs, end-to-end latency and per-priority
+                    queue wait times as JSON
+    GET  /healthz   Liveness check
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import signal
+import asyncio
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Optional
+from github import Github
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.action_plan import ActionPlanExecutor
+from src.event_log import EventLog
+from src.issue_corpus import CorpusIssue, IssueCorpus
+from src.priority import (PRIORITY_CRI, PRIORITY_HIGH, PRIORITY_NAMES, PRIORITY_SECURITY,
+                          PriorityJobQueue, score_urgency)
+from triage_enhanced import build_classifier, load_existing_issues, triage_issue
+from comment_commands import CommentCommandProcessor, CommentEvent
+
+load_dotenv()
+
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+
+@dataclass
+class TriageJob:
+    kind: str  # 'issue' or 'comment'
+    issue_number: int
+    comment_id: Optional[int] = None
+    priority: int = PRIORITY_HIGH
+    # Urgency keywords that set an issue job's priority
+    reasons: List[str] = field(default_factory=list)
+    received_at: float = field(default_factory=time.monotonic)
+    # Comment body and author from the payload, so the worker need not fetch the comment
+    comment: Optional[CommentEvent] = None
+
+
+class ExistingIssueCache:
+    """
+    Open-issue corpus for duplicate detection, refreshed at most every `ttl`
+    seconds. A refresh keeps the normalized record of every unchanged issue;
+    `max_body_chars` caps the body text held per issue.
+    """
+
+    def __init__(self, repo, ttl: int = 900, max_body_chars: Optional[int] = None):
+        self.repo = repo
+        self.ttl = ttl
+        self.max_body_chars = max_body_chars
+        self._corpus = IssueCorpus(max_body_chars)
+        self._loaded_at = 0.0
+        self._lock = Lock()
+
+    def get(self) -> List[CorpusIssue]:
+        with self._lock:
+            if time.monotonic() - self._loaded_at > self.ttl:
+                self._corpus = load_existing_issues(self.repo, previous=self._corpus,
+                                                    max_body_chars=self.max_body_chars)
+                self._loaded_at = time.monotonic()
+            return self._corpus.snapshot()
+
+    def add(self, issue):
+        with self._lock:
+            if issue.number not in self._corpus:
+                self._corpus.add(issue.number, issue.title, issue.body, (label.name for label in issue.labels))
+
+    def stats(self) -> Dict:
+        return self._corpus.stats()
+
+
+class TriageService:
+    def __init__(self, workers: int = 4, webhook_secret: Optional[str] = None,
+                 reserved_workers: int = 1, aging_seconds: float = 120.0,
+                 max_body_chars: Optional[int] = None):
+        self.workers = workers
+        self.reserved_workers = min(reserved_workers, workers - 1) if workers > 1 else 0
+        self.webhook_secret = webhook_secret
+
+        # Warm state shared by every job
+        self.github = Github(os.getenv('GITHUB_TOKEN'))
+        self.repo = self.github.get_repo('naman-msft/AKS')
+        self.classifier = build_classifier()
+        self.events = EventLog()
+        self.executor = ActionPlanExecutor(events=self.events)
+        self.existing_issues = ExistingIssueCache(self.repo, max_body_chars=max_body_chars)
+        self.command_processor = CommentCommandProcessor(executor=self.executor, events=self.events)
+
+        self.queue = PriorityJobQueue(aging_seconds=aging_seconds)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='triage')
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000)
+        self._stopping = False
+
+    # ---- webhook handling -------------------------------------------------
+
+    def verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        if not self.webhook_secret:
+            return True
+        if not signature:
+            return False
+        expected = 'sha256=' + hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def job_from_event(self, event: str, payload: Dict) -> Optional[TriageJob]:
+        """Map a webhook delivery to a job, mirroring the filters in issue-triage.yml"""
+        issue = payload.get('issue') or {}
+        if not issue or 'pull_request' in issue:
+            return None
+        if event == 'issues' and payload.get('action') == 'opened':
+            if issue.get('user', {}).get('type') == 'Bot':
+                return None
+            urgency = score_urgency(issue.get('title', ''), issue.get('body') or '')
+            return TriageJob('issue', issue['number'], priority=urgency.priority, reasons=urgency.reasons)
+        if event == 'issue_comment' and payload.get('action') == 'created':
+            comment = payload.get('comment', {})
+            body = comment.get('body') or ''
+            commands = self.command_processor.parse_commands(body)
+            if commands:
+                priority = PRIORITY_CRI if any(cmd == '/mark-as-cri' for cmd, _ in commands) else PRIORITY_HIGH
+                event = CommentEvent(issue['number'], comment['id'], body=body,
+                                     login=comment.get('user', {}).get('login'),
+                                     association=comment.get('author_association'))
+                return TriageJob('comment', issue['number'], comment['id'], priority, comment=event)
+        return None
+
+    def process(self, job: TriageJob):
+        """Run one job on a worker thread"""
+        if job.kind == 'issue':
+            issue = self.repo.get_issue(job.issue_number)
+            triage_issue(self.repo, self.classifier, issue, self.executor,
+                         existing_issues=self.existing_issues.get(), events=self.events)
+            self.existing_issues.add(issue)
+        else:
+            self.command_processor.process_events([job.comment or CommentEvent(job.issue_number, job.comment_id)])
+
+    async def worker(self, index: int, max_priority: Optional[int] = None):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, _ = await self.queue.get(max_priority)
+            self.in_flight += 1
+            try:
+                await loop.run_in_executor(self.pool, self.process, job)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Worker {index} failed on #{job.issue_number}: {e}")
+            finally:
+                self.in_flight -= 1
+                self.latencies.append(time.monotonic() - job.received_at)
+                self.queue.task_done()
+
+    # ---- metrics ------------------------------------------------------------
+
+    def metrics(self) -> Dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_depth_by_priority': self.queue.depth_by_priority(),
+            'queue_wait_seconds': self.queue.wait_stats(),
+            'in_flight': self.in_flight,
+            'processed': self.processed,
+            'failed': self.failed,
+            'github_write_calls': self.executor.api_calls,
+            'changelog_index': self.classifier.changelog_index().timings,
+            'issue_corpus': self.existing_issues.stats(),
+            'latency_seconds': {
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'max': round(ordered[-1], 3) if ordered else None
+            }
+        }
+
+    # ---- HTTP ---------------------------------------------------------------
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            method, path = request_line.split(' ')[:2]
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length', 0))
+            if length > MAX_BODY_BYTES:
+                await self.respond(writer, 413, {'error': 'payload too large'})
+                return
+            body = await reader.readexactly(length) if length else b''
+
+            if method == 'GET' and path == '/healthz':
+                await self.respond(writer, 200, {'status': 'stopping' if self._stopping else 'ok'})
+            elif method == 'GET' and path == '/metrics':
+                await self.respond(writer, 200, self.metrics())
+            elif method == 'POST' and path == '/webhook':
+                await self.handle_webhook(writer, headers, body)
+            else:
+                await self.respond(writer, 404, {'error': 'not found'})
+        except Exception as e:
+            print(f"⚠️  Bad request: {e}")
+            await self.respond(writer, 400, {'error': 'bad request'})
+        finally:
+            writer.close()
+
+    async def handle_webhook(self, writer, headers: Dict, body: bytes):
+        if self._stopping:
+            await self.respond(writer, 503, {'error': 'shutting down'})
+            return
+        if not self.verify_signature(body, headers.get('x-hub-signature-256')):
+            await self.respond(writer, 401, {'error': 'invalid signature'})
+            return
+
+        job = self.job_from_event(headers.get('x-github-event', ''), json.loads(body or b'{}'))
+        if job is None:
+            await self.respond(writer, 200, {'queued': False})
+            return
+
+        await self.queue.put(job, job.priority)
+        await self.respond(writer, 202, {'queued': True, 'priority': PRIORITY_NAMES[job.priority],
+                                         'reasons': job.reasons, 'queue_depth': self.queue.qsize()})
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict):
+        reasons = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 401: 'Unauthorized',
+                   404: 'Not Found', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    # ---- lifecycle ----------------------------------------------------------
+
+    async def run(self, host: str, port: int, drain_timeout: int = 60):
+        # The first workers only serve CRI and security items so they are never stuck behind routine work
+        workers = [
+            asyncio.create_task(self.worker(i, PRIORITY_SECURITY if i < self.reserved_workers else None))
+            for i in range(self.workers)
+        ]
+        server = await asyncio.start_server(self.handle_connection, host, port)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        print(f"🚀 Triage service listening on http://{host}:{port} with {self.workers} workers "
+              f"({self.reserved_workers} reserved for CRI/security)")
+        await stop.wait()
+
+        # Stop accepting new deliveries, then let queued jobs finish
+        print("🛑 Shutting down, draining queue...")
+        self._stopping = True
+        server.close()
+        await server.wait_closed()
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️  {self.queue.qsize()} job(s) still queued after {drain_timeout}s, dropping them")
+
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.pool.shutdown(wait=True)
+        print(f"✓ Stopped. {json.dumps(self.metrics())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the resident triage webhook service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--reserved-workers', type=int, default=1,
+                        help='Workers that only process CRI and security issues')
+    parser.add_argument('--aging-seconds', type=float, default=120.0,
+                        help='Queue wait that promotes an item by one priority level')
+    parser.add_argument('--drain-timeout', type=int, default=60,
+                        help='Seconds to wait for queued jobs on shutdown')
+    parser.add_argument('--max-body-chars', type=int, default=None,
+                        help='Issue body text kept per open issue for duplicate detection, e.g. 2000 '
+                             '(default: all; a cap lowers memory but changes similarity scores)')
+    args = parser.parse_args()
+
+    service = TriageService(workers=args.workers, webhook_secret=os.getenv('GITHUB_WEBHOOK_SECRET'),
+                            reserved_workers=args.reserved_workers, aging_seconds=args.aging_seconds,
+                            max_body_chars=args.max_body_chars)
+    asyncio.run(service.run(args.host, args.port, args.drain_timeout))
+
+
+if __name__ == "__main__":
+    main()
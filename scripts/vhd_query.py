@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Query the VHD release notes under vhd-notes/ through a local SQLite index.
+
+The index is brought up to date on every run; only new or changed notes are parsed.
+
+Usage:
+    python scripts/vhd_query.py containerd 2.0.0              # releases shipping containerd 2.0.0
+    python scripts/vhd_query.py kubelet 1.31.8 --first        # first release per distro with it
+    python scripts/vhd_query.py containerd --versions --distro AzureLinux
+    python scripts/vhd_query.py openssl --kind package --distro aks-ubuntu/AKSUbuntu-2204
+    python scripts/vhd_query.py --show Azurelinuxv3 202501.05.0 --kind component
+    python scripts/vhd_query.py runc --below 1.1.12              # images exposed to runc < 1.1.12
+    python scripts/vhd_query.py --diff AzureLinux 202504.27.0 202505.14.0 --kind package
+    python scripts/vhd_query.py --diff AzureLinux 202505.14.0 previous --raw   # line diff of the notes
+    python scripts/vhd_query.py --stats                          # index and chunk store sizes
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.image_diff import ImageDiffEngine, format_diff
+from src.package_exposure import PackageExposureIndex, format_exposure
+from src.vhd_notes import KINDS, VhdNotesIndex
+
+
+def format_release(row):
+    detail = f"  ({row['detail']})" if row['detail'] else ''
+    return (f"{row['distro']:<28} {row['image_version']:<20} {row['release_date']:<11} "
+            f"{row['kind']:<10} {row['version']}{detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Components, images and packages in VHD releases")
+    parser.add_argument('name', nargs='?', help='Component, binary, package or image repository')
+    parser.add_argument('version', nargs='?', help="Version; '1.31.8' also matches 1.31.8-akslts")
+    parser.add_argument('--kind', choices=KINDS)
+    parser.add_argument('--distro', help="Directory under vhd-notes, e.g. AzureLinux or aks-ubuntu")
+    parser.add_argument('--first', action='store_true', help='Only the first release per distro')
+    parser.add_argument('--versions', action='store_true', help='List every version of NAME')
+    parser.add_argument('--from', dest='low', metavar='VERSION', help='Images shipping NAME at this version or newer')
+    parser.add_argument('--below', dest='high', metavar='VERSION', help='Images shipping NAME older than this version')
+    parser.add_argument('--show', nargs=2, metavar=('DISTRO', 'IMAGE_VERSION'), help='Everything in one release')
+    parser.add_argument('--diff', nargs=3, metavar=('DISTRO', 'FROM', 'TO'),
+                        help="What changed between two releases; TO may be 'previous' to diff against the one before FROM")
+    parser.add_argument('--raw', action='store_true', help='With --diff, a line diff of the notes themselves')
+    parser.add_argument('--stats', action='store_true', help='Index size and note deduplication')
+    parser.add_argument('--db', default='vhd_notes.db')
+    parser.add_argument('--notes', default='vhd-notes')
+    args = parser.parse_args()
+
+    index = VhdNotesIndex(args.db, args.notes)
+    try:
+        started = time.perf_counter()
+        changes = index.update()
+        if changes['added'] or changes['updated'] or changes['removed']:
+            print(f"🗂️  Indexed {changes['added']} new, {changes['updated']} changed, "
+                  f"{changes['removed']} removed notes in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        started = time.perf_counter()
+        if args.diff:
+            distro, older, newer = args.diff
+            engine = ImageDiffEngine(index)
+            if newer == 'previous':
+                older, newer = engine.previous_release(distro, older), older
+                if older is None:
+                    parser.error(f"no release before {newer} for {distro}")
+            try:
+                if args.raw:
+                    print('\n'.join(index.note_diff(distro, older, newer)))
+                else:
+                    print(format_diff(engine.diff(distro, older, newer, [args.kind] if args.kind else None)))
+            except ValueError as e:
+                parser.error(str(e))
+        elif args.stats:
+            stats = index.stats()
+            chunks = stats.pop('chunks')
+            print(', '.join(f"{count} {table}" for table, count in stats.items()))
+            print(f"Notes: {chunks['raw_bytes'] / 1e6:.1f} MB in {chunks['chunk_refs']} chunks, "
+                  f"{chunks['unique_bytes'] / 1e6:.1f} MB in {chunks['unique_chunks']} unique, "
+                  f"{chunks['stored_bytes'] / 1e6:.1f} MB stored "
+                  f"({chunks['raw_bytes'] / max(chunks['stored_bytes'], 1):.1f}x)")
+        elif args.show:
+            for row in index.release_contents(*args.show, kind=args.kind):
+                print(f"{row.kind:<10} {row.name:<50} {row.version}")
+        elif not args.name:
+            parser.error("a NAME, --show, --diff or --stats is required")
+        elif args.low or args.high:
+            exposure = PackageExposureIndex(index).exposure(args.name, args.low, args.high)
+            print(format_exposure(exposure, limit=len(exposure)) or "No images in that range")
+        elif args.versions:
+            for version, count in index.versions_of(args.name, args.distro).items():
+                print(f"{version:<40} {count} releases")
+        elif args.first:
+            if not args.version:
+                parser.error("--first needs a VERSION")
+            for row in index.first_release_with(args.name, args.version, args.kind, args.distro).values():
+                print(format_release(row))
+        else:
+            for row in index.releases_with(args.name, args.version, args.kind, args.distro):
+                print(format_release(row))
+        print(f"⚡ {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
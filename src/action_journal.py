@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+ACTION_EDIT = 'edit'
+ACTION_COMMENT = 'comment'
+
+
+# Long enough to cover a run being resumed after a rate limit or cancellation
+DEFAULT_REPEAT_AFTER_DAYS = 3.0
+
+
+def content_hash(content) -> str:
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+class ActionJournal:
+    """
+    Append-only record of the writes made to each issue, keyed by (issue, action, content hash).
+
+    Every write is journaled as soon as GitHub accepts it, so a run that stops
+    halfway (rate limit, crash, cancelled job) can be started again and will
+    skip comments it already posted. Entries only suppress a repeat for
+    repeat_after_days; comments that belong to a lifecycle cycle (a stale
+    label, an investigation) also carry that cycle in their hash, so the same
+    text is posted again when the issue enters the next cycle.
+    """
+
+    def __init__(self, path: str = '.lifecycle_journal.jsonl',
+                 repeat_after_days: Optional[float] = DEFAULT_REPEAT_AFTER_DAYS):
+        self.path = path
+        # None keeps every entry for good (compaction still drops them after a year)
+        self.repeat_after = timedelta(days=repeat_after_days) if repeat_after_days is not None else None
+        self.entries: Dict[Tuple[int, str, str], datetime] = {}
+        self._lock = Lock()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write can leave a truncated last line
+                        continue
+                    self.entries[(entry['issue'], entry['action'], entry['hash'])] = datetime.fromisoformat(entry['at'])
+        self._file = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def seen(self, issue: int, action: str, digest: str) -> bool:
+        committed_at = self.entries.get((issue, action, digest))
+        if committed_at is None:
+            return False
+        return self.repeat_after is None or datetime.now(timezone.utc) - committed_at < self.repeat_after
+
+    def commit(self, issue: int, action: str, digest: str):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(json.dumps({'issue': issue, 'action': action, 'hash': digest,
+                                         'at': now.isoformat()}) + '\n')
+            self._file.flush()
+            self.entries[(issue, action, digest)] = now
+
+    def compact(self, max_age_days: Optional[float] = None):
+        """
+        Rewrite the journal with one line per key, dropping entries older than
+        max_age_days (by default the repeat window, as older entries no longer
+        suppress anything)
+        """
+        max_age = timedelta(days=max_age_days) if max_age_days is not None else self.repeat_after or timedelta(days=365)
+        cutoff = datetime.now(timezone.utc) - max_age
+        with self._lock:
+            self.close()
+            self.entries = {key: at for key, at in self.entries.items() if at >= cutoff}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                for (issue, action, digest), at in sorted(self.entries.items(), key=lambda item: item[1]):
+                    f.write(json.dumps({'issue': issue, 'action': action, 'hash': digest,
+                                        'at': at.isoformat()}) + '\n')
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,298 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from .action_journal import ACTION_COMMENT, ACTION_EDIT, content_hash
+
+COMMENT_SEPARATOR = "\n\n---\n\n"
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    # openai.RateLimitError and github.RateLimitExceededException, without importing either here
+    name = type(error).__name__
+    return 'RateLimit' in name or getattr(error, 'status', None) == 429
+
+
+@dataclass
+class IssueActionPlan:
+    """Pending writes for a single issue, coalesced into as few API calls as possible"""
+    issue_number: int
+    current_labels: List[str]
+    current_assignees: List[str]
+    current_state: str = 'open'
+    labels_to_add: List[str] = field(default_factory=list)
+    labels_to_remove: List[str] = field(default_factory=list)
+    assignees_to_add: List[str] = field(default_factory=list)
+    target_state: Optional[str] = None
+    comments: List[str] = field(default_factory=list)
+    # Lifecycle cycle a comment belongs to (e.g. when the stale label was added), part of its journal key
+    comment_cycles: Dict[str, str] = field(default_factory=dict)
+    # Why the plan exists (rules, commands, overrides); logged only once the writes go through
+    events: List[Dict] = field(default_factory=list)
+
+    @classmethod
+    def for_issue(cls, issue) -> 'IssueActionPlan':
+        """Create an empty plan from a PyGithub issue without extra API calls"""
+        return cls(
+            issue_number=issue.number,
+            current_labels=[label.name for label in issue.labels],
+            current_assignees=[a.login for a in issue.assignees],
+            current_state=issue.state
+        )
+
+    @classmethod
+    def for_record(cls, record) -> 'IssueActionPlan':
+        """Create an empty plan from a GraphQL IssueRecord snapshot"""
+        return cls(
+            issue_number=record.number,
+            current_labels=list(record.labels),
+            current_assignees=list(record.assignees),
+            current_state=record.state
+        )
+
+    def add_labels(self, *labels: str):
+        # GitHub label names are case-insensitive, so dedupe on the lowered name
+        known = {l.lower() for l in self.current_labels + self.labels_to_add}
+        for label in labels:
+            if label and label.lower() not in known:
+                self.labels_to_add.append(label)
+                known.add(label.lower())
+        removed = {l.lower() for l in labels if l}
+        self.labels_to_remove = [l for l in self.labels_to_remove if l.lower() not in removed]
+
+    def remove_labels(self, *labels: str):
+        current = {l.lower() for l in self.current_labels}
+        for label in labels:
+            lowered = label.lower()
+            self.labels_to_add = [l for l in self.labels_to_add if l.lower() != lowered]
+            if lowered in current and lowered not in {l.lower() for l in self.labels_to_remove}:
+                self.labels_to_remove.append(label)
+
+    def assign(self, *usernames: str):
+        known = {a.lower() for a in self.current_assignees + self.assignees_to_add}
+        for username in usernames:
+            username = username.lstrip('@')
+            if username and username.lower() not in known:
+                self.assignees_to_add.append(username)
+                known.add(username.lower())
+
+    def close(self):
+        self.set_state('closed')
+
+    def set_state(self, state: str):
+        self.target_state = None if state == self.current_state else state
+
+    def comment(self, body: str, cycle: str = ''):
+        if body and body not in self.comments:
+            self.comments.append(body)
+            if cycle:
+                self.comment_cycles[body] = cycle
+
+    def comment_hash(self, body: str) -> str:
+        """Journal key of a comment: its text, plus its cycle so a new cycle is not mistaken for a replay"""
+        cycle = self.comment_cycles.get(body)
+        return content_hash([body, cycle] if cycle else body)
+
+    def record(self, event: str, **fields):
+        self.events.append({'event': event, **fields})
+
+    @property
+    def needs_edit(self) -> bool:
+        return bool(self.labels_to_add or self.labels_to_remove or
+                    self.assignees_to_add or self.target_state)
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.needs_edit and not self.comments
+
+    @property
+    def api_calls(self) -> int:
+        """Number of write calls this plan will make when executed: one comment and one edit at most"""
+        return int(self.needs_edit) + int(bool(self.comments))
+
+    def merge(self, other: 'IssueActionPlan'):
+        """Fold another plan for the same issue into this one"""
+        self.add_labels(*other.labels_to_add)
+        self.remove_labels(*other.labels_to_remove)
+        self.assign(*other.assignees_to_add)
+        if other.target_state:
+            self.set_state(other.target_state)
+        for body in other.comments:
+            self.comment(body, other.comment_cycles.get(body, ''))
+        self.events.extend(other.events)
+
+    def describe(self) -> str:
+        if self.is_noop:
+            return f"#{self.issue_number}: no changes"
+        parts = []
+        if self.labels_to_add:
+            parts.append(f"+labels {', '.join(self.labels_to_add)}")
+        if self.labels_to_remove:
+            parts.append(f"-labels {', '.join(self.labels_to_remove)}")
+        if self.assignees_to_add:
+            parts.append(f"+assignees {', '.join(self.assignees_to_add)}")
+        if self.target_state:
+            parts.append(f"state={self.target_state}")
+        if self.comments:
+            parts.append(f"{len(self.comments)} comment(s)")
+        return f"#{self.issue_number}: {'; '.join(parts)} ({self.api_calls} API call(s))"
+
+
+class ActionPlanExecutor:
+    """
+    Applies issue action plans with bounded concurrency and counts the API calls used.
+
+    A plan's label, assignee and state changes go out as a single edit. The
+    labels and assignees it sends are the issue's current ones, re-read just
+    before writing (a conditional GET, free when nothing changed), with the
+    plan applied on top, so changes made since the plan's snapshot are kept.
+
+    With a journal, comments already posted to an issue are dropped from its
+    plan, every accepted write is journaled, and execute_all stops at the
+    first rate limit so the next run resumes from the journal. With an event
+    log, every fully applied plan is logged there.
+    """
+
+    def __init__(self, max_workers: int = 4, dry_run: bool = False, journal=None, events=None):
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+        self.journal = journal
+        self.events = events
+        self.api_calls = 0
+        self.refreshes = 0
+        self.skipped_noops = 0
+        self.skipped_journaled = 0
+        self.failures = 0
+        self.deferred = 0
+        self._lock = Lock()
+        self._rate_limited = False
+
+    def _count(self, calls: int = 1):
+        with self._lock:
+            self.api_calls += calls
+
+    def _drop_journaled_comments(self, plan: IssueActionPlan):
+        fresh = [body for body in plan.comments
+                 if not self.journal.seen(plan.issue_number, ACTION_COMMENT, plan.comment_hash(body))]
+        if len(fresh) != len(plan.comments):
+            with self._lock:
+                self.skipped_journaled += len(plan.comments) - len(fresh)
+            plan.comments = fresh
+
+    def _journal(self, plan: IssueActionPlan, action: str, content):
+        if self.journal is not None:
+            digest = plan.comment_hash(content) if action == ACTION_COMMENT else content_hash(content)
+            self.journal.commit(plan.issue_number, action, digest)
+
+    def _edit_fields(self, issue, plan: IssueActionPlan) -> Dict:
+        """Arguments of the plan's one edit call, built on the issue's labels and assignees as they are now"""
+        fields = {}
+        if plan.labels_to_add or plan.labels_to_remove or plan.assignees_to_add:
+            issue.update()
+            with self._lock:
+                self.refreshes += 1
+            labels = [label.name for label in issue.labels]
+            removed = {l.lower() for l in plan.labels_to_remove}
+            target = [l for l in labels if l.lower() not in removed]
+            present = {l.lower() for l in target}
+            target += [l for l in plan.labels_to_add if l.lower() not in present]
+            if target != labels:
+                fields['labels'] = target
+            assignees = [a.login for a in issue.assignees]
+            present = {a.lower() for a in assignees}
+            new = [a for a in plan.assignees_to_add if a.lower() not in present]
+            if new:
+                fields['assignees'] = assignees + new
+        if plan.target_state:
+            fields['state'] = plan.target_state
+        return fields
+
+    def execute(self, issue, plan: IssueActionPlan) -> int:
+        """Apply one plan: one comment call and one edit call at most"""
+        if self.journal is not None:
+            self._drop_journaled_comments(plan)
+
+        if plan.is_noop:
+            with self._lock:
+                self.skipped_noops += 1
+            return 0
+
+        if self.dry_run:
+            print(f"[dry-run] {plan.describe()}")
+            return 0
+
+        calls = 0
+        try:
+            # Comment before editing: rules key off the labels the edit adds, so if the run stops
+            # in between, the next run still matches the issue and only the edit is left to do
+            if plan.comments:
+                issue.create_comment(COMMENT_SEPARATOR.join(plan.comments))
+                calls += 1
+                for body in plan.comments:
+                    self._journal(plan, ACTION_COMMENT, body)
+
+            if plan.needs_edit:
+                fields = self._edit_fields(issue, plan)
+                if fields:
+                    calls += 1
+                    try:
+                        issue.edit(**fields)
+                    except Exception as e:
+                        if is_rate_limit_error(e) or 'assignees' not in fields:
+                            raise
+                        # Assignees without repo access are rejected; the rest of the plan still applies
+                        print(f"⚠️  Could not assign {', '.join(plan.assignees_to_add)}: {e}")
+                        plan.assignees_to_add = []
+                        del fields['assignees']
+                        if fields:
+                            calls += 1
+                            issue.edit(**fields)
+                self._journal(plan, ACTION_EDIT, {'add': plan.labels_to_add, 'remove': plan.labels_to_remove,
+                                                  'assignees': plan.assignees_to_add, 'state': plan.target_state})
+        finally:
+            # Count writes that went through even if a later one failed
+            self._count(calls)
+        if self.events is not None:
+            self.events.log_plan(plan)
+        return calls
+
+    def execute_all(self, items: List[Tuple[object, IssueActionPlan]]) -> Dict:
+        """Apply many plans concurrently and return a summary of the run"""
+        def run(item):
+            issue, plan = item
+            if self._rate_limited:
+                with self._lock:
+                    self.deferred += 1
+                return 0
+            try:
+                return self.execute(issue, plan)
+            except Exception as e:
+                with self._lock:
+                    if is_rate_limit_error(e) and self.journal is not None:
+                        # Writes so far are journaled; leave the rest for the next run
+                        if not self._rate_limited:
+                            print(f"⏳ Rate limited at #{plan.issue_number}, deferring remaining plans")
+                        self._rate_limited = True
+                        self.deferred += 1
+                        return 0
+                    self.failures += 1
+                print(f"❌ Failed to apply plan for #{plan.issue_number}: {e}")
+                return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(run, items))
+
+        return self.summary()
+
+    def summary(self) -> Dict:
+        summary = {
+            'api_calls': self.api_calls,
+            'refreshes': self.refreshes,
+            'skipped_noops': self.skipped_noops,
+            'failures': self.failures
+        }
+        if self.journal is not None:
+            summary['skipped_journaled_comments'] = self.skipped_journaled
+            summary['deferred'] = self.deferred
+        return summary
@@ -0,0 +1,371 @@
+import math
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+SECTION_ANNOUNCEMENTS = 'Announcements'
+SECTION_SERVICE_UPDATES = 'Important Service Updates'
+SECTION_PREVIEW = 'Preview Features'
+SECTION_FEATURES = 'Features'
+SECTION_BUG_FIXES = 'Bug Fixes'
+SECTION_BEHAVIOR = 'Behavioral Changes'
+SECTION_COMPONENTS = 'Component Updates'
+SECTION_OTHER = 'Release Notes'
+
+# Headings as written over the years, lower-cased without a trailing colon
+SECTION_ALIASES = {
+    'announcements': SECTION_ANNOUNCEMENTS,
+    'announcement': SECTION_ANNOUNCEMENTS,
+    'important service updates': SECTION_SERVICE_UPDATES,
+    'preview features': SECTION_PREVIEW,
+    'preview feature': SECTION_PREVIEW,
+    'features': SECTION_FEATURES,
+    'new features': SECTION_FEATURES,
+    'bug fixes': SECTION_BUG_FIXES,
+    'bug fix': SECTION_BUG_FIXES,
+    'behavioral changes': SECTION_BEHAVIOR,
+    'behavioral change': SECTION_BEHAVIOR,
+    'behavior changes': SECTION_BEHAVIOR,
+    'behavior change': SECTION_BEHAVIOR,
+    'component updates': SECTION_COMPONENTS,
+    'component update': SECTION_COMPONENTS,
+    'release notes': SECTION_OTHER,
+}
+
+RELEASE_PATTERN = re.compile(r'^## Release (\S+)')
+HEADING_PATTERN = re.compile(r'^###\s+(.+?)\s*$')
+BULLET_PATTERN = re.compile(r'^(\s*)[*-]\s+(.*)$')
+# Version-like tokens: 1.31.8, v1.1.12, 202505.14.0, 17763.7314.250518, 1.6.26-5.cm2
+VERSION_TOKEN_PATTERN = re.compile(r'(?<![\w.])v?(\d+\.\d+(?:\.\d+)*(?:-[\w.]*\w)?)(?![\w])')
+VHD_LINK_PATTERN = re.compile(r'vhd-notes/([\w./-]+?)/([\w.]+)\.txt')
+
+CHANGELOG_URL = 'https://github.com/Azure/AKS/blob/master/CHANGELOG.md'
+
+MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+URL_PATTERN = re.compile(r'https?://\S+')
+# Words, plus dotted numbers such as 18.04 or 1.27; bare numbers (dates, counts) are skipped
+WORD_PATTERN = re.compile(r'[a-z][a-z0-9+]*(?:[.-][a-z0-9+]+)*|\d+(?:\.\d+)+')
+STOPWORDS = frozenset('''
+    the and for with that this from are was were been has have had not but all any can will would could should
+    into when where which who what how its our your their there then than them they you use used using also may
+    now new aks azure kubernetes cluster clusters node nodes version versions issue issues please more see
+    available support supported release released update updated able after before only does doesn get
+'''.split())
+
+# Sections a known-fix reply can point to, and what it says about the entry
+RETIREMENT_TERMS = ('retire', 'deprecat', 'no longer', 'end of life', 'out of support', 'removed', 'will be blocked')
+FAST_PATH_SECTIONS = (SECTION_BUG_FIXES, SECTION_BEHAVIOR, SECTION_ANNOUNCEMENTS, SECTION_SERVICE_UPDATES)
+LEADING_LINK_PATTERN = re.compile(r'^\[([^\]]+)\]\(')
+LINK_OR_CODE_PATTERN = re.compile(r'\[([^\]]+)\]\(|`([^`]+)`')
+# A version right after a word ('Windows Server 2022', 'Ubuntu 18.04') is part of what is retired
+SUBJECT_VERSION_PATTERN = re.compile(r'([a-z][a-z0-9+-]*)\s+v?(\d+(?:\.\d+)*)(?![\w.])', re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r'(?<![\w.])v?(\d+(?:\.\d+)*)(?![\w])')
+SUBJECT_VERB_PATTERN = re.compile(r'\b(?:is|are|will|has|have|was|were|can|should|must)\b', re.IGNORECASE)
+SUBJECT_STOPWORDS = frozenset('''
+    january february march april june july august september october november december
+    starting start next previously announced begins began general week month
+    preview add-on addon open-source project
+'''.split())
+
+
+@dataclass
+class ChangelogEntry:
+    release: str
+    section: str
+    text: str
+    line: int
+    depth: int = 0
+
+    @property
+    def anchor(self) -> str:
+        return f"{CHANGELOG_URL}#release-{self.release.lower().replace('.', '')}"
+
+    @property
+    def is_retirement(self) -> bool:
+        lowered = self.text.lower()
+        return any(term in lowered for term in RETIREMENT_TERMS)
+
+
+@dataclass
+class KnownFix:
+    """A documented fix or retirement an issue matches, with every release that mentions it"""
+    entry: ChangelogEntry
+    score: float
+    matched_terms: List[str]
+    releases: List[str] = field(default_factory=list)
+
+    @property
+    def kind(self) -> str:
+        if self.entry.section == SECTION_BUG_FIXES:
+            return 'fix'
+        return 'retirement' if self.entry.is_retirement else 'change'
+
+
+def plain_text(text: str) -> str:
+    """Entry text with link targets and bare URLs dropped, keeping link labels"""
+    return URL_PATTERN.sub(' ', MARKDOWN_LINK_PATTERN.sub(r'\1', text))
+
+
+def terms(text: str) -> List[str]:
+    """Lower-cased words worth indexing, in order, stopwords and short words removed"""
+    return [word for word in WORD_PATTERN.findall(plain_text(text).lower())
+            if len(word) > 2 and word not in STOPWORDS]
+
+
+def _section_name(text: str) -> Optional[str]:
+    return SECTION_ALIASES.get(text.strip().rstrip(':').strip().lower())
+
+
+def parse_changelog(text: str) -> List[ChangelogEntry]:
+    """One entry per bullet (with its continuation lines), tagged with its release and section"""
+    entries: List[ChangelogEntry] = []
+    release, section, current = None, None, None
+    for number, line in enumerate(text.splitlines(), 1):
+        match = RELEASE_PATTERN.match(line)
+        if match:
+            release, section, current = match.group(1), SECTION_OTHER, None
+            continue
+        if release is None:
+            continue
+        match = HEADING_PATTERN.match(line)
+        if match:
+            section, current = _section_name(match.group(1)) or SECTION_OTHER, None
+            continue
+        match = BULLET_PATTERN.match(line)
+        if match:
+            heading = _section_name(match.group(2))
+            if heading and heading not in (SECTION_ANNOUNCEMENTS, SECTION_SERVICE_UPDATES):
+                section, current = heading, None
+                continue
+            current = ChangelogEntry(release, section, match.group(2).strip(), number,
+                                     depth=len(match.group(1).expandtabs(2)) // 2)
+            entries.append(current)
+        elif line.strip() and current is not None and not line.startswith('#'):
+            if not line[0].isspace() and current.text.endswith(('.', ')')):
+                # An unindented paragraph after a finished bullet is a new item written without its '*'
+                current = ChangelogEntry(release, section, line.strip(), number)
+                entries.append(current)
+            else:
+                current.text += ' ' + line.strip()
+        elif not line.strip():
+            current = None
+    return entries
+
+
+def version_tokens(text: str) -> List[str]:
+    return [match.group(1) for match in VERSION_TOKEN_PATTERN.finditer(text)]
+
+
+class ChangelogIndex:
+    """
+    CHANGELOG.md split into per-release, per-section entries, with version
+    tokens and linked node images mapped to the entries mentioning them.
+
+    An inverted index over the entries' words backs search(): entries
+    repeated across releases (announcements mostly) are indexed once, under
+    the newest copy, and remember every release that carried them.
+
+    Parsed on first use and re-parsed only when the file changes.
+    """
+
+    def __init__(self, path: str = 'CHANGELOG.md'):
+        self.path = path
+        self.entries: List[ChangelogEntry] = []
+        self.releases: List[str] = []
+        self.by_version: Dict[str, List[int]] = {}
+        self.by_image: Dict[Tuple[str, str], List[int]] = {}
+        self.postings: Dict[str, List[int]] = {}
+        self.idf: Dict[str, float] = {}
+        self.copies: Dict[int, List[int]] = {}
+        self._norms: Dict[int, float] = {}
+        self._subjects: Dict[int, frozenset] = {}
+        self._subject_idf: Dict[str, float] = {}
+        self._stamp = None
+        self.timings = {'build_ms': 0.0, 'lookups': 0, 'lookup_ms': 0.0, 'max_lookup_ms': 0.0}
+
+    def load(self) -> 'ChangelogIndex':
+        if not os.path.exists(self.path):
+            return self
+        stat = os.stat(self.path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp == self._stamp:
+            return self
+        started = time.perf_counter()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.entries = parse_changelog(f.read())
+        self._stamp = stamp
+        self._build()
+        self.timings['build_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return self
+
+    def _build(self):
+        self.releases = list(dict.fromkeys(entry.release for entry in self.entries))
+        self.by_version, self.by_image, self.postings, self.copies = {}, {}, {}, {}
+        entry_terms: Dict[int, frozenset] = {}
+        first_copy: Dict[str, int] = {}
+        for position, entry in enumerate(self.entries):
+            for token in dict.fromkeys(version_tokens(entry.text)):
+                self.by_version.setdefault(token, []).append(position)
+            for distro, image_version in VHD_LINK_PATTERN.findall(entry.text):
+                self.by_image.setdefault((distro, image_version), []).append(position)
+
+            words = terms(entry.text)
+            key = ' '.join(words)
+            if not words:
+                continue
+            if key in first_copy:
+                self.copies[first_copy[key]].append(position)
+                continue
+            first_copy[key] = position
+            self.copies[position] = [position]
+            entry_terms[position] = frozenset(words)
+            for word in entry_terms[position]:
+                self.postings.setdefault(word, []).append(position)
+
+        total = len(entry_terms)
+        self.idf = {word: math.log((total + 1) / (len(ids) + 0.5)) for word, ids in self.postings.items()}
+        self._norms = {position: math.sqrt(sum(self.idf[word] ** 2 for word in words))
+                       for position, words in entry_terms.items()}
+        # Subjects are weighed against announcements and fixes only: node image
+        # bumps mention 'ubuntu 18.04' hundreds of times, retirements a handful
+        eligible = [p for p in entry_terms if self.entries[p].section in FAST_PATH_SECTIONS]
+        frequency: Dict[str, int] = {}
+        for position in eligible:
+            for word in entry_terms[position]:
+                frequency[word] = frequency.get(word, 0) + 1
+        self._subject_idf = {word: math.log((len(eligible) + 1) / (count + 0.5)) for word, count in frequency.items()}
+        self._subjects = {}
+        for position in eligible:
+            entry = self.entries[position]
+            if entry.section != SECTION_BUG_FIXES and entry.is_retirement:
+                subject = self._subject(entry.text)
+                if subject:
+                    self._subjects[position] = subject
+
+    def _subject(self, text: str) -> frozenset:
+        """
+        What a retirement entry is about: its leading link label ('[Teleport
+        (preview)](...) will be retired'), else the words before the first
+        verb, else the first link or code span of the first sentence.
+        """
+        def distinctive(head):
+            words = [word for word in terms(head)
+                     if word not in SUBJECT_STOPWORDS and self._subject_idf.get(word, 0) >= 2.5]
+            # Bare numbers are not indexed, but 'server 2022' must not match 'server 2019'
+            versions = [number for word, number in SUBJECT_VERSION_PATTERN.findall(plain_text(head))
+                        if len(word) > 2 and word.lower() not in SUBJECT_STOPWORDS | STOPWORDS
+                        and number not in words]
+            return words + versions if words else words
+
+        sentence = text.split('. ')[0]
+        lead = LEADING_LINK_PATTERN.match(text)
+        if lead:
+            words = distinctive(lead.group(1))
+        else:
+            verb = SUBJECT_VERB_PATTERN.search(plain_text(sentence))
+            words = distinctive(plain_text(sentence)[:verb.start()]) if verb else []
+            if not any(word[0].isalpha() for word in words):
+                span = LINK_OR_CODE_PATTERN.search(sentence)
+                words = distinctive(span.group(1) or span.group(2)) if span else []
+        # Version numbers alone ('1.26 is removed') are too common in issues to answer on
+        return frozenset(words) if any(word[0].isalpha() for word in words) else frozenset()
+
+    def mentions(self, version: str, sections: Optional[Tuple[str, ...]] = None) -> List[ChangelogEntry]:
+        """Entries naming `version` (a leading v is ignored), newest release first"""
+        self.load()
+        version = version[1:] if version[:1] == 'v' else version
+        return [self.entries[i] for i in self.by_version.get(version, [])
+                if sections is None or self.entries[i].section in sections]
+
+    def _scores(self, text: str, sections: Optional[Tuple[str, ...]] = None) -> Dict[int, Tuple[float, List[str]]]:
+        query = {word for word in terms(text) if word in self.idf}
+        query_norm = math.sqrt(sum(self.idf[word] ** 2 for word in query))
+        matched: Dict[int, List[str]] = {}
+        for word in query:
+            for position in self.postings.get(word, ()):
+                matched.setdefault(position, []).append(word)
+
+        scores = {}
+        for position, words in matched.items():
+            if sections is not None and self.entries[position].section not in sections:
+                continue
+            score = sum(self.idf[word] ** 2 for word in words) / (self._norms[position] * query_norm)
+            scores[position] = (round(score, 3), sorted(words, key=lambda w: -self.idf[w]))
+        return scores
+
+    def search(self, text: str, sections: Optional[Tuple[str, ...]] = None,
+               limit: int = 5) -> List[Tuple[float, int, List[str]]]:
+        """
+        (score, entry position, matched words) for the entries sharing the
+        most distinctive words with the text, scored by idf-weighted cosine
+        similarity. Words the changelog never uses do not count against the
+        text.
+        """
+        self.load()
+        scored = [(score, position, words) for position, (score, words) in self._scores(text, sections).items()]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+    def known_fix(self, text: str, min_fix_score: float = 0.5, min_subject_weight: float = 6.0,
+                  min_retirement_score: float = 0.1) -> Optional[KnownFix]:
+        """
+        The bug fix or retirement the text clearly refers to, or None.
+
+        A bug fix must score at least `min_fix_score` over three or more
+        shared words, one of them rare (idf >= 5). A retirement matches when
+        the text asks about a retirement, names everything it retires (its
+        subject with its version, e.g. 'teleport' or 'ubuntu 18.04'), that
+        subject is distinctive enough and the entry scores at least
+        `min_retirement_score`; the newest such announcement wins and lists
+        every release repeating it.
+        """
+        self.load()
+        started = time.perf_counter()
+        scores = self._scores(text, FAST_PATH_SECTIONS)
+        candidates = []
+
+        for position, (score, words) in scores.items():
+            if self.entries[position].section != SECTION_BUG_FIXES:
+                continue
+            if score >= min_fix_score and len(words) >= 3 and self.idf[words[0]] >= 5.0:
+                candidates.append((score, position, words, self.copies[position]))
+
+        lowered = text.lower()
+        query = set(terms(text)) | set(NUMBER_PATTERN.findall(lowered))
+        # An issue merely running an old OS is not asking about its retirement
+        asks_retirement = any(term in lowered for term in RETIREMENT_TERMS + ('unsupported', 'end of support'))
+        for position, subject in self._subjects.items():
+            if not asks_retirement:
+                break
+            if position not in scores or not subject <= query or scores[position][0] < min_retirement_score:
+                continue
+            if sum(self._subject_idf.get(word, 0) for word in subject) < min_subject_weight:
+                continue
+            group = [p for p, other in self._subjects.items() if other == subject]
+            candidates.append((scores[position][0], min(group), sorted(subject),
+                               [i for p in group for i in self.copies[p]]))
+
+        found = None
+        if candidates:
+            score, position, words, copies = max(candidates, key=lambda item: (item[0], -item[1]))
+            found = KnownFix(self.entries[position], score, words,
+                             sorted({self.entries[i].release for i in copies}))
+        elapsed = (time.perf_counter() - started) * 1000
+        self.timings['lookups'] += 1
+        self.timings['lookup_ms'] += elapsed
+        self.timings['max_lookup_ms'] = max(self.timings['max_lookup_ms'], elapsed)
+        return found
+
+    def stats(self) -> str:
+        lookups = self.timings['lookups']
+        average = self.timings['lookup_ms'] / lookups if lookups else 0.0
+        return (f"{len(self.entries)} entries in {len(self.releases)} releases indexed in "
+                f"{self.timings['build_ms']} ms; {lookups} lookups, avg {average:.2f} ms, "
+                f"max {self.timings['max_lookup_ms']:.2f} ms")
+
+    def image_releases(self, distro: str, image_version: str) -> List[ChangelogEntry]:
+        """Entries linking to one node image's release notes"""
+        self.load()
+        return [self.entries[i] for i in self.by_image.get((distro, image_version), [])]
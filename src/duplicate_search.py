@@ -0,0 +1,141 @@
+import math
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .action_plan import is_rate_limit_error
+from .changelog_index import terms
+from .issue_classifier import keyword_area_labels
+from .issue_corpus import CorpusIssue
+
+# GitHub allows 30 search requests a minute per authenticated user
+SEARCH_CALLS_PER_MINUTE = 30
+# Longer queries are rejected outright
+MAX_QUERY_CHARS = 256
+# The issues listing endpoint pages 30 at a time unless told otherwise
+LISTING_PAGE_SIZE = 30
+
+# Same error capture as IssueClassifier.find_similar_issues
+ERROR_PATTERN = re.compile(r'error[:\s]+([^\n]+)', re.IGNORECASE)
+PHRASE_CHARS = re.compile(r'[^\w./:-]+')
+
+
+class SearchRateLimiter:
+    """Sliding one-minute window over search calls, shared by every worker thread"""
+
+    def __init__(self, per_minute: int = SEARCH_CALLS_PER_MINUTE):
+        self.per_minute = per_minute
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= 60:
+                    self._calls.popleft()
+                if len(self._calls) < self.per_minute:
+                    self._calls.append(now)
+                    return
+                wait = 60 - (now - self._calls[0])
+            time.sleep(wait)
+
+
+def error_phrase(body: str, max_words: int = 8) -> Optional[str]:
+    """The first quoted error message, cut to a phrase GitHub search can match exactly"""
+    for match in ERROR_PATTERN.finditer(body):
+        words = PHRASE_CHARS.sub(' ', match.group(1)).split()[:max_words]
+        if len(words) >= 3:
+            return ' '.join(words)
+    return None
+
+
+def build_search_queries(issue: Dict, repo_name: str, max_terms: int = 4) -> List[str]:
+    """
+    A few narrow searches for possible duplicates: the error message as a
+    phrase, the title's key terms, and those terms within each keyword area
+    label. Each is scoped to open issues of the repository.
+    """
+    title, body = issue['title'], issue.get('body') or ''
+    scope = f"repo:{repo_name} is:issue is:open"
+    key_terms = list(dict.fromkeys(terms(title)))[:max_terms]
+    if len(key_terms) < 2:
+        key_terms = list(dict.fromkeys(key_terms + terms(body)))[:max_terms]
+
+    queries = []
+    phrase = error_phrase(body)
+    if phrase:
+        queries.append(f'{scope} in:body "{phrase}"')
+    if key_terms:
+        queries.append(f"{scope} in:title,body {' '.join(key_terms)}")
+        # Any one of them in the title, best matches first, for titles worded differently
+        if len(key_terms) > 2:
+            queries.append(f"{scope} in:title {' OR '.join(key_terms)}")
+        for label in keyword_area_labels(f"{title} {body}".lower(), limit=2):
+            queries.append(f'{scope} label:"{label}" {" ".join(key_terms[:2])}')
+    return [query[:MAX_QUERY_CHARS] for query in queries]
+
+
+class DuplicateCandidateSearch:
+    """
+    Shortlists possible duplicates of an issue with a few GitHub searches
+    instead of listing every open issue.
+
+    The searches run concurrently, each one page of at most `per_query`
+    results, within the search API's per-minute limit. The union of the
+    results goes to IssueClassifier.find_similar_issues as CorpusIssue
+    records. `stats` compares the calls and time spent with what listing all
+    open issues would have cost.
+    """
+
+    def __init__(self, github, repo, per_query: int = 10, max_queries: int = 5, workers: int = 4,
+                 limiter: Optional[SearchRateLimiter] = None):
+        self.github = github
+        self.repo = repo
+        self.per_query = per_query
+        self.max_queries = max_queries
+        self.workers = workers
+        self.limiter = limiter or SearchRateLimiter()
+        self.stats = {'searches': 0, 'search_calls': 0, 'failed': 0, 'candidates': 0, 'elapsed_ms': 0.0,
+                      'listing_calls': 0}
+
+    def _search(self, query: str) -> List:
+        self.limiter.acquire()
+        # One page is one request; later pages are never fetched
+        return list(self.github.search_issues(query).get_page(0))[:self.per_query]
+
+    def candidates(self, issue: Dict) -> List[CorpusIssue]:
+        """Open issues matching any of the searches for `issue`, excluding itself"""
+        started = time.perf_counter()
+        queries = build_search_queries(issue, self.repo.full_name)[:self.max_queries]
+        found: Dict[int, CorpusIssue] = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(queries)))) as pool:
+            futures = [pool.submit(self._search, query) for query in queries]
+            for future in futures:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                for result in results:
+                    if result.number != issue['id'] and result.number not in found:
+                        found[result.number] = CorpusIssue(result.number, result.title, result.body or '')
+
+        if queries and len(errors) == len(queries):
+            # Nothing came back; let the caller fall back to listing
+            raise errors[0]
+        for error in errors:
+            print(f"⚠️  Duplicate search failed{' (rate limited)' if is_rate_limit_error(error) else ''}: {error}")
+
+        self.stats['searches'] += 1
+        self.stats['search_calls'] += len(queries)
+        self.stats['failed'] += len(errors)
+        self.stats['candidates'] += len(found)
+        self.stats['elapsed_ms'] = round(self.stats['elapsed_ms'] + (time.perf_counter() - started) * 1000, 1)
+        # Listing open issues pages through pull requests too, as open_issues_count does
+        self.stats['listing_calls'] += max(1, math.ceil(self.repo.open_issues_count / LISTING_PAGE_SIZE))
+        return list(found.values())
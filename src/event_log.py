@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .github_graphql import parse_timestamp
+
+EVENT_CLASSIFIED = 'classified'
+EVENT_OVERRIDE = 'override'
+EVENT_COMMAND = 'command'
+EVENT_RULE = 'rule'
+EVENT_LABELED = 'labeled'
+EVENT_ASSIGNED = 'assigned'
+EVENT_STALE_MARKED = 'stale_marked'
+EVENT_CLOSED = 'closed'
+EVENT_COMMENTED = 'commented'
+
+# events-000012.jsonl, or events-000012-<writer>.jsonl for a named writer
+SEGMENT_PATTERN = re.compile(r'events-(\d+)(?:-([\w.-]+))?\.jsonl$')
+# Scheduled runs name themselves so each one only ever appends to its own segments
+WRITER_ENV = 'TRIAGE_EVENTS_WRITER'
+# Writer name of the segment compact() merges a week into, after the week's Monday
+WEEK_WRITER = 'week-{}'
+
+
+def event_cause(event: Dict) -> str:
+    """Rule or command behind a recorded plan event"""
+    return event.get('rule') or event.get('command') or event['event']
+
+
+class EventLog:
+    """
+    Append-only log of what the triage bot did, one JSON event per line.
+
+    Events go to numbered segment files in `directory`; once a segment passes
+    `segment_bytes` the next write starts a new one, so old segments are never
+    rewritten and can be archived or deleted as a whole. Every event carries
+    `at` (UTC ISO timestamp), `event` and `issue`.
+
+    With a `writer` (by default $TRIAGE_EVENTS_WRITER), segments are named
+    after it and only its own are appended to, so the segments of concurrent
+    runs can be merged into one directory without touching each other.
+
+    Every run adds at least one segment, so compact() merges the segments of
+    each finished week into a single one; the weekly analytics job runs it on
+    the triage-events branch (see scripts/event_log_branch.py).
+    """
+
+    def __init__(self, directory: str = '.triage_events', segment_bytes: int = 8 * 1024 * 1024,
+                 writer: Optional[str] = None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.writer = writer or os.getenv(WRITER_ENV) or None
+        self._lock = Lock()
+        self._file = None
+        self._segment = None
+
+    def segments(self) -> List[str]:
+        """Segment paths of every writer, by number"""
+        paths = glob.glob(os.path.join(self.directory, 'events-*.jsonl'))
+        return sorted((p for p in paths if SEGMENT_PATTERN.search(p)),
+                      key=lambda p: (int(SEGMENT_PATTERN.search(p).group(1)), p))
+
+    def own_segments(self) -> List[str]:
+        """Segments this log's writer appends to"""
+        return [p for p in self.segments() if SEGMENT_PATTERN.search(p).group(2) == self.writer]
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self.segments()
+        own = self.own_segments()
+        if own and os.path.getsize(own[-1]) < self.segment_bytes:
+            path = own[-1]
+        else:
+            number = int(SEGMENT_PATTERN.search(segments[-1]).group(1)) + 1 if segments else 1
+            suffix = f'-{self.writer}' if self.writer else ''
+            path = os.path.join(self.directory, f'events-{number:06d}{suffix}.jsonl')
+        self._segment = path
+        self._file = open(path, 'a')
+
+    def emit(self, event: str, issue: int, at: Optional[datetime] = None, **fields):
+        """Append one event, flushed straight away so a crash loses at most the line being written"""
+        record = {'at': (at or datetime.now(timezone.utc)).isoformat(), 'event': event, 'issue': issue, **fields}
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                self.close()
+                self._open_segment()
+            self._file.write(line)
+            self._file.flush()
+
+    def log_plan(self, plan):
+        """Log an applied IssueActionPlan: the events it recorded, then the writes it made"""
+        for event in plan.events:
+            self.emit(event['event'], plan.issue_number,
+                      **{k: v for k, v in event.items() if k != 'event'})
+
+        causes = sorted({event_cause(event) for event in plan.events})
+        if plan.labels_to_add or plan.labels_to_remove:
+            self.emit(EVENT_LABELED, plan.issue_number, added=plan.labels_to_add,
+                      removed=plan.labels_to_remove, causes=causes)
+        if any(label.lower() == 'stale' for label in plan.labels_to_add):
+            self.emit(EVENT_STALE_MARKED, plan.issue_number, causes=causes)
+        if plan.assignees_to_add:
+            self.emit(EVENT_ASSIGNED, plan.issue_number, assignees=plan.assignees_to_add, causes=causes)
+        if plan.target_state == 'closed':
+            self.emit(EVENT_CLOSED, plan.issue_number, causes=causes)
+        if plan.comments:
+            self.emit(EVENT_COMMENTED, plan.issue_number, comments=len(plan.comments), causes=causes)
+
+    def _segment_start(self, path: str) -> Optional[datetime]:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    return parse_timestamp(json.loads(line)['at'])
+                except (ValueError, KeyError):
+                    continue
+        return None
+
+    def _segment_end(self, path: str, tail_bytes: int = 64 * 1024) -> Optional[datetime]:
+        with open(path, 'rb') as f:
+            f.seek(max(0, os.path.getsize(path) - tail_bytes))
+            for line in reversed(f.read().splitlines()):
+                try:
+                    return parse_timestamp(json.loads(line)['at'])
+                except (ValueError, KeyError):
+                    continue
+        return None
+
+    def iter_events(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    types: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Events segment by segment, segments in the order they were started,
+        with `at` parsed; segments that end before `start` are not read.
+        Segments of concurrent writers overlap in time.
+        """
+        types = set(types) if types else None
+        starts = {path: self._segment_start(path) for path in self.segments()}
+        epoch = datetime.min.replace(tzinfo=timezone.utc)
+        for path in sorted(starts, key=lambda p: starts[p] or epoch):
+            if start is not None:
+                segment_end = self._segment_end(path)
+                if segment_end is not None and segment_end < start:
+                    continue
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write can leave a truncated last line
+                        continue
+                    if types is not None and event.get('event') not in types:
+                        continue
+                    event['at'] = parse_timestamp(event['at'])
+                    if start is not None and event['at'] < start:
+                        continue
+                    if end is not None and event['at'] > end:
+                        continue
+                    yield event
+
+    def compact(self, before: datetime) -> Dict[str, List[str]]:
+        """
+        Merge the segments of every week (Monday to Monday, UTC) that ended
+        by `before` into one segment named after the week, events in time
+        order; a segment belongs to the week of its first event, and one that
+        arrives late is merged into its week's segment on the next run.
+        Truncated lines are dropped. Returns {merged segment: replaced segments}.
+        """
+        weeks: Dict[str, List[str]] = {}
+        for path in self.segments():
+            started = self._segment_start(path)
+            if started is None:
+                continue
+            started = started.astimezone(timezone.utc)
+            monday = (started - timedelta(days=started.weekday())).date()
+            if datetime.combine(monday, datetime.min.time(), timezone.utc) + timedelta(weeks=1) <= before:
+                weeks.setdefault(monday.isoformat(), []).append(path)
+
+        merged = {}
+        for monday, paths in weeks.items():
+            if len(paths) < 2:
+                continue
+            events = []
+            for path in paths:
+                with open(path, 'r') as f:
+                    for line in f:
+                        try:
+                            events.append((parse_timestamp(json.loads(line)['at']), line.rstrip('\n') + '\n'))
+                        except (ValueError, KeyError):
+                            continue
+            number = min(int(SEGMENT_PATTERN.search(path).group(1)) for path in paths)
+            target = os.path.join(self.directory, f'events-{number:06d}-{WEEK_WRITER.format(monday)}.jsonl')
+            with open(f"{target}.tmp", 'w') as f:
+                f.writelines(line for _, line in sorted(events, key=lambda event: event[0]))
+            for path in paths:
+                os.remove(path)
+            os.replace(f"{target}.tmp", target)
+            merged[target] = paths
+        return merged
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
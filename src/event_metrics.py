@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from .event_log import (EVENT_CLASSIFIED, EVENT_CLOSED, EVENT_LABELED, EVENT_OVERRIDE, EventLog)
+from .metrics_history import percentile
+
+# Upper bounds of the confidence buckets in the accuracy report
+CONFIDENCE_BUCKETS = (0.5, 0.7, 0.8, 0.9, 1.0)
+
+
+def confidence_bucket(confidence: float) -> str:
+    lower = 0.0
+    for upper in CONFIDENCE_BUCKETS:
+        if confidence <= upper:
+            return f"{lower:.1f}-{upper:.1f}"
+        lower = upper
+    return f"{lower:.1f}-{CONFIDENCE_BUCKETS[-1]:.1f}"
+
+
+def _percentiles(values: List[float], points: Iterable[float] = (50, 90, 99)) -> Dict:
+    ordered = sorted(values)
+    result = {'count': len(ordered)}
+    result.update({f"p{p:g}": percentile(ordered, p) for p in points})
+    return result
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 1) if whole else 0.0
+
+
+def weekly_metrics(log: EventLog, start: datetime, end: datetime) -> Dict:
+    """
+    The weekly metrics from the event log alone, in the shape IssueFactStore.weekly_metrics returns.
+
+    Only what the bot did is in the log, so closures count bot closures and
+    first response is the time from an issue being opened to its triage.
+    Overrides made after `end` still count against the week's classifications.
+    """
+    metrics = {
+        'period': f"{start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}",
+        'issues_created': 0,
+        'issues_closed': 0,
+        'ai_classifications': defaultdict(int),
+        'human_overrides': 0,
+        'average_time_to_first_response': [],
+        'issues_by_area': defaultdict(int),
+        'cri_issues': 0,
+        'duplicate_issues': 0,
+        'stale_closures': 0,
+        'repair_items_created': 0
+    }
+
+    # Latest classification per issue, so a re-triage replaces the earlier result
+    classified: Dict[int, Dict] = {}
+    overridden = set()
+    cri, duplicates = set(), set()
+
+    for event in log.iter_events(start=start):
+        kind, issue = event['event'], event['issue']
+        in_week = event['at'] <= end
+        if kind == EVENT_OVERRIDE:
+            overridden.add(issue)
+            if in_week:
+                metrics['human_overrides'] += 1
+        if not in_week:
+            continue
+
+        if kind == EVENT_CLASSIFIED:
+            # Segments of concurrent runs overlap, so compare times rather than trusting read order
+            if issue not in classified or event['at'] >= classified[issue]['at']:
+                classified[issue] = event
+        elif kind == EVENT_LABELED:
+            added = {label.lower() for label in event.get('added', [])}
+            if 'cri' in added:
+                cri.add(issue)
+            if 'duplicate' in added:
+                duplicates.add(issue)
+            if 'needs-repair-item' in added:
+                metrics['repair_items_created'] += 1
+        elif kind == EVENT_CLOSED:
+            metrics['issues_closed'] += 1
+            if 'close-stale' in event.get('causes', []):
+                metrics['stale_closures'] += 1
+
+    response_times = []
+    for issue, event in classified.items():
+        metrics['issues_created'] += 1
+        metrics['ai_classifications'][event['classification'].lower()] += 1
+        metrics['issues_by_area'][event.get('primary_area') or 'other'] += 1
+        if event.get('is_cri'):
+            cri.add(issue)
+        if event['classification'] == 'DUPLICATE':
+            duplicates.add(issue)
+        if event.get('response_minutes') is not None:
+            response_times.append(event['response_minutes'])
+    metrics['cri_issues'] = len(cri)
+    metrics['duplicate_issues'] = len(duplicates)
+
+    if response_times:
+        metrics['average_time_to_first_response'] = f"{sum(response_times) / len(response_times):.1f} minutes"
+    else:
+        metrics['average_time_to_first_response'] = "No data"
+    metrics['first_response_percentiles'] = _percentiles(response_times)
+    metrics['accuracy'] = accuracy_report(classified.values(), overridden)
+    return metrics
+
+
+def accuracy_report(classifications: Iterable[Dict], overridden: Iterable[int]) -> Dict:
+    """Override rates by classification and confidence bucket, and classifier latency"""
+    overridden = set(overridden)
+    by_classification = defaultdict(lambda: {'count': 0, 'overridden': 0})
+    by_confidence = defaultdict(lambda: {'count': 0, 'overridden': 0})
+    latencies = []
+    total = overrides = 0
+
+    for event in classifications:
+        was_overridden = event['issue'] in overridden
+        total += 1
+        overrides += was_overridden
+        for bucket in (by_classification[event['classification']],
+                       by_confidence[confidence_bucket(event.get('confidence', 0.0))]):
+            bucket['count'] += 1
+            bucket['overridden'] += was_overridden
+        if event.get('latency_ms') is not None:
+            latencies.append(event['latency_ms'])
+
+    for bucket in list(by_classification.values()) + list(by_confidence.values()):
+        bucket['accuracy'] = _rate(bucket['count'] - bucket['overridden'], bucket['count'])
+
+    return {
+        'classifications': total,
+        'overridden': overrides,
+        'accuracy': _rate(total - overrides, total),
+        'by_classification': dict(sorted(by_classification.items())),
+        'by_confidence': dict(sorted(by_confidence.items())),
+        'latency_ms': _percentiles(latencies, (50, 95))
+    }
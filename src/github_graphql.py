@@ -0,0 +1,333 @@
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# GitHub caps every connection at 100 nodes per page
+MAX_PAGE_SIZE = 100
+MIN_PAGE_SIZE = 5
+
+ISSUE_FIELDS = """
+        id
+        number
+        title
+        body
+        state
+        createdAt
+        updatedAt
+        closedAt
+        author { login }
+        labels(first: 50) { nodes { name } }
+        assignees(first: 10) { nodes { login } }
+        comments(first: $commentsPerIssue) {
+          totalCount
+          pageInfo { hasNextPage endCursor }
+          nodes { databaseId author { login } authorAssociation createdAt body }
+        }
+        timelineItems(first: $eventsPerIssue, itemTypes: [LABELED_EVENT, UNLABELED_EVENT]) {
+          pageInfo { hasNextPage endCursor }
+          nodes {
+            __typename
+            ... on LabeledEvent { createdAt actor { login } label { name } }
+            ... on UnlabeledEvent { createdAt actor { login } label { name } }
+          }
+        }
+        closedBy: timelineItems(last: 1, itemTypes: [CLOSED_EVENT]) {
+          nodes { ... on ClosedEvent { actor { __typename login } } }
+        }
+"""
+
+ISSUES_QUERY = """
+query($owner: String!, $name: String!, $pageSize: Int!, $cursor: String,
+      $states: [IssueState!], $labels: [String!], $since: DateTime,
+      $commentsPerIssue: Int!, $eventsPerIssue: Int!) {
+  rateLimit { cost remaining resetAt }
+  repository(owner: $owner, name: $name) {
+    issues(first: $pageSize, after: $cursor, states: $states, labels: $labels,
+           filterBy: {since: $since}, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes {""" + ISSUE_FIELDS + """
+      }
+    }
+  }
+}
+"""
+
+MORE_COMMENTS_QUERY = """
+query($id: ID!, $cursor: String) {
+  rateLimit { cost remaining resetAt }
+  node(id: $id) {
+    ... on Issue {
+      comments(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { databaseId author { login } authorAssociation createdAt body }
+      }
+    }
+  }
+}
+"""
+
+MORE_EVENTS_QUERY = """
+query($id: ID!, $cursor: String) {
+  rateLimit { cost remaining resetAt }
+  node(id: $id) {
+    ... on Issue {
+      timelineItems(first: 100, after: $cursor, itemTypes: [LABELED_EVENT, UNLABELED_EVENT]) {
+        pageInfo { hasNextPage endCursor }
+        nodes {
+          __typename
+          ... on LabeledEvent { createdAt actor { login } label { name } }
+          ... on UnlabeledEvent { createdAt actor { login } label { name } }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _login(node: Optional[Dict]) -> str:
+    # Deleted accounts come back as a null actor
+    return node['login'] if node else 'ghost'
+
+
+def _closer(node: Dict) -> str:
+    """Who closed the issue last, with the REST API's '[bot]' suffix for apps; '' while open"""
+    events = (node.get('closedBy') or {}).get('nodes') or []
+    if not events or not events[-1]:
+        return ''
+    actor = events[-1].get('actor')
+    return _login(actor) + ('[bot]' if actor and actor.get('__typename') == 'Bot' else '')
+
+
+@dataclass
+class CommentRecord:
+    id: int
+    author: str
+    author_association: str
+    created_at: datetime
+    body: str
+
+
+@dataclass
+class LabelEvent:
+    event: str  # 'labeled' or 'unlabeled'
+    label: str
+    actor: str
+    created_at: datetime
+
+
+@dataclass
+class IssueRecord:
+    number: int
+    title: str
+    body: str
+    state: str
+    author: str
+    created_at: datetime
+    updated_at: datetime
+    closed_at: Optional[datetime]
+    labels: List[str] = field(default_factory=list)
+    assignees: List[str] = field(default_factory=list)
+    comments: List[CommentRecord] = field(default_factory=list)
+    label_events: List[LabelEvent] = field(default_factory=list)
+    node_id: str = ''
+    closed_by: str = ''
+
+    @property
+    def closed_by_bot(self) -> bool:
+        return self.closed_by.endswith('[bot]')
+
+    def has_label(self, name: str) -> bool:
+        return name.lower() in (l.lower() for l in self.labels)
+
+    def labeled_at(self, name: str, first: bool = True) -> Optional[datetime]:
+        """When a label was added, oldest occurrence by default"""
+        times = [e.created_at for e in self.label_events
+                 if e.event == 'labeled' and e.label.lower() == name.lower()]
+        if not times:
+            return None
+        return times[0] if first else times[-1]
+
+
+class GraphQLBulkFetcher:
+    """Fetches issues with labels, comments and label events in a few large GraphQL pages"""
+
+    def __init__(self, repo_name: str = 'naman-msft/AKS', token: Optional[str] = None,
+                 max_cost_per_query: int = 10, comments_per_issue: int = 50,
+                 events_per_issue: int = 20):
+        self.owner, self.name = repo_name.split('/')
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"bearer {token or os.getenv('GITHUB_TOKEN')}"
+        self.max_cost_per_query = max_cost_per_query
+        self.comments_per_issue = comments_per_issue
+        self.events_per_issue = events_per_issue
+        self.page_size = self._page_size_for_budget()
+        self.request_count = 0
+        self.total_cost = 0
+        self.rate_remaining = None
+        self.rate_reset_at: Optional[datetime] = None
+        self.total_count = None
+
+    def _page_size_for_budget(self) -> int:
+        """Largest page whose estimated point cost stays within the per-query budget"""
+        # GitHub charges one point per 100 requested connection nodes; each issue
+        # opens five nested connections (labels, assignees, comments, timeline, closer)
+        size = (self.max_cost_per_query * 100 - 1) // 5
+        return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, size))
+
+    def _post(self, query: str, variables: Dict) -> Dict:
+        for attempt in range(5):
+            self.request_count += 1
+            response = self.session.post(GRAPHQL_URL, json={'query': query, 'variables': variables}, timeout=60)
+
+            # Heavy pages can hit the 10s server timeout, so shrink the page and retry
+            if response.status_code in (502, 504):
+                self.page_size = max(MIN_PAGE_SIZE, self.page_size // 2)
+                if 'pageSize' in variables:
+                    variables = dict(variables, pageSize=self.page_size)
+                print(f"⚠️  GraphQL timeout, retrying with page size {self.page_size}")
+                continue
+
+            if response.status_code == 403 and 'rate limit' in response.text.lower():
+                self._wait_for_reset(response)
+                continue
+
+            response.raise_for_status()
+            payload = response.json()
+            # Running out of points is reported as a 200 with a RATE_LIMITED error and no data
+            if any(error.get('type') == 'RATE_LIMITED' for error in payload.get('errors') or []):
+                self._wait_for_reset(response)
+                continue
+            if payload.get('errors'):
+                raise RuntimeError(f"GraphQL error: {payload['errors']}")
+
+            rate = payload['data'].get('rateLimit') or {}
+            self.total_cost += rate.get('cost', 0)
+            self.rate_remaining = rate.get('remaining')
+            self._respect_budget(rate)
+            return payload['data']
+
+        raise RuntimeError("GraphQL request failed after retries")
+
+    def _respect_budget(self, rate: Dict):
+        """Grow pages back toward the budget, and pause when the hourly points run out"""
+        target = self._page_size_for_budget()
+        if self.page_size < target:
+            self.page_size = min(target, self.page_size * 2)
+
+        self.rate_reset_at = parse_timestamp(rate.get('resetAt')) or self.rate_reset_at
+        if rate.get('remaining') is not None and rate['remaining'] < rate.get('cost', 1) * 2 and self.rate_reset_at:
+            self._sleep_until(self.rate_reset_at, "GraphQL points nearly exhausted")
+
+    def _wait_for_reset(self, response: requests.Response):
+        """Sleep out a rate limit: until the reset the response names, else the last resetAt seen"""
+        now = datetime.now(timezone.utc)
+        if response.headers.get('Retry-After'):
+            until = now + timedelta(seconds=int(response.headers['Retry-After']))
+        elif response.headers.get('X-RateLimit-Reset'):
+            until = datetime.fromtimestamp(int(response.headers['X-RateLimit-Reset']), timezone.utc)
+        else:
+            until = self.rate_reset_at or now + timedelta(seconds=60)
+        self._sleep_until(until, "GraphQL rate limit hit")
+
+    @staticmethod
+    def _sleep_until(moment: datetime, reason: str):
+        wait = max((moment - datetime.now(timezone.utc)).total_seconds(), 1)
+        print(f"⏳ {reason}, sleeping {wait:.0f}s")
+        time.sleep(wait)
+
+    def iter_issues(self, state: str = 'open', labels: Optional[List[str]] = None,
+                    since: Optional[datetime] = None) -> Iterator[IssueRecord]:
+        """Yield issues, most recently updated first, with comments and label events attached"""
+        states = {'open': ['OPEN'], 'closed': ['CLOSED'], 'all': ['OPEN', 'CLOSED']}[state]
+        cursor = None
+        while True:
+            data = self._post(ISSUES_QUERY, {
+                'owner': self.owner,
+                'name': self.name,
+                'pageSize': self.page_size,
+                'cursor': cursor,
+                'states': states,
+                'labels': labels or None,
+                'since': since.isoformat() if since else None,
+                'commentsPerIssue': self.comments_per_issue,
+                'eventsPerIssue': self.events_per_issue
+            })
+            issues = data['repository']['issues']
+            self.total_count = issues['totalCount']
+            for node in issues['nodes']:
+                yield self._build_record(node)
+
+            if not issues['pageInfo']['hasNextPage']:
+                break
+            cursor = issues['pageInfo']['endCursor']
+
+    def fetch_issues(self, state: str = 'open', labels: Optional[List[str]] = None,
+                     since: Optional[datetime] = None) -> List[IssueRecord]:
+        return list(self.iter_issues(state=state, labels=labels, since=since))
+
+    def _build_record(self, node: Dict) -> IssueRecord:
+        comment_nodes = list(node['comments']['nodes'])
+        page = node['comments']['pageInfo']
+        while page['hasNextPage']:
+            more = self._post(MORE_COMMENTS_QUERY, {'id': node['id'], 'cursor': page['endCursor']})
+            comment_nodes.extend(more['node']['comments']['nodes'])
+            page = more['node']['comments']['pageInfo']
+
+        event_nodes = list(node['timelineItems']['nodes'])
+        page = node['timelineItems']['pageInfo']
+        while page['hasNextPage']:
+            more = self._post(MORE_EVENTS_QUERY, {'id': node['id'], 'cursor': page['endCursor']})
+            event_nodes.extend(more['node']['timelineItems']['nodes'])
+            page = more['node']['timelineItems']['pageInfo']
+
+        return IssueRecord(
+            number=node['number'],
+            title=node['title'],
+            body=node['body'] or '',
+            state=node['state'].lower(),
+            author=_login(node['author']),
+            created_at=parse_timestamp(node['createdAt']),
+            updated_at=parse_timestamp(node['updatedAt']),
+            closed_at=parse_timestamp(node['closedAt']),
+            labels=[l['name'] for l in node['labels']['nodes']],
+            assignees=[a['login'] for a in node['assignees']['nodes']],
+            comments=[
+                CommentRecord(
+                    id=c['databaseId'],
+                    author=_login(c['author']),
+                    author_association=c['authorAssociation'],
+                    created_at=parse_timestamp(c['createdAt']),
+                    body=c['body'] or ''
+                )
+                for c in comment_nodes
+            ],
+            label_events=[
+                LabelEvent(
+                    event='labeled' if e['__typename'] == 'LabeledEvent' else 'unlabeled',
+                    label=e['label']['name'],
+                    actor=_login(e['actor']),
+                    created_at=parse_timestamp(e['createdAt'])
+                )
+                for e in event_nodes if e.get('label')
+            ],
+            node_id=node['id'],
+            closed_by=_closer(node) if node['closedAt'] else ''
+        )
+
+    def stats(self) -> str:
+        return (f"{self.request_count} GraphQL requests, {self.total_cost} points used, "
+                f"{self.rate_remaining} remaining")
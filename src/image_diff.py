@@ -0,0 +1,237 @@
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .vhd_notes import KINDS, VhdNotesIndex
+
+DELTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS release_deltas (
+    from_digest TEXT    NOT NULL,
+    to_digest   TEXT    NOT NULL,
+    kind        INTEGER NOT NULL,
+    name_id     INTEGER NOT NULL,
+    old_ids     TEXT    NOT NULL,
+    new_ids     TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS release_deltas_by_pair ON release_deltas (from_digest, to_digest);
+CREATE TABLE IF NOT EXISTS release_delta_pairs (
+    from_digest TEXT NOT NULL,
+    to_digest   TEXT NOT NULL,
+    PRIMARY KEY (from_digest, to_digest)
+);
+"""
+
+CHANGE_ADDED = 'added'
+CHANGE_REMOVED = 'removed'
+CHANGE_CHANGED = 'changed'
+
+# One (kind, name) whose versions differ; old and new hold only the versions
+# that went away and arrived
+Change = namedtuple('Change', ['kind', 'name', 'old', 'new', 'status'])
+
+# (kind, name_id) -> (old version ids, new version ids)
+Delta = Dict[Tuple[int, int], Tuple[frozenset, frozenset]]
+
+
+def compose(first: Delta, second: Delta) -> Delta:
+    """
+    The delta A -> C from A -> B and B -> C. A key missing from a delta did
+    not change across it, so its value on the far side is the one the other
+    delta saw; keys that end up where they started drop out.
+    """
+    combined = dict(first)
+    for key, (old, new) in second.items():
+        if key in combined:
+            old = combined[key][0]
+        if old == new:
+            combined.pop(key, None)
+        else:
+            combined[key] = (old, new)
+    return combined
+
+
+def invert(delta: Delta) -> Delta:
+    return {key: (new, old) for key, (old, new) in delta.items()}
+
+
+@dataclass
+class ReleaseDiff:
+    """What changed between two releases of one distro"""
+    distro: str
+    from_version: str
+    to_version: str
+    changes: List[Change] = field(default_factory=list)
+    steps: int = 0
+
+    @property
+    def added(self) -> List[Change]:
+        return [c for c in self.changes if c.status == CHANGE_ADDED]
+
+    @property
+    def removed(self) -> List[Change]:
+        return [c for c in self.changes if c.status == CHANGE_REMOVED]
+
+    @property
+    def changed(self) -> List[Change]:
+        return [c for c in self.changes if c.status == CHANGE_CHANGED]
+
+    def by_kind(self) -> Dict[str, List[Change]]:
+        grouped: Dict[str, List[Change]] = {}
+        for change in self.changes:
+            grouped.setdefault(change.kind, []).append(change)
+        return grouped
+
+
+class ImageDiffEngine:
+    """
+    Component, package and image differences between any two releases of a
+    distro, built from the VHD notes index.
+
+    Only consecutive releases are ever diffed from the note rows; those
+    deltas are kept in the index database keyed by the two files' content
+    digests, so they stay valid across runs and a changed note invalidates
+    only the deltas touching it. A diff across many releases composes the
+    cached deltas in between instead of loading either release in full.
+    """
+
+    def __init__(self, notes_index: Optional[VhdNotesIndex] = None, db_path: str = 'vhd_notes.db',
+                 notes_root: str = 'vhd-notes'):
+        self.notes = notes_index or VhdNotesIndex(db_path, notes_root)
+        self._updated = notes_index is not None
+        self.conn = self.notes.conn
+        self.conn.executescript(DELTA_SCHEMA)
+        self._deltas: Dict[Tuple[str, str], Delta] = {}
+        self._version_values: Dict[int, str] = {}
+        self.stats = {'computed': 0, 'cached': 0}
+
+    def close(self):
+        self.notes.close()
+
+    def _ensure_index(self):
+        if not self._updated:
+            changes = self.notes.update()
+            self._updated = True
+            if changes['updated'] or changes['removed']:
+                self.prune()
+
+    def prune(self):
+        """Drop cached deltas for note contents no longer in the index"""
+        with self.conn:
+            for table in ('release_deltas', 'release_delta_pairs'):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE from_digest NOT IN (SELECT digest FROM files) "
+                    "OR to_digest NOT IN (SELECT digest FROM files)")
+        self._deltas.clear()
+
+    def releases(self, distro: str) -> List[Tuple[str, str, int]]:
+        """(image version, digest, file id) for one distro, oldest first"""
+        self._ensure_index()
+        return self.conn.execute(
+            "SELECT image_version, digest, id FROM files WHERE distro = ? ORDER BY release_date, release_seq",
+            (distro,)).fetchall()
+
+    def _contents(self, file_id: int) -> Dict[Tuple[int, int], frozenset]:
+        grouped: Dict[Tuple[int, int], set] = {}
+        for kind, name_id, version_id in self.conn.execute(
+                "SELECT kind, name_id, version_id FROM note_rows WHERE file_id = ?", (file_id,)):
+            grouped.setdefault((kind, name_id), set()).add(version_id)
+        return {key: frozenset(ids) for key, ids in grouped.items()}
+
+    def _delta(self, older: Tuple[str, str, int], newer: Tuple[str, str, int]) -> Delta:
+        """Delta between two adjacent releases, from memory, the database, or the note rows"""
+        pair = (older[1], newer[1])
+        if pair in self._deltas:
+            return self._deltas[pair]
+
+        if self.conn.execute("SELECT 1 FROM release_delta_pairs WHERE from_digest = ? AND to_digest = ?",
+                             pair).fetchone():
+            delta = {(kind, name_id): (frozenset(int(i) for i in old.split()), frozenset(int(i) for i in new.split()))
+                     for kind, name_id, old, new in self.conn.execute(
+                         "SELECT kind, name_id, old_ids, new_ids FROM release_deltas "
+                         "WHERE from_digest = ? AND to_digest = ?", pair)}
+            self.stats['cached'] += 1
+        else:
+            before, after = self._contents(older[2]), self._contents(newer[2])
+            empty = frozenset()
+            delta = {key: (before.get(key, empty), after.get(key, empty))
+                     for key in before.keys() | after.keys() if before.get(key) != after.get(key)}
+            with self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO release_delta_pairs VALUES (?, ?)", pair)
+                self.conn.executemany("INSERT INTO release_deltas VALUES (?, ?, ?, ?, ?, ?)", [
+                    (pair[0], pair[1], kind, name_id, ' '.join(map(str, sorted(old))), ' '.join(map(str, sorted(new))))
+                    for (kind, name_id), (old, new) in delta.items()])
+            self.stats['computed'] += 1
+        self._deltas[pair] = delta
+        return delta
+
+    def _version_value(self, version_id: int) -> str:
+        if version_id not in self._version_values:
+            row = self.conn.execute("SELECT value FROM versions WHERE id = ?", (version_id,)).fetchone()
+            self._version_values[version_id] = row[0] if row else ''
+        return self._version_values[version_id]
+
+    def _changes(self, delta: Delta, kinds: Optional[Iterable[str]]) -> List[Change]:
+        wanted = {KINDS.index(kind) for kind in kinds} if kinds else None
+        keys = [key for key in delta if wanted is None or key[0] in wanted]
+        names = {}
+        for start in range(0, len(keys), 500):
+            ids = list({name_id for _, name_id in keys[start:start + 500]})
+            names.update(self.conn.execute(
+                f"SELECT id, value FROM names WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+        changes = []
+        for kind, name_id in keys:
+            old, new = delta[(kind, name_id)]
+            status = CHANGE_ADDED if not old else CHANGE_REMOVED if not new else CHANGE_CHANGED
+            changes.append(Change(KINDS[kind], names.get(name_id, ''),
+                                  tuple(sorted(self._version_value(i) for i in old - new)),
+                                  tuple(sorted(self._version_value(i) for i in new - old)), status))
+        return sorted(changes)
+
+    def diff(self, distro: str, from_version: str, to_version: str,
+             kinds: Optional[Iterable[str]] = None) -> ReleaseDiff:
+        """
+        Changes from one release to another of the same distro; passing the
+        newer release first gives the reverse diff. Old and new list only the
+        versions that went away or arrived, so a pre-pulled image gaining a
+        tag next to the existing ones shows just the new tag.
+        """
+        releases = self.releases(distro)
+        positions = {release[0]: i for i, release in enumerate(releases)}
+        for version in (from_version, to_version):
+            if version not in positions:
+                raise ValueError(f"No release {version} for {distro}")
+        start, end = positions[from_version], positions[to_version]
+        low, high = min(start, end), max(start, end)
+
+        delta: Delta = {}
+        for i in range(low, high):
+            delta = compose(delta, self._delta(releases[i], releases[i + 1]))
+        if start > end:
+            delta = invert(delta)
+        return ReleaseDiff(distro, from_version, to_version, self._changes(delta, kinds), steps=high - low)
+
+    def previous_release(self, distro: str, image_version: str) -> Optional[str]:
+        versions = [release[0] for release in self.releases(distro)]
+        if image_version not in versions:
+            return None
+        position = versions.index(image_version)
+        return versions[position - 1] if position else None
+
+
+def format_diff(diff: ReleaseDiff, limit: int = 50) -> str:
+    """Markdown summary of a ReleaseDiff, grouped by kind"""
+    lines = [f"### {diff.distro}: {diff.from_version} → {diff.to_version}",
+             f"{len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed"]
+    for kind, changes in diff.by_kind().items():
+        lines.append(f"\n**{kind}**")
+        for change in changes[:limit]:
+            if change.status == CHANGE_ADDED:
+                lines.append(f"- ➕ `{change.name}` {', '.join(change.new)}")
+            elif change.status == CHANGE_REMOVED:
+                lines.append(f"- ➖ `{change.name}` {', '.join(change.old)}")
+            else:
+                lines.append(f"- 🔄 `{change.name}` {', '.join(change.old) or '(kept)'} → "
+                             f"{', '.join(change.new) or '(dropped)'}")
+        if len(changes) > limit:
+            lines.append(f"- …and {len(changes) - limit} more")
+    return '\n'.join(lines)
@@ -1,7 +1,7 @@
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from dataclasses import dataclass
 from openai import AzureOpenAI
 from difflib import SequenceMatcher
@@ -10,6 +10,42 @@ try:
     from .wiki_assistant import WikiAssistant
 except ImportError:
     WikiAssistant = None
+from .changelog_index import ChangelogIndex, KnownFix
+from .issue_corpus import as_corpus_issue
+from .package_exposure import PackageExposureIndex, format_exposure
+from .version_context import VersionContext, format_version_context
+
+CRI_KEYWORDS = [
+    'production down', 'urgent', 'critical', 'emergency',
+    'outage', 'all clusters affected', 'business impact',
+    'severity 1', 'sev1', 'p0', 'blocker'
+]
+
+SECURITY_KEYWORDS = [
+    'security', 'vulnerability', 'cve', 'exploit',
+    'privilege escalation', 'unauthorized access',
+    'data breach', 'exposure', 'injection'
+]
+
+# Area labels and the keywords that suggest them, for the mock classifier and duplicate search
+AREA_KEYWORDS = [
+    ('addon/container-insights', ['container insights', 'prometheus', 'grafana', 'metrics', 'monitoring']),
+    ('addon/ama-metrics', ['ama-metrics', 'azure monitor', 'managed prometheus']),
+    ('windows', ['windows', 'windows container', 'windows node', 'windows server']),
+    ('storage', ['storage', 'pvc', 'persistent volume', 'disk', 'mount', 'csi']),
+    ('networking', ['network', 'dns', 'load balancer', 'ingress', 'service']),
+    ('Cilium', ['cilium', 'ebpf']),
+    ('addon/app-routing', ['app routing', 'nginx', 'ingress controller']),
+    ('Security', ['rbac', 'security', 'authentication', 'authorization']),
+    ('upgrade', ['upgrade', 'version', 'kubernetes version']),
+    ('azure/portal', ['portal', 'azure portal', 'ui']),
+    ('azure/acr', ['acr', 'container registry', 'image pull']),
+]
+
+
+def keyword_area_labels(text: str, limit: int = 3) -> List[str]:
+    """Area labels whose keywords appear in the (lower-cased) text, in AREA_KEYWORDS order"""
+    return [label for label, keywords in AREA_KEYWORDS if any(keyword in text for keyword in keywords)][:limit]
 
 @dataclass
 class ClassificationResult:
@@ -25,9 +61,13 @@ class ClassificationResult:
     duplicate_of: Optional[int] = None 
     similar_issues: List[Dict] = None 
     wiki_response: Optional[Dict] = None
+    affected_images: Optional[List[Dict]] = None
+    version_context: Optional[List[Dict]] = None
+    known_fix: Optional[KnownFix] = None
 
 class IssueClassifier:
-    def __init__(self, config_path: str, azure_endpoint: str, azure_key: str, deployment_name: str):
+    def __init__(self, config_path: str, azure_endpoint: str, azure_key: str, deployment_name: str,
+                 vhd_notes_dir: str = 'vhd-notes', changelog_path: str = 'CHANGELOG.md'):
         self.config_path = config_path
         self.azure_endpoint = azure_endpoint
         self.azure_key = azure_key
@@ -52,13 +92,21 @@ class IssueClassifier:
             print(f"Wiki assistant not available: {e}")
             self.wiki_assistant = None
             self.wiki_enabled = False
+
+        # Built on first use, only issues quoting versions or packages pay for indexing the release notes
+        self.vhd_notes_dir = vhd_notes_dir
+        self.changelog_path = changelog_path
+        self._package_exposure = None
+        self._version_context = None
+        self._changelog = None
     
     # Around line 47-49, update the classify_issue method:
     def classify_issue(self, issue: Dict) -> ClassificationResult:
         """Classify a single issue using AI"""
         
-        # Create the classification prompt
-        prompt = self._create_classification_prompt(issue)
+        # Resolve quoted image/Kubernetes/component versions, then create the classification prompt
+        version_context = self.enrich_versions(issue)
+        prompt = self._create_classification_prompt(issue, format_version_context(version_context))
         
         # Call Azure OpenAI API (or use a mock response for testing)
         if os.getenv('USE_MOCK_API', 'false').lower() == 'true' or self.azure_key == "mock-api-key":
@@ -83,13 +131,16 @@ class IssueClassifier:
         
         # Add wiki response to result
         result.wiki_response = wiki_response
+        result.version_context = version_context or None
         return result
 
-    def _create_classification_prompt(self, issue: Dict) -> str:
+    def _create_classification_prompt(self, issue: Dict, version_context: str = '') -> str:
+        if version_context:
+            version_context = f"\n\n    Versions quoted in the issue (from the AKS release notes):\n{version_context}"
         return f"""You are an AKS (Azure Kubernetes Service) issue classifier. Analyze the following issue and classify it according to official AKS triage guidelines.
 
     Issue Title: {issue['title']}
-    Issue Body: {issue['body']}
+    Issue Body: {issue['body']}{version_context}
 
     PART 1: CLASSIFICATION
     Classify into one of these categories:
@@ -182,55 +233,7 @@ class IssueClassifier:
             classification = "SUPPORT"
         
         # AI-POWERED AREA DETECTION (mock logic)
-        area_labels = []
-        text = f"{title_lower} {body_lower}"
-        
-        # Container Insights
-        if any(keyword in text for keyword in ['container insights', 'prometheus', 'grafana', 'metrics', 'monitoring']):
-            area_labels.append('addon/container-insights')
-        
-        # Azure Monitor
-        if any(keyword in text for keyword in ['ama-metrics', 'azure monitor', 'managed prometheus']):
-            area_labels.append('addon/ama-metrics')
-        
-        # Windows
-        if any(keyword in text for keyword in ['windows', 'windows container', 'windows node', 'windows server']):
-            area_labels.append('windows')
-        
-        # Storage
-        if any(keyword in text for keyword in ['storage', 'pvc', 'persistent volume', 'disk', 'mount', 'csi']):
-            area_labels.append('storage')
-        
-        # Networking
-        if any(keyword in text for keyword in ['network', 'dns', 'load balancer', 'ingress', 'service']):
-            area_labels.append('networking')
-        
-        # Cilium
-        if any(keyword in text for keyword in ['cilium', 'ebpf']):
-            area_labels.append('Cilium')
-        
-        # App Routing
-        if any(keyword in text for keyword in ['app routing', 'nginx', 'ingress controller']):
-            area_labels.append('addon/app-routing')
-        
-        # Security
-        if any(keyword in text for keyword in ['rbac', 'security', 'authentication', 'authorization']):
-            area_labels.append('Security')
-        
-        # Upgrades
-        if any(keyword in text for keyword in ['upgrade', 'version', 'kubernetes version']):
-            area_labels.append('upgrade')
-        
-        # Portal
-        if any(keyword in text for keyword in ['portal', 'azure portal', 'ui']):
-            area_labels.append('azure/portal')
-        
-        # ACR
-        if any(keyword in text for keyword in ['acr', 'container registry', 'image pull']):
-            area_labels.append('azure/acr')
-        
-        # Limit to top 3 most relevant
-        area_labels = area_labels[:3]
+        area_labels = keyword_area_labels(f"{title_lower} {body_lower}")
         
         return {
             "classification": classification,
@@ -293,8 +296,8 @@ class IssueClassifier:
             "SUPPORT": "support_request",
             "BUG": "bug_acknowledged", 
             "INFO_NEEDED": "need_more_info",
-            "FEATURE": "feature_acknowledged",
-            "DUPLICATE": "duplicate_issue"
+            "FEATURE": "feature_request",
+            "DUPLICATE": "duplicate"
         }.get(classification, "bug_acknowledged")
         
         suggested_response = self.config['templates'][template_key]
@@ -313,55 +316,120 @@ class IssueClassifier:
             similar_issues=None
         )  
 
-    def find_similar_issues(self, new_issue: Dict, existing_issues: List[Dict]) -> List[Dict]:
-        """Find potentially duplicate issues"""
+    def find_similar_issues(self, new_issue: Dict, existing_issues: Iterable) -> List[Dict]:
+        """Find potentially duplicate issues among IssueCorpus records (or plain issue dicts)"""
         similar_issues = []
-        new_title_lower = new_issue['title'].lower()
-        new_body_lower = new_issue.get('body', '').lower()
-        
+        new = as_corpus_issue(new_issue)
+        title_matcher, body_matcher = SequenceMatcher(None, new.title_lower), SequenceMatcher(None, new.body_lower)
+        # ratio() never exceeds quick_ratio(), so a full match is only run when its result can
+        # still matter; `best` holds the top three scores so far, which later ties cannot displace
+        best: List[float] = []
+
         for issue in existing_issues:
-            if issue['id'] == new_issue['id']:
+            issue = as_corpus_issue(issue)
+            if issue.id == new.id:
                 continue
-                
-            title_similarity = SequenceMatcher(None, new_title_lower, issue['title'].lower()).ratio()
-            body_similarity = SequenceMatcher(None, new_body_lower, issue.get('body', '').lower()).ratio()
-            
+
             # Check for similar error messages
-            new_errors = re.findall(r'error[:\s]+([^\n]+)', new_body_lower)
-            existing_errors = re.findall(r'error[:\s]+([^\n]+)', issue.get('body', '').lower())
-            error_match = any(error in existing_errors for error in new_errors)
-            
-            if title_similarity > 0.8 or (title_similarity > 0.6 and body_similarity > 0.7) or error_match:
-                similar_issues.append({
-                    'issue_number': issue['id'],
-                    'title': issue['title'],
-                    'similarity_score': max(title_similarity, body_similarity),
-                    'is_error_match': error_match
-                })
+            error_match = any(error in issue.errors for error in new.errors)
+
+            title_matcher.set_seq2(issue.title_lower)
+            if not error_match and (title_matcher.real_quick_ratio() <= 0.6 or title_matcher.quick_ratio() <= 0.6):
+                continue
+            title_similarity = title_matcher.ratio()
+            if title_similarity <= 0.6 and not error_match:
+                continue
+
+            # Past this point the issue is similar on its title or errors alone, or needs body similarity > 0.7
+            matched = title_similarity > 0.8 or error_match
+            body_matcher.set_seq2(issue.body_lower)
+            body_bound = body_matcher.quick_ratio()
+            if not matched and body_bound <= 0.7:
+                continue
+            if len(best) == 3 and max(title_similarity, body_bound) <= best[-1]:
+                continue
+            body_similarity = body_matcher.ratio() if body_bound > title_similarity or not matched else 0.0
+            if not matched and body_similarity <= 0.7:
+                continue
+
+            score = max(title_similarity, body_similarity)
+            best = sorted(best + [score], reverse=True)[:3]
+            similar_issues.append({
+                'issue_number': issue.id,
+                'title': issue.title,
+                'similarity_score': score,
+                'is_error_match': error_match
+            })
         
         return sorted(similar_issues, key=lambda x: x['similarity_score'], reverse=True)[:3]
 
     def is_cri_issue(self, issue: Dict) -> bool:
         """Detect if issue is a Customer Reported Incident (CRI)"""
-        cri_keywords = [
-            'production down', 'urgent', 'critical', 'emergency',
-            'outage', 'all clusters affected', 'business impact',
-            'severity 1', 'sev1', 'p0', 'blocker'
-        ]
-        
         text = f"{issue['title']} {issue.get('body', '')}".lower()
-        return any(keyword in text for keyword in cri_keywords)
+        return any(keyword in text for keyword in CRI_KEYWORDS)
 
     def is_security_issue(self, issue: Dict) -> bool:
         """Detect if issue is security-related"""
-        security_keywords = [
-            'security', 'vulnerability', 'cve', 'exploit',
-            'privilege escalation', 'unauthorized access',
-            'data breach', 'exposure', 'injection'
-        ]
-        
         text = f"{issue['title']} {issue.get('body', '')}".lower()
-        return any(keyword in text for keyword in security_keywords)
+        return any(keyword in text for keyword in SECURITY_KEYWORDS)
+
+    def changelog_index(self) -> ChangelogIndex:
+        if self._changelog is None:
+            self._changelog = ChangelogIndex(self.changelog_path)
+        return self._changelog
+
+    def find_known_fix(self, issue: Dict) -> Optional[KnownFix]:
+        """A CHANGELOG bug fix or retirement the issue clearly describes, e.g. Teleport or Ubuntu 18.04"""
+        try:
+            return self.changelog_index().known_fix(f"{issue['title']}\n{issue.get('body') or ''}")
+        except Exception as e:
+            print(f"Changelog lookup failed: {e}")
+            return None
+
+    def _known_fix_result(self, known_fix: KnownFix) -> ClassificationResult:
+        entry = known_fix.entry
+        response = (f"This looks like an issue fixed in the [AKS release {entry.release}]({entry.anchor}):\n\n"
+                    f"> {entry.text}\n\nPlease check that the release has reached your region and upgrade; "
+                    f"reply here if the problem persists afterwards.")
+        return ClassificationResult(
+            classification="BUG",
+            confidence=0.9,
+            reasoning=f"Matches the CHANGELOG {entry.section} entry of {entry.release} "
+                      f"(score {known_fix.score:.2f}, terms: {', '.join(known_fix.matched_terms[:5])})",
+            suggested_labels=["resolution/fix-released"],
+            suggested_response=response,
+            suggested_assignees=[],
+            suggested_areas=["other"],
+            primary_area="other",
+            known_fix=known_fix
+        )
+
+    def _exposure_index(self) -> PackageExposureIndex:
+        if self._package_exposure is None:
+            self._package_exposure = PackageExposureIndex(notes_root=self.vhd_notes_dir)
+        return self._package_exposure
+
+    def enrich_versions(self, issue: Dict) -> List[Dict]:
+        """OS SKU, bundled components and releases for the node image, Kubernetes and component versions an issue quotes"""
+        if not os.path.isdir(self.vhd_notes_dir):
+            return []
+        try:
+            if self._version_context is None:
+                self._version_context = VersionContext(self._exposure_index(), self.changelog_index())
+            return self._version_context.enrich(f"{issue['title']}\n{issue.get('body') or ''}")
+        except Exception as e:
+            print(f"Version enrichment failed: {e}")
+            return []
+
+    def find_affected_images(self, issue: Dict) -> List[Dict]:
+        """Node image releases shipping a package version the issue names, e.g. 'runc < 1.1.12'"""
+        if not os.path.isdir(self.vhd_notes_dir):
+            return []
+        try:
+            return self._exposure_index().affected_images(f"{issue['title']}\n{issue.get('body', '')}")
+        except Exception as e:
+            print(f"Package exposure lookup failed: {e}")
+            return []
 
     def classify_issue_enhanced(self, issue: Dict, existing_issues: List[Dict] = None) -> ClassificationResult:
         """Enhanced classification with duplicate, CRI, and security detection"""
@@ -385,19 +453,34 @@ class IssueClassifier:
                     similar_issues=similar_issues
                 )
         
+        # Escalations always go through classification, whatever the CHANGELOG says
+        is_cri = self.is_cri_issue(issue)
+        is_security = self.is_security_issue(issue)
+
+        # A documented bug fix is answered from the CHANGELOG without an AI call
+        known_fix = self.find_known_fix(issue)
+        if known_fix and known_fix.kind == 'fix' and not (is_cri or is_security):
+            return self._known_fix_result(known_fix)
+
         # Get base classification
         result = self.classify_issue(issue)
+        # Anything else the CHANGELOG matched (a retirement, an escalated fix) is only pointed to
+        result.known_fix = known_fix
         
         # Check for CRI
-        if self.is_cri_issue(issue):
+        if is_cri:
             result.suggested_labels.extend(["CRI", "P0", "needs-immediate-attention"])
             result.suggested_response = "🚨 This issue has been identified as a critical customer-reported incident. Our on-call engineer has been notified and will respond shortly.\n\n" + result.suggested_response
         
         # Check for security
-        if self.is_security_issue(issue):
+        if is_security:
             result.suggested_labels.extend(["security", "needs-security-review"])
             result.suggested_assignees = ["@security-team"]
             result.suggested_response = "🔒 This issue may have security implications. Our security team has been notified for review.\n\n" + result.suggested_response
+            affected = self.find_affected_images(issue)
+            if affected:
+                result.affected_images = affected
+                result.suggested_response += "\n\n📦 Node images shipping the affected versions:\n" + format_exposure(affected)
         
         return result
     
@@ -0,0 +1,149 @@
+import hashlib
+import re
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Error messages quoted in an issue body, compared verbatim across issues
+ERROR_PATTERN = re.compile(r'error[:\s]+([^\n]+)')
+# With a body cap, error messages are capped too: a log pasted on one line is otherwise one huge error
+MAX_ERROR_CHARS = 200
+
+
+class CorpusIssue:
+    """
+    One open issue as duplicate detection sees it: the lower-cased title and
+    body and the error messages, worked out once when the issue is loaded
+    rather than on every comparison.
+
+    The original body is only kept when there is no loader to fetch it again;
+    `body` fetches it on first use otherwise. With `max_body_chars` the
+    stored lower-cased text is cut to that length and each error message to
+    MAX_ERROR_CHARS, which changes similarity scores, so it is opt-in; errors
+    are still taken from the full body, and `body_hash` identifies it.
+    """
+    __slots__ = ('id', 'title', 'title_lower', 'body_lower', 'errors', 'labels', 'body_hash', 'body_length',
+                 '_body', '_loader')
+
+    def __init__(self, number: int, title: str, body: str, labels: Iterable[str] = (),
+                 max_body_chars: Optional[int] = None, loader: Optional[Callable[[int], str]] = None,
+                 body_hash: Optional[bytes] = None):
+        body = body or ''
+        lowered = body.lower()
+        self.id = number
+        self.title = title
+        title_lower = title.lower()
+        self.title_lower = title if title_lower == title else title_lower
+        # The same few error messages recur across many issues
+        errors = ERROR_PATTERN.findall(lowered)
+        if max_body_chars:
+            errors = [error[:MAX_ERROR_CHARS] for error in errors]
+        self.errors = tuple(sys.intern(error) for error in errors)
+        self.body_lower = lowered[:max_body_chars] if max_body_chars else lowered
+        self.labels = tuple(sys.intern(label) for label in labels)
+        self.body_hash = body_hash or content_hash(body)
+        self.body_length = len(body)
+        self._loader = loader
+        self._body = None if loader else body
+
+    @classmethod
+    def from_dict(cls, issue: Dict, **kwargs) -> 'CorpusIssue':
+        return cls(issue['id'], issue['title'], issue.get('body') or '', issue.get('labels', ()), **kwargs)
+
+    @property
+    def body(self) -> str:
+        if self._body is None:
+            self._body = self._loader(self.id) or ''
+        return self._body
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'title': self.title, 'body': self.body, 'labels': list(self.labels)}
+
+
+def _by_page(issues: Iterable) -> Iterator:
+    """
+    Items of a PyGithub PaginatedList one page at a time. Iterating the list
+    itself keeps every issue fetched (raw payload included) until it is done,
+    which is most of the memory a corpus build takes.
+    """
+    if not hasattr(issues, 'get_page'):
+        yield from issues
+        return
+    page, first = 0, None
+    while True:
+        items = issues.get_page(page)
+        yield from items
+        first = len(items) if first is None else first
+        if not items or len(items) < first:
+            return
+        page += 1
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha1(text.encode('utf-8', errors='replace')).digest()
+
+
+def as_corpus_issue(issue) -> CorpusIssue:
+    """Accepts the plain {'id', 'title', 'body'} dicts used before the corpus existed"""
+    return issue if isinstance(issue, CorpusIssue) else CorpusIssue.from_dict(issue)
+
+
+class IssueCorpus:
+    """
+    Open issues for duplicate detection, held as CorpusIssue records.
+
+    Rebuilding from a fresh listing reuses the record of every issue whose
+    title, labels and body hash are unchanged, so a refresh only normalizes
+    the issues that were edited, relabeled or opened since.
+    """
+
+    def __init__(self, max_body_chars: Optional[int] = None,
+                 loader: Optional[Callable[[int], str]] = None):
+        self.max_body_chars = max_body_chars
+        self.loader = loader
+        self._issues: Dict[int, CorpusIssue] = {}
+        self.reused = 0
+
+    def __len__(self) -> int:
+        return len(self._issues)
+
+    def __iter__(self) -> Iterator[CorpusIssue]:
+        return iter(list(self._issues.values()))
+
+    def __contains__(self, number: int) -> bool:
+        return number in self._issues
+
+    def add(self, number: int, title: str, body: str, labels: Iterable[str] = (),
+            previous: Optional['IssueCorpus'] = None) -> CorpusIssue:
+        body = body or ''
+        labels = tuple(labels)
+        digest = content_hash(body)
+        record = previous._issues.get(number) if previous is not None else None
+        if (record is not None and record.title == title and record.body_hash == digest
+                and record.labels == labels):
+            self.reused += 1
+        else:
+            record = CorpusIssue(number, title, body, labels, self.max_body_chars, self.loader, digest)
+        self._issues[number] = record
+        return record
+
+    def discard(self, number: int):
+        self._issues.pop(number, None)
+
+    def snapshot(self) -> List[CorpusIssue]:
+        return list(self._issues.values())
+
+    @classmethod
+    def from_github(cls, issues: Iterable, exclude_number: Optional[int] = None, previous: Optional['IssueCorpus'] = None,
+                    max_body_chars: Optional[int] = None, repo=None) -> 'IssueCorpus':
+        """Corpus from PyGithub issues; with `repo`, full bodies are dropped and fetched again on demand"""
+        loader = (lambda number: repo.get_issue(number).body) if repo is not None else None
+        corpus = cls(max_body_chars, loader)
+        for issue in _by_page(issues):
+            if issue.number != exclude_number:
+                corpus.add(issue.number, issue.title, issue.body, (label.name for label in issue.labels), previous)
+        return corpus
+
+    def stats(self) -> Dict:
+        stored = sum(len(issue.body_lower) for issue in self._issues.values())
+        full = sum(issue.body_length for issue in self._issues.values())
+        return {'issues': len(self._issues), 'body_chars': full, 'stored_body_chars': stored, 'reused': self.reused}
@@ -0,0 +1,192 @@
+import json
+import os
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from .github_graphql import IssueRecord, parse_timestamp
+
+CLASSIFICATION_LABELS = ['bug', 'support', 'feature', 'info_needed']
+
+# Labels the triage bot applies for each classification
+CLASSIFICATION_BY_LABEL = {
+    'bug': 'BUG',
+    'SR-Support Request': 'SUPPORT',
+    'support': 'SUPPORT',
+    'Needs Author Feedback': 'INFO_NEEDED',
+    'info_needed': 'INFO_NEEDED',
+    'feature-request': 'FEATURE',
+    'feature': 'FEATURE',
+    'duplicate': 'DUPLICATE'
+}
+
+AREA_LABEL_PREFIXES = ('addon/', 'azure/', 'extension/', 'upstream/', 'client/')
+AREA_LABELS = ['Security', 'networking', 'storage', 'windows', 'upgrade', 'docs',
+               'fleet', 'keda', 'nodepools', 'resiliency', 'Scale and Performance',
+               'Cilium', 'mesh', 'service-mesh', 'AzGov', 'AzChina',
+               'app-gateway-for-containers', 'advanced-container-networking-services',
+               'pod-identity', 'control-plane']
+
+
+def is_area_label(label: str) -> bool:
+    return label.startswith(AREA_LABEL_PREFIXES) or label in AREA_LABELS
+
+
+def classification_for_labels(labels: List[str]) -> str:
+    for label in labels:
+        if label in CLASSIFICATION_BY_LABEL:
+            return CLASSIFICATION_BY_LABEL[label]
+    return 'UNCLASSIFIED'
+
+
+def primary_area_for_labels(labels: List[str]) -> str:
+    return next((label for label in labels if is_area_label(label)), 'other')
+
+# Re-read a little before the last sync so edits racing the previous run are not missed
+SYNC_OVERLAP = timedelta(minutes=10)
+
+
+@dataclass
+class IssueFacts:
+    """The handful of per-issue facts the weekly metrics are derived from"""
+    number: int
+    author: str
+    created_at: datetime
+    updated_at: datetime
+    closed_at: Optional[datetime] = None
+    first_response_at: Optional[datetime] = None
+    override_count: int = 0
+    labels: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_record(cls, record: IssueRecord) -> 'IssueFacts':
+        first_response = next((c for c in record.comments if c.author != record.author), None)
+        return cls(
+            number=record.number,
+            author=record.author,
+            created_at=record.created_at,
+            updated_at=record.updated_at,
+            closed_at=record.closed_at,
+            first_response_at=first_response.created_at if first_response else None,
+            override_count=sum(1 for c in record.comments if '/override-classification' in c.body),
+            labels=list(record.labels)
+        )
+
+    @property
+    def first_response_minutes(self) -> Optional[float]:
+        if not self.first_response_at:
+            return None
+        return (self.first_response_at - self.created_at).total_seconds() / 60
+
+    @property
+    def close_minutes(self) -> Optional[float]:
+        if not self.closed_at:
+            return None
+        return (self.closed_at - self.created_at).total_seconds() / 60
+
+    @property
+    def classification(self) -> str:
+        return classification_for_labels(self.labels)
+
+    @property
+    def primary_area(self) -> str:
+        return primary_area_for_labels(self.labels)
+
+    def to_json(self) -> Dict:
+        data = asdict(self)
+        for key in ('created_at', 'updated_at', 'closed_at', 'first_response_at'):
+            data[key] = data[key].isoformat() if data[key] else None
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'IssueFacts':
+        data = dict(data)
+        for key in ('created_at', 'updated_at', 'closed_at', 'first_response_at'):
+            data[key] = parse_timestamp(data.get(key))
+        return cls(**data)
+
+
+class IssueFactStore:
+    """Local store of IssueFacts, refreshed with only the issues changed since the last sync"""
+
+    def __init__(self, path: str = 'triage_issue_facts.json'):
+        self.path = path
+        self.facts: Dict[int, IssueFacts] = {}
+        self.last_synced_at: Optional[datetime] = None
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.last_synced_at = parse_timestamp(data.get('last_synced_at'))
+            self.facts = {int(n): IssueFacts.from_json(f) for n, f in data.get('issues', {}).items()}
+
+    def refresh(self, fetcher, initial_lookback_days: int = 7) -> int:
+        """Pull issues updated since the last sync; returns how many were updated"""
+        sync_started = datetime.now(timezone.utc)
+        if self.last_synced_at:
+            since = self.last_synced_at - SYNC_OVERLAP
+        else:
+            since = sync_started - timedelta(days=initial_lookback_days)
+
+        updated = 0
+        for record in fetcher.iter_issues(state='all', since=since):
+            self.facts[record.number] = IssueFacts.from_record(record)
+            updated += 1
+
+        self.last_synced_at = sync_started
+        print(f"🔄 Refreshed {updated} issues changed since {since.strftime('%Y-%m-%d %H:%M')} "
+              f"({len(self.facts)} in store)")
+        return updated
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None,
+                'issues': {str(n): facts.to_json() for n, facts in sorted(self.facts.items())}
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def weekly_metrics(self, start: datetime, end: datetime) -> Dict:
+        """Derive every weekly metric from the stored facts in a single pass"""
+        metrics = {
+            'period': f"{start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}",
+            'issues_created': 0,
+            'issues_closed': 0,
+            'ai_classifications': defaultdict(int),
+            'human_overrides': 0,
+            'average_time_to_first_response': [],
+            'issues_by_area': defaultdict(int),
+            'cri_issues': 0,
+            'duplicate_issues': 0,
+            'stale_closures': 0,
+            'repair_items_created': 0
+        }
+
+        for facts in self.facts.values():
+            if start <= facts.created_at <= end:
+                metrics['issues_created'] += 1
+                for label in facts.labels:
+                    if label in CLASSIFICATION_LABELS:
+                        metrics['ai_classifications'][label] += 1
+                    if label == 'CRI':
+                        metrics['cri_issues'] += 1
+                    if label == 'duplicate':
+                        metrics['duplicate_issues'] += 1
+
+                if facts.first_response_minutes is not None:
+                    metrics['average_time_to_first_response'].append(facts.first_response_minutes)
+                metrics['human_overrides'] += facts.override_count
+
+            if facts.closed_at and start <= facts.closed_at <= end:
+                metrics['issues_closed'] += 1
+                if 'auto-closed' in facts.labels:
+                    metrics['stale_closures'] += 1
+
+        response_times = metrics['average_time_to_first_response']
+        if response_times:
+            metrics['average_time_to_first_response'] = f"{sum(response_times) / len(response_times):.1f} minutes"
+        else:
+            metrics['average_time_to_first_response'] = "No data"
+
+        return metrics
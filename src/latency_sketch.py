@@ -0,0 +1,94 @@
+import math
+from typing import Dict, Iterable, Optional
+
+# Durations at or below this many minutes are counted as zero
+MIN_TRACKED_VALUE = 1e-3
+
+
+class LatencySketch:
+    """
+    Log-bucketed quantile sketch with a fixed relative error.
+
+    Values are counted in buckets whose bounds grow geometrically, so a sketch
+    covering a minute to a year holds a few hundred counters at 1% accuracy.
+    Sketches with the same accuracy merge exactly by adding bucket counts,
+    which is what lets weekly sketches be combined into any longer window.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1):
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'LatencySketch') -> 'LatencySketch':
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0-1), within relative_accuracy of the exact answer"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                estimate = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def percentiles(self, points: Iterable[float] = (50, 90, 99)) -> Dict:
+        """Same shape as MetricsHistory.percentiles: {'count': n, 'p50': ..., ...}"""
+        result = {'count': self.count}
+        result.update({f"p{p:g}": self.quantile(p / 100) for p in points})
+        return result
+
+    def to_json(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {str(k): v for k, v in sorted(self.buckets.items())}
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'LatencySketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.buckets = {int(k): v for k, v in data['buckets'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        sketch.min = data['min']
+        sketch.max = data['max']
+        return sketch
@@ -0,0 +1,175 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .action_plan import IssueActionPlan
+from .event_log import EVENT_RULE
+from .github_graphql import IssueRecord
+from .repair_items import EXAMPLE_REPAIR_LINK, find_repair_links
+
+
+def _mentions(record: IssueRecord) -> str:
+    return ' '.join(f"@{login}" for login in record.assignees)
+
+
+def _cycle(*moments: Optional[datetime]) -> str:
+    """Journal cycle marker: the latest of the events that started the current cycle"""
+    known = [moment for moment in moments if moment]
+    return max(known).isoformat() if known else ''
+
+
+def reminder_cycle(has_reminder_label: bool, updated_at: datetime, cutoff: datetime) -> Optional[str]:
+    """
+    Whether a reminder is due, as its journal cycle: always before the first
+    one (marked by its label), then again each time the issue has seen no
+    activity at all since `cutoff`. None when no reminder is due.
+    """
+    if not has_reminder_label:
+        return ''
+    # The previous reminder counts as activity, so reminders repeat once per quiet period
+    return _cycle(updated_at) if updated_at < cutoff else None
+
+
+def needs_attention(record: IssueRecord, plan: IssueActionPlan, cutoff: datetime, days: int) -> bool:
+    """Mark issues waiting on the author as stale once the author has been quiet for `days`"""
+    if not record.has_label('Needs Author Feedback') or record.has_label('stale'):
+        return False
+    last_author_comment = next((c for c in reversed(record.comments) if c.author == record.author), None)
+    if last_author_comment and last_author_comment.created_at >= cutoff:
+        return False
+
+    plan.add_labels('stale')
+    plan.comment(
+        f"This issue has been marked as stale because we haven't heard from you in {days} days. "
+        f"Please provide the requested information or this issue will be closed in 7 days.",
+        cycle=_cycle(record.labeled_at('Needs Author Feedback', first=False),
+                     last_author_comment.created_at if last_author_comment else None,
+                     record.labeled_at('stale', first=False))
+    )
+    return True
+
+
+def escalate_investigation(record: IssueRecord, plan: IssueActionPlan, cutoff: datetime, days: int) -> bool:
+    """Ping assignees of issues under investigation for `days`, and again after every `days` without activity"""
+    if not record.has_label('Under Investigation') or record.created_at >= cutoff:
+        return False
+    repeat = reminder_cycle(record.has_label('investigation-overdue'), record.updated_at, cutoff)
+    if repeat is None:
+        return False
+
+    plan.add_labels('Needs Attention :wave:', 'investigation-overdue')
+    plan.comment(
+        f"{_mentions(record)} This issue has been under investigation for {days} days. "
+        f"Please provide an update on the investigation status.",
+        cycle=repeat or _cycle(record.labeled_at('Under Investigation', first=False))
+    )
+    return True
+
+
+def close_stale(record: IssueRecord, plan: IssueActionPlan, cutoff: datetime, days: int) -> bool:
+    """Close issues that have carried the stale label for `days`"""
+    if not record.has_label('stale'):
+        return False
+    # The current stale cycle, not one the issue recovered from earlier
+    stale_labeled_at = record.labeled_at('stale', first=False)
+    if not stale_labeled_at or stale_labeled_at >= cutoff:
+        return False
+
+    plan.comment(
+        "This issue has been automatically closed due to inactivity. "
+        "If you still need assistance, please open a new issue with updated information.",
+        cycle=_cycle(stale_labeled_at)
+    )
+    plan.close()
+    plan.add_labels('auto-closed')
+    return True
+
+
+def missing_repair_item(record: IssueRecord, plan: IssueActionPlan, cutoff: datetime, days: int) -> bool:
+    """Remind assignees of bugs open for `days` without a linked repair item, and again after every quiet `days`"""
+    if not record.has_label('bug') or record.created_at >= cutoff:
+        return False
+    repeat = reminder_cycle(record.has_label('needs-repair-item'), record.updated_at, cutoff)
+    if repeat is None:
+        return False
+    if any(find_repair_links(c.body) for c in record.comments):
+        return False
+
+    add_repair_item_reminder(plan, record.assignees, days, repeat)
+    return True
+
+
+def add_repair_item_reminder(plan: IssueActionPlan, assignees: List[str], days: int, cycle: str = ''):
+    mentions = ' '.join(f"@{login}" for login in assignees)
+    plan.comment(
+        f"{mentions} This bug issue has been open for {days}+ days without a repair item. "
+        f"Please create a repair item in Azure DevOps and link it here.\n\n"
+        f"To link a repair item, comment with:\n"
+        f"```\n"
+        f"Repair Item: {EXAMPLE_REPAIR_LINK}\n"
+        f"```",
+        cycle=cycle
+    )
+    plan.add_labels('needs-repair-item')
+
+
+@dataclass(frozen=True)
+class LifecycleRule:
+    name: str
+    days: int
+    apply: Callable[[IssueRecord, IssueActionPlan, datetime, int], bool]
+    # Every issue the rule can act on carries this label
+    label: str
+
+
+# close-stale goes first: once an issue is being closed the remaining rules are skipped
+DEFAULT_RULES = [
+    LifecycleRule('close-stale', 7, close_stale, 'stale'),
+    LifecycleRule('needs-attention', 5, needs_attention, 'Needs Author Feedback'),
+    LifecycleRule('escalate', 14, escalate_investigation, 'Under Investigation'),
+    LifecycleRule('repair-items', 7, missing_repair_item, 'bug'),
+]
+
+RULES_BY_NAME = {rule.name: rule for rule in DEFAULT_RULES}
+
+
+class LifecycleSweep:
+    """
+    Evaluates every lifecycle rule against an in-memory snapshot of open issues.
+
+    Rules only read the IssueRecord and write into the issue's shared plan, so
+    an issue matched by several rules still gets one update and one comment.
+    Every rule sees the snapshot as fetched, not the effect of earlier rules.
+    """
+
+    def __init__(self, rules: Optional[List[LifecycleRule]] = None, now: Optional[datetime] = None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        now = now or datetime.now(timezone.utc)
+        self.cutoffs = {rule.name: now - timedelta(days=rule.days) for rule in self.rules}
+        self.fired = Counter()
+        self.evaluated = 0
+
+    @property
+    def labels(self) -> List[str]:
+        """Label filter for the snapshot; GitHub matches issues carrying any of them"""
+        return sorted({rule.label for rule in self.rules})
+
+    def evaluate(self, record: IssueRecord) -> IssueActionPlan:
+        plan = IssueActionPlan.for_record(record)
+        for rule in self.rules:
+            if rule.apply(record, plan, self.cutoffs[rule.name], rule.days):
+                self.fired[rule.name] += 1
+                plan.record(EVENT_RULE, rule=rule.name)
+                print(f"Issue #{record.number}: {rule.name}")
+            if plan.target_state == 'closed':
+                break
+        self.evaluated += 1
+        return plan
+
+    def run(self, records: Iterable[IssueRecord]) -> List[IssueActionPlan]:
+        """Plans for every issue that needs at least one write"""
+        return [plan for plan in map(self.evaluate, records) if not plan.is_noop]
+
+    def summary(self) -> Dict:
+        return {'issues_evaluated': self.evaluated, **{name: self.fired[name] for name in self.cutoffs}}
@@ -0,0 +1,392 @@
+import json
+import math
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from collections import deque
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional
+
+from .issue_facts import IssueFacts
+from .latency_sketch import LatencySketch
+
+KIND_FIRST_RESPONSE = 'first_response'
+KIND_CLOSE = 'close'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (
+    issue          INTEGER NOT NULL,
+    kind           TEXT    NOT NULL,
+    minutes        REAL    NOT NULL,
+    occurred_at    TEXT    NOT NULL,
+    area           TEXT    NOT NULL,
+    classification TEXT    NOT NULL,
+    PRIMARY KEY (issue, kind)
+);
+CREATE INDEX IF NOT EXISTS durations_by_time ON durations (kind, occurred_at);
+CREATE TABLE IF NOT EXISTS sketches (
+    week           TEXT NOT NULL,
+    kind           TEXT NOT NULL,
+    area           TEXT NOT NULL,
+    classification TEXT NOT NULL,
+    sketch         TEXT NOT NULL,
+    PRIMARY KEY (week, kind, area, classification)
+);
+CREATE TABLE IF NOT EXISTS weekly_snapshots (
+    recorded_at TEXT NOT NULL,
+    period      TEXT NOT NULL,
+    metrics     TEXT NOT NULL
+);
+-- Rows added or changed since the last export_text(), as (table, JSON-encoded key)
+CREATE TABLE IF NOT EXISTS export_queue (
+    tbl TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tbl, key)
+);
+"""
+
+
+def percentile(ordered: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _parse_iso(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def week_start(value: datetime) -> str:
+    """Monday (UTC) of the week containing value, the key sketches are stored under"""
+    value = value.astimezone(timezone.utc)
+    return (value - timedelta(days=value.weekday())).strftime('%Y-%m-%d')
+
+
+def period_label(week: str, period: str) -> str:
+    if period == 'week':
+        return week
+    year, month = int(week[:4]), int(week[5:7])
+    if period == 'month':
+        return f"{year}-{month:02d}"
+    if period == 'quarter':
+        return f"{year}-Q{(month - 1) // 3 + 1}"
+    raise ValueError("period must be 'week', 'month' or 'quarter'")
+
+
+class MetricsHistory:
+    """
+    SQLite store of raw per-issue response and close durations.
+
+    A duration is stored once and never changes, so there is no retention
+    window and each run only inserts what is new; only an issue's area and
+    classification are updated when triage changes them. Every duration is
+    also folded into a LatencySketch per (week, kind, area, classification),
+    so percentiles over months, quarters or rolling windows merge a few small
+    sketches instead of scanning raw rows.
+
+    The database itself is a cache: export_text() appends the durations,
+    sketches and snapshots added or changed since the last export to a
+    line-per-row text file that is kept in the repository, and a missing
+    database is rebuilt from it, later lines for the same duration or sketch
+    replacing earlier ones. The sketches are loaded as stored, not recomputed.
+    """
+
+    def __init__(self, path: str = 'triage_metrics.db', text_path: Optional[str] = 'triage_metrics.jsonl'):
+        self.path = path
+        self.text_path = text_path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        empty = not self.conn.execute("SELECT 1 FROM durations UNION ALL SELECT 1 FROM sketches "
+                                      "UNION ALL SELECT 1 FROM weekly_snapshots LIMIT 1").fetchone()
+        if text_path and empty:
+            self.import_text(text_path)
+        if not self.conn.execute("SELECT 1 FROM sketches LIMIT 1").fetchone():
+            self.rebuild_sketches()
+
+    def close(self):
+        self.conn.close()
+
+    def record_facts(self, facts: Iterable[IssueFacts]) -> int:
+        """
+        Insert durations that are not stored yet and update the area and
+        classification of stored ones; returns the number of new rows
+        """
+        rows = []
+        for f in facts:
+            if f.first_response_minutes is not None:
+                rows.append((f.number, KIND_FIRST_RESPONSE, f.first_response_minutes,
+                             _iso(f.first_response_at), f.primary_area, f.classification))
+            if f.close_minutes is not None:
+                rows.append((f.number, KIND_CLOSE, f.close_minutes,
+                             _iso(f.closed_at), f.primary_area, f.classification))
+
+        added, moved = [], set()
+        with self.conn:
+            for row in rows:
+                stored = self.conn.execute("SELECT occurred_at, area, classification FROM durations "
+                                           "WHERE issue = ? AND kind = ?", row[:2]).fetchone()
+                if stored is None:
+                    added.append(row)
+                elif stored[1:] != row[4:]:
+                    # Re-classified: the duration moves to another sketch, and out of the old one
+                    moved.add((week_start(_parse_iso(stored[0])), row[1]))
+                else:
+                    continue
+                self.conn.execute(
+                    "INSERT INTO durations VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (issue, kind) DO UPDATE SET "
+                    "area = excluded.area, classification = excluded.classification", row)
+                self._queue_export('durations', row[:2])
+            self._add_to_sketches(row for row in added if (week_start(_parse_iso(row[3])), row[1]) not in moved)
+            for week, kind in moved:
+                self._rebuild_week(week, kind)
+        return len(added)
+
+    def _rebuild_week(self, week: str, kind: str):
+        start = datetime.fromisoformat(week).replace(tzinfo=timezone.utc)
+        # Sketches left empty are exported as removed
+        for key in self.conn.execute("SELECT week, kind, area, classification FROM sketches "
+                                     "WHERE week = ? AND kind = ?", (week, kind)).fetchall():
+            self._queue_export('sketches', key)
+        self.conn.execute("DELETE FROM sketches WHERE week = ? AND kind = ?", (week, kind))
+        self._add_to_sketches(self.conn.execute(
+            "SELECT * FROM durations WHERE kind = ? AND occurred_at >= ? AND occurred_at < ?",
+            (kind, _iso(start), _iso(start + timedelta(days=7)))))
+
+    def _add_to_sketches(self, rows):
+        """Fold (issue, kind, minutes, occurred_at, area, classification) rows into the weekly sketches"""
+        touched: Dict[tuple, LatencySketch] = {}
+        for _, kind, minutes, occurred_at, area, classification in rows:
+            key = (week_start(_parse_iso(occurred_at)), kind, area, classification)
+            if key not in touched:
+                stored = self.conn.execute(
+                    "SELECT sketch FROM sketches WHERE week = ? AND kind = ? AND area = ? AND classification = ?",
+                    key).fetchone()
+                touched[key] = LatencySketch.from_json(json.loads(stored[0])) if stored else LatencySketch()
+            touched[key].add(minutes)
+
+        self.conn.executemany("INSERT OR REPLACE INTO sketches VALUES (?, ?, ?, ?, ?)",
+                              [key + (json.dumps(sketch.to_json()),) for key, sketch in touched.items()])
+        for key in touched:
+            self._queue_export('sketches', key)
+
+    def rebuild_sketches(self):
+        """
+        Recompute every sketch from the raw durations, e.g. for an export
+        written before sketches were part of it; rows are streamed, not loaded
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM sketches")
+            self._add_to_sketches(self.conn.execute("SELECT * FROM durations"))
+
+    def _queue_export(self, table: str, key):
+        self.conn.execute("INSERT OR IGNORE INTO export_queue VALUES (?, ?)", (table, json.dumps(list(key))))
+
+    def append_snapshot(self, metrics: Dict, recorded_at: Optional[datetime] = None):
+        recorded_at = recorded_at or datetime.now()
+        with self.conn:
+            cursor = self.conn.execute("INSERT INTO weekly_snapshots VALUES (?, ?, ?)",
+                                       (recorded_at.isoformat(), metrics['period'], json.dumps(metrics)))
+            self._queue_export('weekly_snapshots', [cursor.lastrowid])
+
+    def snapshots(self, limit: Optional[int] = None) -> List[Dict]:
+        query = "SELECT recorded_at, metrics FROM weekly_snapshots ORDER BY recorded_at"
+        rows = self.conn.execute(query).fetchall()
+        if limit:
+            rows = rows[-limit:]
+        return [{'timestamp': ts, 'metrics': json.loads(m)} for ts, m in rows]
+
+    def _queued_rows(self):
+        lookups = {'durations': "SELECT * FROM durations WHERE issue = ? AND kind = ?",
+                   'sketches': "SELECT * FROM sketches WHERE week = ? AND kind = ? AND area = ? "
+                               "AND classification = ?",
+                   'weekly_snapshots': "SELECT * FROM weekly_snapshots WHERE rowid = ?"}
+        for table, key in self.conn.execute("SELECT tbl, key FROM export_queue ORDER BY rowid").fetchall():
+            key = json.loads(key)
+            row = self.conn.execute(lookups[table], key).fetchone()
+            if row is not None:
+                yield table, row
+            elif table == 'sketches':
+                # A sketch whose durations all moved elsewhere: the null sketch removes it on import
+                yield table, key + [None]
+
+    def _all_rows(self):
+        for table, order in (('durations', 'issue, kind'), ('sketches', 'week, kind, area, classification'),
+                             ('weekly_snapshots', 'recorded_at')):
+            for row in self.conn.execute(f"SELECT * FROM {table} ORDER BY {order}"):
+                yield table, row
+
+    def export_text(self, path: Optional[str] = None) -> int:
+        """
+        Append the rows added or changed since the last export as one JSON
+        line each, so the committed file only grows by what changed; a file
+        that does not exist yet gets every row. Returns the lines written.
+        """
+        path = path or self.text_path
+        rows = self._queued_rows() if os.path.exists(path) else self._all_rows()
+        count = 0
+        with open(path, 'a') as f:
+            for table, row in rows:
+                f.write(json.dumps({'table': table, 'row': list(row)}) + '\n')
+                count += 1
+        with self.conn:
+            self.conn.execute("DELETE FROM export_queue")
+        return count
+
+    def import_text(self, path: str) -> int:
+        """Load an export_text() file into an empty database; a later line for the same key wins"""
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        with self.conn, open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry['table'] == 'durations':
+                    self.conn.execute("INSERT OR REPLACE INTO durations VALUES (?, ?, ?, ?, ?, ?)", entry['row'])
+                elif entry['table'] == 'sketches' and entry['row'][4] is None:
+                    self.conn.execute("DELETE FROM sketches WHERE week = ? AND kind = ? AND area = ? "
+                                      "AND classification = ?", entry['row'][:4])
+                elif entry['table'] == 'sketches':
+                    self.conn.execute("INSERT OR REPLACE INTO sketches VALUES (?, ?, ?, ?, ?)", entry['row'])
+                else:
+                    self.conn.execute("INSERT INTO weekly_snapshots VALUES (?, ?, ?)", entry['row'])
+                count += 1
+        return count
+
+    def import_legacy_json(self, path: str = 'triage_metrics_history.json') -> int:
+        """One-time import of the old JSON history so earlier snapshots are not lost"""
+        if not os.path.exists(path) or self.conn.execute("SELECT 1 FROM weekly_snapshots LIMIT 1").fetchone():
+            return 0
+        with open(path, 'r') as f:
+            history = json.load(f)
+        for entry in history:
+            self.append_snapshot(entry['metrics'], datetime.fromisoformat(entry['timestamp']))
+        return len(history)
+
+    def _where(self, kind: str, start: Optional[datetime], end: Optional[datetime],
+               area: Optional[str], classification: Optional[str]):
+        clauses, params = ["kind = ?"], [kind]
+        if start:
+            clauses.append("occurred_at >= ?")
+            params.append(_iso(start))
+        if end:
+            clauses.append("occurred_at < ?")
+            params.append(_iso(end))
+        if area:
+            clauses.append("area = ?")
+            params.append(area)
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        return " AND ".join(clauses), params
+
+    def percentiles(self, kind: str = KIND_FIRST_RESPONSE, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, area: Optional[str] = None,
+                    classification: Optional[str] = None,
+                    points: Iterable[float] = (50, 90, 99)) -> Dict:
+        """Percentiles in minutes over any window, optionally for one area or classification"""
+        where, params = self._where(kind, start, end, area, classification)
+        ordered = [row[0] for row in self.conn.execute(
+            f"SELECT minutes FROM durations WHERE {where} ORDER BY minutes", params)]
+        result = {'count': len(ordered)}
+        result.update({f"p{p:g}": percentile(ordered, p) for p in points})
+        return result
+
+    def breakdown(self, by: str, kind: str = KIND_FIRST_RESPONSE, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, points: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict]:
+        """Percentiles per area or per classification in a single ordered scan"""
+        if by not in ('area', 'classification'):
+            raise ValueError("breakdown must be by 'area' or 'classification'")
+        where, params = self._where(kind, start, end, None, None)
+        rows = self.conn.execute(
+            f"SELECT {by}, minutes FROM durations WHERE {where} ORDER BY {by}, minutes", params)
+
+        results = {}
+        for group, items in groupby(rows, key=lambda row: row[0]):
+            ordered = [minutes for _, minutes in items]
+            results[group] = {'count': len(ordered)}
+            results[group].update({f"p{p:g}": percentile(ordered, p) for p in points})
+        return results
+
+    def _iter_sketches(self, kind: str, start: Optional[datetime], end: Optional[datetime],
+                       area: Optional[str], classification: Optional[str]):
+        """(week, sketch) pairs in week order; windows are rounded out to whole weeks"""
+        clauses, params = ["kind = ?"], [kind]
+        if start:
+            clauses.append("week >= ?")
+            params.append(week_start(start))
+        if end:
+            clauses.append("week <= ?")
+            params.append(week_start(end))
+        if area:
+            clauses.append("area = ?")
+            params.append(area)
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        query = f"SELECT week, sketch FROM sketches WHERE {' AND '.join(clauses)} ORDER BY week"
+        for week, sketch in self.conn.execute(query, params):
+            yield week, LatencySketch.from_json(json.loads(sketch))
+
+    def merged_sketch(self, kind: str = KIND_FIRST_RESPONSE, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, area: Optional[str] = None,
+                      classification: Optional[str] = None) -> LatencySketch:
+        merged = LatencySketch()
+        for _, sketch in self._iter_sketches(kind, start, end, area, classification):
+            merged.merge(sketch)
+        return merged
+
+    def period_percentiles(self, period: str = 'month', kind: str = KIND_FIRST_RESPONSE,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           area: Optional[str] = None, classification: Optional[str] = None,
+                           points: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict]:
+        """Percentiles per week, month or quarter, merged from the stored weekly sketches"""
+        results = {}
+        current_label, current = None, None
+        for week, sketch in self._iter_sketches(kind, start, end, area, classification):
+            label = period_label(week, period)
+            if label != current_label:
+                if current is not None:
+                    results[current_label] = current.percentiles(points)
+                current_label, current = label, LatencySketch()
+            current.merge(sketch)
+        if current is not None:
+            results[current_label] = current.percentiles(points)
+        return results
+
+    def rolling_percentiles(self, window_weeks: int = 4, kind: str = KIND_FIRST_RESPONSE,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            area: Optional[str] = None, classification: Optional[str] = None,
+                            points: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict]:
+        """Percentiles over the trailing window_weeks, keyed by the last week of each window"""
+        results = {}
+        window = deque()
+
+        def close_week(week, sketch):
+            window.append((week, sketch))
+            cutoff = (datetime.fromisoformat(week) - timedelta(weeks=window_weeks)).strftime('%Y-%m-%d')
+            while window[0][0] <= cutoff:
+                window.popleft()
+            merged = LatencySketch()
+            for _, weekly in window:
+                merged.merge(weekly)
+            results[week] = merged.percentiles(points)
+
+        # Sketches arrive in week order, one per area and classification; combine them per week first
+        current_week, current = None, None
+        for week, sketch in self._iter_sketches(kind, start, end, area, classification):
+            if week != current_week:
+                if current is not None:
+                    close_week(current_week, current)
+                current_week, current = week, LatencySketch()
+            current.merge(sketch)
+        if current is not None:
+            close_week(current_week, current)
+        return results
@@ -0,0 +1,158 @@
+import difflib
+import hashlib
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+# A chunk ends after a line whose checksum hits the mask (once it has
+# MIN_CHUNK_LINES), or at MAX_CHUNK_LINES. Boundaries depend only on the
+# lines themselves, so an inserted or removed package shifts the chunks
+# around it and leaves the rest of the note sharing chunks with its
+# neighbouring releases.
+CHUNK_MASK = 3
+MIN_CHUNK_LINES = 2
+MAX_CHUNK_LINES = 64
+
+CHUNK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS note_chunks (
+    id     INTEGER PRIMARY KEY,
+    digest BLOB    NOT NULL UNIQUE,
+    size   INTEGER NOT NULL,
+    body   BLOB    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_manifests (
+    file_id INTEGER PRIMARY KEY,
+    chunks  BLOB    NOT NULL
+);
+"""
+
+
+def split_chunks(content: bytes) -> List[bytes]:
+    """Content-defined line blocks of a note; b''.join() gives the content back"""
+    chunks: List[bytes] = []
+    current: List[bytes] = []
+    for line in content.splitlines(keepends=True):
+        current.append(line)
+        if len(current) >= MAX_CHUNK_LINES or (
+                len(current) >= MIN_CHUNK_LINES and zlib.crc32(line) & CHUNK_MASK == 0):
+            chunks.append(b''.join(current))
+            current = []
+    if current:
+        chunks.append(b''.join(current))
+    return chunks
+
+
+def _pack(chunk_ids: Iterable[int]) -> bytes:
+    return zlib.compress(array('I', chunk_ids).tobytes())
+
+
+def _unpack(blob: bytes) -> List[int]:
+    ids = array('I')
+    ids.frombytes(zlib.decompress(blob))
+    return ids.tolist()
+
+
+class NoteChunkStore:
+    """
+    Deduplicated note contents: each distinct line block is stored once,
+    compressed, and a note is the list of chunk ids it is made of.
+
+    Consecutive releases of a distro differ in a handful of packages and
+    tags, so most of a note's chunks are already stored when it arrives;
+    callers keyed on chunk ids (parsing, diffs) only do work for the new ones.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.executescript(CHUNK_SCHEMA)
+        self._ids: Dict[bytes, int] = {}
+        self._bodies: Dict[int, bytes] = {}
+
+    def put(self, file_id: int, content: bytes) -> List[Tuple[int, bytes]]:
+        """Store a note's chunks and manifest; returns (chunk id, chunk) in order"""
+        stored = []
+        for chunk in split_chunks(content):
+            digest = hashlib.sha1(chunk).digest()
+            chunk_id = self._ids.get(digest)
+            if chunk_id is None:
+                row = self.conn.execute("SELECT id FROM note_chunks WHERE digest = ?", (digest,)).fetchone()
+                if row is None:
+                    row = (self.conn.execute("INSERT INTO note_chunks (digest, size, body) VALUES (?, ?, ?)",
+                                             (digest, len(chunk), zlib.compress(chunk))).lastrowid,)
+                chunk_id = self._ids[digest] = row[0]
+            stored.append((chunk_id, chunk))
+        self.conn.execute("INSERT OR REPLACE INTO note_manifests VALUES (?, ?)",
+                          (file_id, _pack(chunk_id for chunk_id, _ in stored)))
+        return stored
+
+    def chunk_ids(self, file_id: int) -> List[int]:
+        row = self.conn.execute("SELECT chunks FROM note_manifests WHERE file_id = ?", (file_id,)).fetchone()
+        return _unpack(row[0]) if row else []
+
+    def chunks(self, chunk_ids: Iterable[int]) -> Dict[int, bytes]:
+        """Decompressed bodies for the given chunk ids"""
+        missing = list({chunk_id for chunk_id in chunk_ids if chunk_id not in self._bodies})
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            for chunk_id, body in self.conn.execute(
+                    f"SELECT id, body FROM note_chunks WHERE id IN ({','.join('?' * len(batch))})", batch):
+                self._bodies[chunk_id] = zlib.decompress(body)
+        return self._bodies
+
+    def read(self, file_id: int) -> bytes:
+        chunk_ids = self.chunk_ids(file_id)
+        bodies = self.chunks(chunk_ids)
+        return b''.join(bodies[chunk_id] for chunk_id in chunk_ids)
+
+    def remove(self, file_id: int):
+        self.conn.execute("DELETE FROM note_manifests WHERE file_id = ?", (file_id,))
+
+    def collect_garbage(self) -> int:
+        """Delete chunks no manifest refers to any more; returns how many"""
+        referenced = set()
+        for blob, in self.conn.execute("SELECT chunks FROM note_manifests"):
+            referenced.update(_unpack(blob))
+        orphans = [chunk_id for chunk_id, in self.conn.execute("SELECT id FROM note_chunks")
+                   if chunk_id not in referenced]
+        for start in range(0, len(orphans), 500):
+            batch = orphans[start:start + 500]
+            self.conn.execute(f"DELETE FROM note_chunks WHERE id IN ({','.join('?' * len(batch))})", batch)
+        if orphans:
+            self._ids.clear()
+            self._bodies.clear()
+        return len(orphans)
+
+    def diff(self, old_file_id: int, new_file_id: int, context: int = 3) -> List[str]:
+        """
+        Unified line diff between two stored notes. Runs of shared chunks are
+        matched by id and never decompressed; only the differing blocks (plus
+        a chunk either side for context) are split into lines and compared.
+        """
+        old_ids, new_ids = self.chunk_ids(old_file_id), self.chunk_ids(new_file_id)
+        matcher = difflib.SequenceMatcher(None, old_ids, new_ids, autojunk=False)
+        lines: List[str] = []
+        for i1, i2, j1, j2 in ((op[1], op[2], op[3], op[4]) for op in matcher.get_opcodes() if op[0] != 'equal'):
+            i1, j1 = max(i1 - 1, 0), max(j1 - 1, 0)
+            i2, j2 = min(i2 + 1, len(old_ids)), min(j2 + 1, len(new_ids))
+            bodies = self.chunks(old_ids[i1:i2] + new_ids[j1:j2])
+            before = b''.join(bodies[c] for c in old_ids[i1:i2]).decode('utf-8', errors='replace').splitlines()
+            after = b''.join(bodies[c] for c in new_ids[j1:j2]).decode('utf-8', errors='replace').splitlines()
+            # Hunk line numbers would be relative to the compared blocks, so drop them
+            lines.extend('@@' if line.startswith('@@') else line
+                         for line in difflib.unified_diff(before, after, n=context, lineterm='')
+                         if not line.startswith(('---', '+++')))
+        return lines
+
+    def stats(self) -> Dict:
+        """Note bytes before deduplication, after it, and as stored (compressed chunks plus manifests)"""
+        unique_chunks, unique_bytes, chunk_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM note_chunks").fetchone()
+        sizes = dict(self.conn.execute("SELECT id, size FROM note_chunks"))
+        raw_bytes = references = manifest_bytes = 0
+        for blob, in self.conn.execute("SELECT chunks FROM note_manifests"):
+            chunk_ids = _unpack(blob)
+            references += len(chunk_ids)
+            raw_bytes += sum(sizes.get(chunk_id, 0) for chunk_id in chunk_ids)
+            manifest_bytes += len(blob)
+        return {'chunk_refs': references, 'unique_chunks': unique_chunks, 'raw_bytes': raw_bytes,
+                'unique_bytes': unique_bytes, 'stored_bytes': chunk_bytes + manifest_bytes}
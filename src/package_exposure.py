@@ -0,0 +1,216 @@
+import bisect
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .package_versions import SCHEME_DEB, SCHEME_RPM, in_range, version_key
+from .vhd_notes import KIND_COMPONENT, KIND_PACKAGE, KINDS, VhdNotesIndex, version_matches
+
+_VERSION = r'v?(\d[\w.+~:-]*\w)'
+_RANGE_PATTERNS = (
+    # glibc >= 2.35, < 2.38 / glibc from 2.35 to 2.38 / glibc between 2.35 and 2.38
+    (re.compile(rf'(?:>=|from|between)\s*{_VERSION}\s*(?:,|and|to|through|-)?\s*(?:<|and|to|before)\s*{_VERSION}'),
+     lambda m: (m.group(1), m.group(2))),
+    # runc < 1.1.12 / before 1.1.12 / prior to 1.1.12 / fixed in 1.1.12
+    (re.compile(rf'(?:<|before|prior to|fixed in|earlier than)\s*{_VERSION}'), lambda m: (None, m.group(1))),
+    # openssl >= 3.0.0
+    (re.compile(rf'(?:>=|since|starting (?:with|from)|and later)\s*{_VERSION}'), lambda m: (m.group(1), None)),
+)
+_EXACT_PATTERN = re.compile(rf'^\s*(?:version\s*)?[=:]?\s*{_VERSION}')
+_NAME_PATTERN = re.compile(r'[a-z][a-z0-9+_.-]*[a-z0-9+]')
+# A mention ends at ';' or at a ',' that does not continue its range ('glibc >= 2.35, < 2.38')
+_MENTION_END = re.compile(r';|,(?!\s*(?:<|>|=|and\b|to\b|before\b))')
+
+
+def scheme_for(distro: str) -> str:
+    return SCHEME_DEB if distro.startswith('aks-ubuntu') else SCHEME_RPM
+
+
+@dataclass
+class PackageHistory:
+    """Every version one package shipped with in one distro, sorted by version, with the releases carrying it"""
+    distro: str
+    scheme: str
+    versions: List[str] = field(default_factory=list)
+    releases: Dict[str, List[str]] = field(default_factory=dict)
+    kind: str = KIND_PACKAGE
+
+    def matching(self, low: Optional[str], high: Optional[str]) -> List[str]:
+        """Versions in [low, high); bisects the sorted versions instead of testing each one"""
+        key = version_key(self.scheme)
+        keys = [key(v) for v in self.versions]
+        start = bisect.bisect_left(keys, key(low)) if low is not None else 0
+        end = bisect.bisect_left(keys, key(high)) if high is not None else len(keys)
+        return [v for v in self.versions[start:end] if in_range(v, low, high, self.scheme)]
+
+
+def _runs(ordered: List[str], included: set) -> List[Tuple[str, str]]:
+    """Contiguous stretches of `ordered` releases that are all in `included`"""
+    runs, start, previous = [], None, None
+    for release in ordered:
+        if release in included:
+            start = start or release
+            previous = release
+        elif start:
+            runs.append((start, previous))
+            start = None
+    if start:
+        runs.append((start, previous))
+    return runs
+
+
+class PackageExposureIndex:
+    """
+    Which node image releases, per OS SKU, ship a package inside a version range.
+
+    Built lazily per package from the VHD notes index: the first lookup of a
+    package loads its rows (a few ms), sorts each distro's versions with rpm
+    or dpkg ordering, and keeps them for later lookups. Components from the
+    notes' component list are used for the releases of a distro that do not
+    list the package (runc and containerd on older images, for instance).
+    """
+
+    def __init__(self, notes_index: Optional[VhdNotesIndex] = None, db_path: str = 'vhd_notes.db',
+                 notes_root: str = 'vhd-notes'):
+        self.notes = notes_index or VhdNotesIndex(db_path, notes_root)
+        self._updated = notes_index is not None
+        self._histories: Dict[str, Dict[str, PackageHistory]] = {}
+        self._release_order: Dict[str, List[str]] = {}
+        self._names = None
+
+    def _ensure_index(self):
+        if not self._updated:
+            self.notes.update()
+            self._updated = True
+        if not self._release_order:
+            order = defaultdict(list)
+            for distro, image_version, _ in self.notes.releases():
+                order[distro].append(image_version)
+            self._release_order = dict(order)
+
+    def known_names(self) -> set:
+        self._ensure_index()
+        if self._names is None:
+            self._names = {name for (name,) in self.notes.conn.execute(
+                "SELECT DISTINCT n.value FROM note_rows r JOIN names n ON n.id = r.name_id WHERE r.kind IN (?, ?)",
+                (KINDS.index(KIND_COMPONENT), KINDS.index(KIND_PACKAGE)))}
+        return self._names
+
+    def history(self, package: str) -> Dict[str, PackageHistory]:
+        self._ensure_index()
+        package = package.lower()
+        if package not in self._histories:
+            # distro -> release -> kind -> versions
+            rows = defaultdict(lambda: defaultdict(lambda: defaultdict(set)))
+            for row in self.notes.releases_with(package):
+                if row['kind'] in (KIND_PACKAGE, KIND_COMPONENT) and row['version']:
+                    rows[row['distro']][row['image_version']][row['kind']].add(row['version'])
+
+            histories: Dict[str, PackageHistory] = {}
+            for distro, by_release in rows.items():
+                by_version = defaultdict(set)
+                for release, by_kind in by_release.items():
+                    # A release's installed-package list is authoritative; its component list only fills gaps
+                    for version in by_kind.get(KIND_PACKAGE) or by_kind[KIND_COMPONENT]:
+                        by_version[version].add(release)
+                listed = any(KIND_PACKAGE in by_kind for by_kind in by_release.values())
+                kind = KIND_PACKAGE if listed else KIND_COMPONENT
+                scheme = scheme_for(distro) if kind == KIND_PACKAGE else SCHEME_RPM
+                order = {release: i for i, release in enumerate(self._release_order.get(distro, []))}
+                histories[distro] = PackageHistory(
+                    distro=distro, scheme=scheme, kind=kind,
+                    versions=sorted(by_version, key=version_key(scheme)),
+                    releases={v: sorted(r, key=lambda rel: order.get(rel, 0)) for v, r in by_version.items()})
+            self._histories[package] = histories
+        return self._histories[package]
+
+    def exposure(self, package: str, low: Optional[str] = None, high: Optional[str] = None,
+                 exact: Optional[str] = None) -> List[Dict]:
+        """
+        Releases per distro shipping `package` in [low, high), or at `exact`
+        (prefix match, so 1.1.12 covers 1.1.12-2.azl3). Each entry lists the
+        matching versions and the contiguous release runs carrying them.
+        """
+        results = []
+        for distro, history in sorted(self.history(package).items()):
+            if exact is not None:
+                versions = [v for v in history.versions if version_matches(v, exact)]
+            else:
+                versions = history.matching(low, high)
+            if not versions:
+                continue
+            releases = {release for v in versions for release in history.releases[v]}
+            ordered = self._release_order.get(distro, [])
+            runs = _runs(ordered, releases)
+            results.append({
+                'distro': distro,
+                'package': package.lower(),
+                'kind': history.kind,
+                'versions': versions,
+                'releases': len(releases),
+                'first_release': runs[0][0],
+                'last_release': runs[-1][1],
+                'runs': runs,
+                # Still exposed if the newest release of the SKU carries a matching version
+                'current': bool(ordered) and ordered[-1] in releases
+            })
+        return results
+
+    def find_mentions(self, text: str) -> List[Dict]:
+        """
+        Package names known to the index that the text pairs with a version or
+        range, e.g. 'runc < 1.1.12' or 'glibc from 2.35 to 2.38'. A name only
+        takes the range closest after it, and never one past the next package
+        name or the end of its clause.
+        """
+        lowered = text.lower()
+        names = self.known_names()
+        mentions, seen = [], set()
+        for match in _NAME_PATTERN.finditer(lowered):
+            name = match.group(0)
+            if len(name) < 3 or name not in names or name in seen:
+                continue
+            tail = lowered[match.end():match.end() + 80].split('\n', 1)[0]
+            end = _MENTION_END.search(tail)
+            tail = tail[:end.start()] if end else tail
+            following = next((m for m in _NAME_PATTERN.finditer(tail)
+                              if len(m.group(0)) >= 3 and m.group(0) in names), None)
+            tail = tail[:following.start()] if following else tail
+            mention = None
+            # Nearest range first; at the same position the fuller pattern (earlier in the list) wins
+            found = [(m.start(), i, m) for i, (pattern, _) in enumerate(_RANGE_PATTERNS)
+                     for m in [pattern.search(tail)] if m and m.start() < 20]
+            if found:
+                _, i, nearest = min(found, key=lambda item: item[:2])
+                low, high = _RANGE_PATTERNS[i][1](nearest)
+                mention = {'package': name, 'low': low, 'high': high}
+            if mention is None:
+                exact = _EXACT_PATTERN.match(tail)
+                if exact:
+                    mention = {'package': name, 'exact': exact.group(1)}
+            if mention:
+                seen.add(name)
+                mentions.append(mention)
+        return mentions
+
+    def affected_images(self, text: str) -> List[Dict]:
+        """Exposure for every package/version mention in an issue"""
+        affected = []
+        for mention in self.find_mentions(text):
+            affected.extend(self.exposure(mention['package'], mention.get('low'), mention.get('high'),
+                                          mention.get('exact')))
+        return affected
+
+
+def format_exposure(entries: List[Dict], limit: int = 10) -> str:
+    """Markdown summary of exposure() results for an issue comment"""
+    lines = []
+    for entry in entries[:limit]:
+        runs = ', '.join(first if first == last else f"{first} – {last}" for first, last in entry['runs'][-3:])
+        current = " (including the latest image)" if entry['current'] else ""
+        lines.append(f"- **{entry['distro']}** `{entry['package']}` {', '.join(entry['versions'][-3:])}: "
+                     f"{entry['releases']} images, {runs}{current}")
+    if len(entries) > limit:
+        lines.append(f"- …and {len(entries) - limit} more")
+    return '\n'.join(lines)
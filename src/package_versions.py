@@ -0,0 +1,132 @@
+import re
+from functools import cmp_to_key
+from typing import Optional, Tuple
+
+SCHEME_RPM = 'rpm'
+SCHEME_DEB = 'deb'
+
+_RPM_SEGMENT = re.compile(r'(\d+|[a-zA-Z]+|~|\^)')
+
+
+def _cmp(a, b) -> int:
+    return (a > b) - (a < b)
+
+
+def rpmvercmp(a: str, b: str) -> int:
+    """rpm's segment-wise comparison of one version or release string (~ sorts before anything, ^ after)"""
+    if a == b:
+        return 0
+    left, right = _RPM_SEGMENT.findall(a), _RPM_SEGMENT.findall(b)
+    for x, y in zip(left, right):
+        if x == y:
+            continue
+        if x == '~' or y == '~':
+            return -1 if x == '~' else 1
+        if x == '^' or y == '^':
+            # 1.0^ is newer than 1.0 but older than 1.0.1
+            return -1 if x == '^' else 1
+        if x.isdigit() != y.isdigit():
+            # A numeric segment is newer than an alphabetic one
+            return 1 if x.isdigit() else -1
+        if x.isdigit():
+            result = _cmp(int(x), int(y))
+        else:
+            result = _cmp(x, y)
+        if result:
+            return result
+    if len(left) == len(right):
+        return 0
+    # The longer string wins unless what it has left starts with a tilde
+    rest, sign = (left[len(right)], 1) if len(left) > len(right) else (right[len(left)], -1)
+    if rest == '~':
+        return -sign
+    return sign
+
+
+def split_evr(value: str) -> Tuple[int, str, Optional[str]]:
+    """'1:2.38-8.azl3' -> (1, '2.38', '8.azl3'); the release is None when the string has none"""
+    epoch = 0
+    if ':' in value:
+        head, _, value = value.partition(':')
+        epoch = int(head) if head.isdigit() else 0
+    version, sep, release = value.rpartition('-')
+    if not sep:
+        return epoch, value, None
+    return epoch, version, release
+
+
+def rpm_compare(a: str, b: str) -> int:
+    """Compare epoch:version-release strings; a side without a release matches any release"""
+    ea, va, ra = split_evr(a)
+    eb, vb, rb = split_evr(b)
+    if ea != eb:
+        return _cmp(ea, eb)
+    result = rpmvercmp(va, vb)
+    if result or ra is None or rb is None:
+        return result
+    return rpmvercmp(ra, rb)
+
+
+def _deb_order(char: str) -> int:
+    if char == '~':
+        return -1
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + 256
+
+
+def _deb_part_compare(a: str, b: str) -> int:
+    """dpkg's verrevcmp for an upstream version or revision"""
+    i = j = 0
+    while i < len(a) or j < len(b):
+        first_diff = 0
+        while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+            ac = _deb_order(a[i]) if i < len(a) and not a[i].isdigit() else 0
+            bc = _deb_order(b[j]) if j < len(b) and not b[j].isdigit() else 0
+            if ac != bc:
+                return _cmp(ac, bc)
+            i += 1
+            j += 1
+        while i < len(a) and a[i] == '0':
+            i += 1
+        while j < len(b) and b[j] == '0':
+            j += 1
+        while i < len(a) and a[i].isdigit() and j < len(b) and b[j].isdigit():
+            if not first_diff:
+                first_diff = ord(a[i]) - ord(b[j])
+            i += 1
+            j += 1
+        if i < len(a) and a[i].isdigit():
+            return 1
+        if j < len(b) and b[j].isdigit():
+            return -1
+        if first_diff:
+            return 1 if first_diff > 0 else -1
+    return 0
+
+
+def deb_compare(a: str, b: str) -> int:
+    """Compare Debian [epoch:]upstream[-revision] strings the way dpkg --compare-versions does"""
+    ea, va, ra = split_evr(a)
+    eb, vb, rb = split_evr(b)
+    if ea != eb:
+        return _cmp(ea, eb)
+    return _deb_part_compare(va, vb) or _deb_part_compare(ra or '', rb or '')
+
+
+def compare_versions(a: str, b: str, scheme: str = SCHEME_RPM) -> int:
+    """-1, 0 or 1; a leading 'v' (v1.31.8) is ignored"""
+    a, b = (v[1:] if v[:1] == 'v' and v[1:2].isdigit() else v for v in (a, b))
+    return deb_compare(a, b) if scheme == SCHEME_DEB else rpm_compare(a, b)
+
+
+def version_key(scheme: str = SCHEME_RPM):
+    """sort() key ordering version strings under `scheme`"""
+    return cmp_to_key(lambda a, b: compare_versions(a, b, scheme))
+
+
+def in_range(version: str, low: Optional[str], high: Optional[str], scheme: str = SCHEME_RPM) -> bool:
+    """low <= version < high, either bound optional"""
+    if low is not None and compare_versions(version, low, scheme) < 0:
+        return False
+    return high is None or compare_versions(version, high, scheme) < 0
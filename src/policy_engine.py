@@ -0,0 +1,235 @@
+import glob
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .action_plan import IssueActionPlan
+from .event_log import EVENT_RULE
+from .github_graphql import IssueRecord
+
+DAY_SECONDS = 86400
+
+
+class UnsupportedPolicy(ValueError):
+    """A scheduled search uses a filter or action the local evaluator does not implement"""
+
+
+def _normalise(label: str) -> str:
+    # Policy files carry stray whitespace ('resolution/shipped ') and GitHub labels are case-insensitive
+    return label.strip().lower()
+
+
+class LabelIndex:
+    """Assigns every label name a bit so label filters become integer mask tests"""
+
+    def __init__(self):
+        self.bits: Dict[str, int] = {}
+
+    def bit(self, label: str) -> int:
+        key = _normalise(label)
+        if key not in self.bits:
+            self.bits[key] = 1 << len(self.bits)
+        return self.bits[key]
+
+    def mask(self, labels: Iterable[str]) -> int:
+        value = 0
+        for label in labels:
+            value |= self.bit(label)
+        return value
+
+
+@dataclass
+class IssueRow:
+    """Precomputed per-issue fields every filter reads"""
+    record: IssueRecord
+    label_bits: int
+    last_activity: float
+    is_open: bool
+    is_assigned: bool
+    has_labels: bool
+
+
+class IssueSnapshot:
+    """Open issue records indexed for policy evaluation"""
+
+    def __init__(self, records: Iterable[IssueRecord], labels: Optional[LabelIndex] = None):
+        self.labels = labels or LabelIndex()
+        self.rows: List[IssueRow] = [self._row(record) for record in records]
+
+    def _row(self, record: IssueRecord) -> IssueRow:
+        activity = [record.updated_at or record.created_at]
+        if record.comments:
+            activity.append(record.comments[-1].created_at)
+        if record.label_events:
+            activity.append(record.label_events[-1].created_at)
+        return IssueRow(
+            record=record,
+            label_bits=self.labels.mask(record.labels),
+            last_activity=max(activity).timestamp(),
+            is_open=record.state == 'open',
+            is_assigned=bool(record.assignees),
+            has_labels=bool(record.labels)
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+
+@dataclass
+class ScheduledSearch:
+    policy_id: str
+    description: str
+    filters: List
+    actions: List
+    required: int = 0
+    forbidden: int = 0
+    inactive_days: Optional[float] = None
+    flags: Dict[str, bool] = field(default_factory=dict)
+
+    def matcher(self, now: float) -> Callable[[IssueRow], bool]:
+        """Single predicate over an IssueRow with every threshold resolved up front"""
+        required, forbidden = self.required, self.forbidden
+        cutoff = now - self.inactive_days * DAY_SECONDS if self.inactive_days is not None else None
+        open_only = self.flags.get('isOpen', False)
+        unassigned = self.flags.get('isNotAssigned', False)
+        unlabeled = self.flags.get('hasNoLabel', False)
+
+        def matches(row: IssueRow) -> bool:
+            return ((row.label_bits & required) == required
+                    and not row.label_bits & forbidden
+                    and (cutoff is None or row.last_activity < cutoff)
+                    and (not open_only or row.is_open)
+                    and (not unassigned or not row.is_assigned)
+                    and (not unlabeled or not row.has_labels))
+        return matches
+
+    def apply(self, plan: IssueActionPlan, record: IssueRecord):
+        plan.record(EVENT_RULE, rule=f"policy: {self.description}")
+        for action in self.actions:
+            name, args = _split(action)
+            if name == 'addLabel':
+                plan.add_labels(args['label'].strip())
+            elif name == 'removeLabel':
+                plan.remove_labels(args['label'].strip())
+            elif name == 'addReply':
+                plan.comment(_render_reply(args['reply'], record))
+            elif name == 'closeIssue':
+                plan.close()
+            elif name == 'assignTo':
+                plan.assign(*_as_list(args.get('users') or args.get('user')))
+
+
+def _split(entry) -> Tuple[str, Dict]:
+    """Policy list entries are either a bare name or a one-key mapping"""
+    if isinstance(entry, str):
+        return entry, {}
+    (name, args), = entry.items()
+    return name, args or {}
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _render_reply(reply: str, record: IssueRecord) -> str:
+    assignees = ' '.join(f"@{login}" for login in record.assignees)
+    return (reply.strip()
+            .replace('${assignees}', assignees)
+            .replace('${issueAuthor}', f"@{record.author}"))
+
+
+SUPPORTED_ACTIONS = {'addLabel', 'removeLabel', 'addReply', 'closeIssue', 'assignTo'}
+FLAG_FILTERS = {'isOpen', 'isNotAssigned', 'hasNoLabel'}
+
+
+def compile_search(policy_id: str, search: Dict, labels: LabelIndex) -> ScheduledSearch:
+    compiled = ScheduledSearch(policy_id, search.get('description', ''), search.get('filters', []),
+                               search.get('actions', []))
+    for entry in compiled.filters:
+        name, args = _split(entry)
+        if name == 'isIssue':
+            continue  # the snapshot only ever holds issues
+        if name in FLAG_FILTERS:
+            compiled.flags[name] = True
+        elif name == 'hasLabel':
+            compiled.required |= labels.bit(args['label'])
+        elif name == 'isNotLabeledWith':
+            compiled.forbidden |= labels.bit(args['label'])
+        elif name == 'noActivitySince':
+            days = float(args['days'])
+            # Several noActivitySince filters reduce to the strictest one
+            compiled.inactive_days = max(days, compiled.inactive_days or 0)
+        else:
+            raise UnsupportedPolicy(f"Unsupported filter '{name}' in: {compiled.description}")
+
+    for entry in compiled.actions:
+        name, _ = _split(entry)
+        if name not in SUPPORTED_ACTIONS:
+            raise UnsupportedPolicy(f"Unsupported action '{name}' in: {compiled.description}")
+    return compiled
+
+
+class PolicyEngine:
+    """
+    Compiles the scheduledSearches in .github/policies into predicates over an
+    IssueSnapshot.
+
+    Label filters collapse to one required and one forbidden bitmask per
+    search, and inactivity to one cutoff, so each search costs a few integer
+    comparisons per issue.
+    """
+
+    def __init__(self, policy_dir: str = '.github/policies'):
+        self.labels = LabelIndex()
+        self.searches: List[ScheduledSearch] = []
+        self.skipped: List[str] = []
+        for path in sorted(glob.glob(os.path.join(policy_dir, '*.yml'))):
+            self.load(path)
+
+    def load(self, path: str):
+        import yaml
+
+        with open(path, 'r') as f:
+            policy = yaml.safe_load(f)
+        if not policy or policy.get('disabled'):
+            return
+        config = policy.get('configuration', {}).get('resourceManagementConfiguration', {})
+        for search in config.get('scheduledSearches') or []:
+            try:
+                self.searches.append(compile_search(policy.get('id', os.path.basename(path)), search, self.labels))
+            except UnsupportedPolicy as e:
+                self.skipped.append(str(e))
+
+    def snapshot(self, records: Iterable[IssueRecord]) -> IssueSnapshot:
+        return IssueSnapshot(records, self.labels)
+
+    def evaluate(self, snapshot: IssueSnapshot,
+                 now: Optional[datetime] = None) -> List[Tuple[ScheduledSearch, List[IssueRecord]]]:
+        """Issues matched by each search, in policy file order"""
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        return [(search, [row.record for row in filter(search.matcher(now_ts), snapshot.rows)])
+                for search in self.searches]
+
+    def plan(self, snapshot: IssueSnapshot, now: Optional[datetime] = None) -> Tuple[List[IssueActionPlan], Dict]:
+        """One merged action plan per matched issue, plus match counts and timing"""
+        started = time.perf_counter()
+        matches = self.evaluate(snapshot, now)
+        evaluated_ms = (time.perf_counter() - started) * 1000
+
+        plans: Dict[int, IssueActionPlan] = {}
+        for search, records in matches:
+            for record in records:
+                plan = plans.setdefault(record.number, IssueActionPlan.for_record(record))
+                search.apply(plan, record)
+
+        stats = {
+            'issues': len(snapshot),
+            'searches': len(self.searches),
+            'evaluate_ms': round(evaluated_ms, 2),
+            'matches': [(search.description, len(records)) for search, records in matches]
+        }
+        return [plan for plan in plans.values() if not plan.is_noop], stats
@@ -0,0 +1,170 @@
+import asyncio
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .issue_classifier import CRI_KEYWORDS, SECURITY_KEYWORDS
+
+# Lower value is more urgent
+PRIORITY_CRI = 0
+PRIORITY_SECURITY = 1
+PRIORITY_HIGH = 2
+PRIORITY_NORMAL = 3
+PRIORITY_LOW = 4
+
+PRIORITY_NAMES = {
+    PRIORITY_CRI: 'cri',
+    PRIORITY_SECURITY: 'security',
+    PRIORITY_HIGH: 'high',
+    PRIORITY_NORMAL: 'normal',
+    PRIORITY_LOW: 'low'
+}
+
+HIGH_KEYWORDS = [
+    'crash', 'crashloopbackoff', 'failed', 'failing', 'broken', 'regression',
+    'data loss', 'cannot connect', 'timeout', 'degraded', 'upgrade failed'
+]
+
+LOW_KEYWORDS = [
+    'feature request', 'add support', 'would be nice', 'enhancement',
+    'question', 'how to', 'how do i', 'documentation', 'typo'
+]
+
+
+def _pattern(keywords: List[str]) -> 're.Pattern':
+    # Same substring semantics as IssueClassifier.is_cri_issue, in one scan per group
+    return re.compile('|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+
+_CRI = _pattern(CRI_KEYWORDS)
+_SECURITY = _pattern(SECURITY_KEYWORDS)
+_HIGH = _pattern(HIGH_KEYWORDS)
+_LOW = _pattern(LOW_KEYWORDS)
+
+
+@dataclass
+class UrgencyScore:
+    priority: int
+    # Keywords that matched, reported back with the queued job
+    reasons: List[str]
+
+    @property
+    def name(self) -> str:
+        return PRIORITY_NAMES[self.priority]
+
+
+def score_urgency(title: str, body: str = '') -> UrgencyScore:
+    """Cheap keyword pre-classification used to order work before the LLM runs"""
+    text = f"{title or ''} {body or ''}".lower()
+
+    cri = _CRI.findall(text)
+    security = _SECURITY.findall(text)
+    high = _HIGH.findall(text)
+    low = _LOW.findall(text)
+
+    if cri:
+        priority = PRIORITY_CRI
+    elif security:
+        priority = PRIORITY_SECURITY
+    elif high:
+        priority = PRIORITY_HIGH
+    elif low:
+        priority = PRIORITY_LOW
+    else:
+        priority = PRIORITY_NORMAL
+
+    return UrgencyScore(priority=priority, reasons=sorted(set(cri + security + high + low)))
+
+
+class PriorityJobQueue:
+    """
+    Async FIFO-per-priority queue with aging.
+
+    Every `aging_seconds` an item has waited promotes it one priority level, so
+    routine work cannot be starved by a steady stream of urgent items. Workers
+    can restrict themselves to urgent levels to keep capacity reserved for them.
+    """
+
+    def __init__(self, aging_seconds: float = 120.0, levels: int = len(PRIORITY_NAMES)):
+        self.aging_seconds = aging_seconds
+        self._levels: List[deque] = [deque() for _ in range(levels)]
+        self._cond: Optional[asyncio.Condition] = None
+        self._unfinished = 0
+        self._all_done: Optional[asyncio.Event] = None
+        self._waits: Dict[int, deque] = {level: deque(maxlen=1000) for level in range(levels)}
+        self._seq = 0
+
+    def _ensure_primitives(self):
+        # Created lazily so the queue can be built outside a running loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+            self._all_done = asyncio.Event()
+            self._all_done.set()
+
+    def qsize(self) -> int:
+        return sum(len(level) for level in self._levels)
+
+    def depth_by_priority(self) -> Dict[str, int]:
+        return {PRIORITY_NAMES.get(i, str(i)): len(level) for i, level in enumerate(self._levels)}
+
+    async def put(self, item: Any, priority: int = PRIORITY_NORMAL):
+        self._ensure_primitives()
+        async with self._cond:
+            self._seq += 1
+            self._levels[priority].append((time.monotonic(), self._seq, item))
+            self._unfinished += 1
+            self._all_done.clear()
+            self._cond.notify_all()
+
+    def _pick(self, max_priority: Optional[int]) -> Optional[int]:
+        """Level whose head has the best aged priority, oldest first on ties"""
+        now = time.monotonic()
+        best: Optional[Tuple[float, float, int]] = None
+        for level, items in enumerate(self._levels):
+            if not items or (max_priority is not None and level > max_priority):
+                continue
+            enqueued_at, _, _ = items[0]
+            aged = level - int((now - enqueued_at) / self.aging_seconds)
+            key = (aged, enqueued_at, level)
+            if best is None or key < best:
+                best = key
+        return best[2] if best else None
+
+    async def get(self, max_priority: Optional[int] = None) -> Tuple[Any, int]:
+        """Wait for the next item, optionally only from levels at or above max_priority"""
+        self._ensure_primitives()
+        async with self._cond:
+            while True:
+                level = self._pick(max_priority)
+                if level is not None:
+                    enqueued_at, _, item = self._levels[level].popleft()
+                    self._waits[level].append(time.monotonic() - enqueued_at)
+                    return item, level
+                await self._cond.wait()
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._all_done.set()
+
+    async def join(self):
+        self._ensure_primitives()
+        await self._all_done.wait()
+
+    def wait_stats(self) -> Dict[str, Dict]:
+        """Queue wait time per priority level, in seconds"""
+        stats = {}
+        for level, waits in self._waits.items():
+            ordered = sorted(waits)
+            if not ordered:
+                continue
+            stats[PRIORITY_NAMES.get(level, str(level))] = {
+                'count': len(ordered),
+                'p50': round(ordered[len(ordered) // 2], 3),
+                'p95': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+                'max': round(ordered[-1], 3)
+            }
+        return stats
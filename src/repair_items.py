@@ -0,0 +1,86 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from .github_graphql import parse_timestamp
+
+REPAIR_ITEM_MARKERS = ("Repair Item:", "ADO Link:")
+REPAIR_ITEM_PATTERN = re.compile(r'(?:Repair Item|ADO Link):[ \t]*(.*)')
+# Placeholder shown in the reminder comment, which must not count as a link
+EXAMPLE_REPAIR_LINK = "[ADO-12345](https://dev.azure.com/...)"
+
+
+def find_repair_links(body: str) -> List[str]:
+    """Rest of the line after each 'Repair Item:' or 'ADO Link:' marker (may be empty)"""
+    if not body or not any(marker in body for marker in REPAIR_ITEM_MARKERS):
+        return []
+    links = (match.group(1).strip() for match in REPAIR_ITEM_PATTERN.finditer(body))
+    return [link for link in links if link != EXAMPLE_REPAIR_LINK]
+
+
+@dataclass
+class RepairItemEntry:
+    links: List[str] = field(default_factory=list)
+    # updated_at of the newest comment read so far, or when an issue without
+    # comments was last read; the next read starts here
+    cursor: Optional[datetime] = None
+
+    def to_json(self) -> Dict:
+        return {'links': self.links, 'cursor': self.cursor.isoformat() if self.cursor else None}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'RepairItemEntry':
+        return cls(links=data.get('links', []), cursor=parse_timestamp(data.get('cursor')))
+
+
+class RepairItemIndex:
+    """Repair-item links per issue, with a comment cursor so each run only reads new comments"""
+
+    def __init__(self, path: str = '.repair_item_index.json'):
+        self.path = path
+        self.entries: Dict[int, RepairItemEntry] = {}
+        self.comments_read = 0
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.entries = {int(n): RepairItemEntry.from_json(e) for n, e in data.get('issues', {}).items()}
+
+    def get(self, number: int) -> RepairItemEntry:
+        return self.entries.setdefault(number, RepairItemEntry())
+
+    def needs_scan(self, number: int, updated_at: datetime) -> bool:
+        """Comments can only be new if the issue changed after the newest comment already read"""
+        entry = self.get(number)
+        return not entry.links and (entry.cursor is None or updated_at > entry.cursor)
+
+    def scan(self, issue) -> RepairItemEntry:
+        """Read the PyGithub issue's comments updated since the cursor and record any links"""
+        entry = self.get(issue.number)
+        started = datetime.now(timezone.utc)
+        comments = issue.get_comments(since=entry.cursor) if entry.cursor else issue.get_comments()
+        for comment in comments:
+            self.comments_read += 1
+            for link in find_repair_links(comment.body):
+                if link not in entry.links:
+                    entry.links.append(link)
+            updated_at = comment.updated_at or comment.created_at
+            if entry.cursor is None or updated_at > entry.cursor:
+                entry.cursor = updated_at
+        if entry.cursor is None:
+            # No comments yet: any that come later are newer than this read
+            entry.cursor = started
+        return entry
+
+    def prune(self, open_numbers: Iterable[int]):
+        """Forget issues that are no longer open bugs"""
+        keep = set(open_numbers)
+        self.entries = {n: e for n, e in self.entries.items() if n in keep}
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'issues': {str(n): e.to_json() for n, e in sorted(self.entries.items())}}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,240 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def _normalise_url(url: str) -> str:
+    # Query parameter order is not significant to either API
+    parts = urlsplit(str(url))
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+def _body_hash(body) -> str:
+    if body is None:
+        return ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if isinstance(body, dict):
+        body = json.dumps(body, sort_keys=True).encode('utf-8')
+    if not isinstance(body, (bytes, bytearray)):
+        # Streaming bodies are never sent by the triage path; key them by type only
+        return type(body).__name__
+    try:
+        # JSON payloads are keyed on content so key order in the client doesn't matter
+        body = json.dumps(json.loads(body), sort_keys=True).encode('utf-8')
+    except ValueError:
+        pass
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def request_key(method: str, url: str, body) -> str:
+    return f"{method.upper()} {_normalise_url(url)} {_body_hash(body)}"
+
+
+class Cassette:
+    """Recorded HTTP interactions for one or more triage runs"""
+
+    def __init__(self, path: str, metadata: Optional[Dict] = None):
+        self.path = path
+        self.metadata = metadata or {}
+        self.interactions: List[Dict] = []
+        self._by_key: Dict[str, List[Dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        cassette = cls(path, data.get('metadata', {}))
+        for interaction in data['interactions']:
+            cassette._add(interaction)
+        return cassette
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({
+                'metadata': dict(self.metadata, saved_at=datetime.now().isoformat()),
+                'interactions': self.interactions
+            }, f, indent=1)
+
+    def _add(self, interaction: Dict):
+        self.interactions.append(interaction)
+        self._by_key[interaction['key']].append(interaction)
+
+    def record(self, method: str, url: str, body, status: int, headers: Dict, content: bytes, latency: float):
+        with self._lock:
+            self._add({
+                'key': request_key(method, url, body),
+                'method': method.upper(),
+                'url': str(url),
+                'status': status,
+                'headers': {k: v for k, v in headers.items() if k.lower() not in ('set-cookie', 'content-encoding', 'transfer-encoding')},
+                'body_b64': base64.b64encode(content or b'').decode('ascii'),
+                'latency': round(latency, 4)
+            })
+
+    def next_response(self, method: str, url: str, body) -> Dict:
+        """Recorded interactions for a key are served in order; the last one repeats"""
+        key = request_key(method, url, body)
+        with self._lock:
+            candidates = self._by_key.get(key)
+            if not candidates:
+                raise CassetteMiss(f"No recorded response for {key}")
+            index = min(self._cursor[key], len(candidates) - 1)
+            self._cursor[key] += 1
+            return candidates[index]
+
+    def rewind(self):
+        with self._lock:
+            self._cursor.clear()
+
+
+class _Player:
+    """Installs the record or replay hooks on requests and httpx"""
+
+    def __init__(self, cassette: Cassette, mode: str, replay_latency: bool = False, latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+        self._restore = []
+
+    def _sleep(self, interaction: Dict):
+        if self.replay_latency and interaction.get('latency'):
+            time.sleep(interaction['latency'] * self.latency_scale)
+
+    def install(self):
+        self._patch_requests()
+        self._patch_httpx()
+        if self.mode == 'replay':
+            self._patch_azure_credentials()
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        self._restore.clear()
+
+    def _patch(self, owner, name, replacement):
+        self._restore.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _patch_requests(self):
+        # PyGithub, the GraphQL fetcher and azure-core all go through Session.request
+        try:
+            import requests
+            from requests.structures import CaseInsensitiveDict
+        except ImportError:
+            return
+        player = self
+        original = requests.Session.request
+
+        def request(session, method, url, params=None, data=None, json=None, **kwargs):
+            body = data if json is None else json
+            full_url = requests.Request(method, url, params=params).prepare().url
+
+            if player.mode == 'record':
+                started = time.monotonic()
+                response = original(session, method, url, params=params, data=data, json=json, **kwargs)
+                content = response.content
+                player.cassette.record(method, full_url, body, response.status_code,
+                                       dict(response.headers), content, time.monotonic() - started)
+                return response
+
+            interaction = player.cassette.next_response(method, full_url, body)
+            player._sleep(interaction)
+            response = requests.Response()
+            response.status_code = interaction['status']
+            response.headers = CaseInsensitiveDict(interaction['headers'])
+            response._content = base64.b64decode(interaction['body_b64'])
+            response._content_consumed = True
+            response.encoding = 'utf-8'
+            response.url = full_url
+            response.request = requests.Request(method, full_url).prepare()
+            return response
+
+        self._patch(requests.Session, 'request', request)
+
+    def _patch_httpx(self):
+        # The openai SDK sends every request through httpx.Client.send
+        try:
+            import httpx
+        except ImportError:
+            return
+        player = self
+        original = httpx.Client.send
+
+        def send(client, request, **kwargs):
+            body = request.content
+            if player.mode == 'record':
+                started = time.monotonic()
+                response = original(client, request, **kwargs)
+                content = response.read()
+                player.cassette.record(request.method, str(request.url), body, response.status_code,
+                                       dict(response.headers), content, time.monotonic() - started)
+                return response
+
+            interaction = player.cassette.next_response(request.method, str(request.url), body)
+            player._sleep(interaction)
+            return httpx.Response(
+                status_code=interaction['status'],
+                headers=interaction['headers'],
+                content=base64.b64decode(interaction['body_b64']),
+                request=request
+            )
+
+        self._patch(httpx.Client, 'send', send)
+
+    def _patch_azure_credentials(self):
+        # Token acquisition may shell out to the Azure CLI, which cannot be replayed
+        try:
+            from azure.core.credentials import AccessToken
+            from azure.identity import DefaultAzureCredential
+        except ImportError:
+            return
+
+        def get_token(credential, *scopes, **kwargs):
+            return AccessToken('replay-token', int(time.time()) + 3600)
+
+        self._patch(DefaultAzureCredential, 'get_token', get_token)
+
+
+@contextmanager
+def cassette(path: str, mode: str = 'replay', metadata: Optional[Dict] = None,
+             replay_latency: bool = False, latency_scale: float = 1.0):
+    """
+    Record every GitHub and Azure OpenAI HTTP exchange to `path`, or serve them back.
+
+    In replay mode requests are matched on method, URL and body; recorded
+    latencies are re-applied when `replay_latency` is set.
+    """
+    if mode == 'record':
+        tape = Cassette(path, metadata)
+    elif mode == 'replay':
+        tape = Cassette.load(path)
+    else:
+        raise ValueError(f"Unknown cassette mode: {mode}")
+
+    player = _Player(tape, mode, replay_latency, latency_scale)
+    player.install()
+    try:
+        yield tape
+    finally:
+        player.uninstall()
+        if mode == 'record':
+            tape.save()
+            print(f"📼 Recorded {len(tape.interactions)} interactions to {path}")
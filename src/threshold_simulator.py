@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .github_graphql import IssueRecord
+
+DAY_SECONDS = 86400.0
+FEEDBACK_LABEL = 'Needs Author Feedback'
+INVESTIGATION_LABEL = 'Under Investigation'
+
+
+def _episodes(record: IssueRecord, label: str, end_of_history: datetime) -> List[Tuple[datetime, datetime]]:
+    """(labeled, unlabeled-or-closed-or-now) spans during which the issue carried `label`"""
+    spans, opened_at = [], None
+    for event in record.label_events:
+        if event.label.lower() != label.lower():
+            continue
+        if event.event == 'labeled' and opened_at is None:
+            opened_at = event.created_at
+        elif event.event == 'unlabeled' and opened_at is not None:
+            spans.append((opened_at, event.created_at))
+            opened_at = None
+    if opened_at is not None:
+        spans.append((opened_at, record.closed_at or end_of_history))
+    return [(start, min(end, record.closed_at or end)) for start, end in spans if end > start]
+
+
+@dataclass
+class IssueTimelines:
+    """
+    Issue history reduced to the few per-episode durations the lifecycle rules depend on.
+
+    feedback_wait_days: for every span an issue waited on its author, the days
+    until the author replied, the label was removed, the issue closed, or
+    history ended, whichever came first. feedback_replied marks spans ended by
+    an author reply. feedback_censored marks spans cut short by a bot close
+    (the auto-close that was in force) or the end of history: those waits
+    lasted at least that long, and how much longer is unknown.
+    investigation_age_days: issue age in days when each 'Under Investigation'
+    span ended.
+    """
+    feedback_wait_days: np.ndarray
+    feedback_replied: np.ndarray
+    feedback_censored: np.ndarray
+    investigation_age_days: np.ndarray
+    issue_count: int
+
+    @classmethod
+    def from_records(cls, records: Iterable[IssueRecord], now: Optional[datetime] = None) -> 'IssueTimelines':
+        now = now or datetime.now(timezone.utc)
+        waits, replied, censored, investigation_ages = [], [], [], []
+        issue_count = 0
+        for record in records:
+            issue_count += 1
+            author_comments = [c.created_at for c in record.comments if c.author == record.author]
+            # A wait still running when the bot closed the issue, or now, was cut short rather than answered
+            if record.closed_at is None:
+                cut_off = now
+            else:
+                cut_off = record.closed_at if record.closed_by_bot else None
+            for start, end in _episodes(record, FEEDBACK_LABEL, now):
+                reply = next((t for t in author_comments if start < t <= end), None)
+                waits.append(((reply or end) - start).total_seconds() / DAY_SECONDS)
+                replied.append(reply is not None)
+                censored.append(reply is None and end == cut_off)
+            for _, end in _episodes(record, INVESTIGATION_LABEL, now):
+                investigation_ages.append((end - record.created_at).total_seconds() / DAY_SECONDS)
+
+        # Sorted once here so every threshold query is a binary search
+        waits = np.asarray(waits, dtype=np.float64)
+        order = np.argsort(waits, kind='stable')
+        return cls(
+            feedback_wait_days=waits[order],
+            feedback_replied=np.asarray(replied, dtype=bool)[order],
+            feedback_censored=np.asarray(censored, dtype=bool)[order],
+            investigation_age_days=np.sort(np.asarray(investigation_ages, dtype=np.float64)),
+            issue_count=issue_count
+        )
+
+    def save(self, path: str):
+        np.savez_compressed(path, feedback_wait_days=self.feedback_wait_days,
+                            feedback_replied=self.feedback_replied,
+                            feedback_censored=self.feedback_censored,
+                            investigation_age_days=self.investigation_age_days,
+                            issue_count=np.asarray(self.issue_count))
+
+    @classmethod
+    def load(cls, path: str) -> 'IssueTimelines':
+        data = np.load(path)
+        if 'feedback_censored' not in data:
+            raise ValueError(f"{path} predates censored waits; fetch the history again")
+        return cls(data['feedback_wait_days'], data['feedback_replied'], data['feedback_censored'],
+                   data['investigation_age_days'], int(data['issue_count']))
+
+
+def _at_least(ordered: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """How many sorted values are >= each threshold"""
+    return len(ordered) - np.searchsorted(ordered, thresholds, side='left')
+
+
+def simulate(timelines: IssueTimelines, attention_days: Iterable[float], close_days: Iterable[float],
+             escalate_days: Iterable[float]) -> Dict[str, np.ndarray]:
+    """
+    Count rule outcomes for every combination of thresholds at once.
+
+    An issue waiting on its author is marked stale after attention_days of
+    silence and auto-closed if the silence lasts close_days longer. A close is
+    premature when the author did reply, just later than that. Escalations
+    count investigation spans that outlived escalate_days. Returned arrays are
+    shaped (attention, close) for the stale rules and (escalate,) for escalations.
+
+    Censored waits count only where they reached the threshold, so the stale
+    and close counts are lower bounds. stale_unknown and close_unknown count
+    the censored waits that stopped short of it: the most each count could
+    grow by. Past the auto-close the history was recorded under, that is
+    every wait it closed.
+    """
+    attention = np.asarray(list(attention_days), dtype=np.float64)
+    close = np.asarray(list(close_days), dtype=np.float64)
+    escalate = np.asarray(list(escalate_days), dtype=np.float64)
+
+    waits = timelines.feedback_wait_days
+    replied_waits = waits[timelines.feedback_replied]
+    censored_waits = waits[timelines.feedback_censored]
+    close_after = np.add.outer(attention, close)
+    stale_unknown = len(censored_waits) - _at_least(censored_waits, attention)
+
+    return {
+        'attention_days': attention,
+        'close_days': close,
+        'escalate_days': escalate,
+        'marked_stale': np.broadcast_to(_at_least(waits, attention)[:, None], close_after.shape),
+        'auto_closed': _at_least(waits, close_after),
+        'closed_then_replied': _at_least(replied_waits, close_after),
+        'stale_unknown': np.broadcast_to(stale_unknown[:, None], close_after.shape),
+        'close_unknown': len(censored_waits) - _at_least(censored_waits, close_after),
+        'escalated': _at_least(timelines.investigation_age_days, escalate)
+    }
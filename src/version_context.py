@@ -0,0 +1,170 @@
+import re
+from typing import Dict, List, Optional
+
+from .changelog_index import SECTION_BUG_FIXES, SECTION_COMPONENTS, SECTION_FEATURES, ChangelogIndex
+from .package_exposure import PackageExposureIndex
+from .vhd_notes import KIND_BINARY, KIND_COMPONENT, KIND_KERNEL, KIND_PACKAGE
+
+MENTION_IMAGE = 'image'
+MENTION_KUBERNETES = 'kubernetes'
+MENTION_COMPONENT = 'component'
+
+# One pass over the issue text. Alternatives are tried left to right at each
+# position, so node image versions win over the generic name + version form.
+MENTION_PATTERN = re.compile(
+    r'(?<![\w.])(?:AKSUbuntu-\d{4}(?:gen2)?-|AKSWindows-\d{4}-)?'
+    r'(?P<image>\d{6}\.\d{2}\.\d+|\d{4}\.\d{2}\.\d{2}|\d{5}\.\d{3,5}\.\d{6})(?![\w.])'
+    r'|(?<![\w.])v?(?P<kube>1\.[1-3]\d\.\d{1,2})(?![\w.])'
+    r'|(?<![\w.-])(?P<name>[a-z][\w.-]*[a-z0-9])[ \t:=@/]+v?(?P<version>\d+\.\d+(?:\.\d+)*(?:-[\w.]*\w)?)(?![\w])',
+    re.IGNORECASE)
+
+KUBERNETES_NAMES = {'kubernetes', 'k8s', 'aks', 'kubelet', 'kubectl', 'version', 'cluster'}
+# Bundled versions worth quoting when an issue names an image
+IMAGE_HIGHLIGHTS = ('containerd', 'runc', 'kubelet', 'moby', 'docker', 'linux', 'os-release', 'ctr')
+
+
+def extract_mentions(text: str, known_names: Optional[set] = None) -> List[Dict]:
+    """
+    Node image, Kubernetes and component versions quoted in the text, each
+    once. Component mentions are kept only for names in `known_names`.
+    """
+    mentions, seen = [], set()
+    for match in MENTION_PATTERN.finditer(text):
+        if match.group('image'):
+            mention = {'type': MENTION_IMAGE, 'version': match.group('image')}
+        elif match.group('kube'):
+            mention = {'type': MENTION_KUBERNETES, 'version': match.group('kube')}
+        else:
+            name, version = match.group('name').lower(), match.group('version')
+            if known_names is not None and name in known_names and name not in KUBERNETES_NAMES:
+                mention = {'type': MENTION_COMPONENT, 'name': name, 'version': version}
+            else:
+                # 'upgraded to 1.31.9' or 'Windows 17763.7314.250518': the word is
+                # not a component, but the version on its own may still be one we know
+                inner = MENTION_PATTERN.fullmatch(version)
+                if not inner or not (inner.group('image') or inner.group('kube')):
+                    continue
+                mention = ({'type': MENTION_IMAGE, 'version': inner.group('image')} if inner.group('image')
+                           else {'type': MENTION_KUBERNETES, 'version': inner.group('kube')})
+        key = tuple(mention.values())
+        if key not in seen:
+            seen.add(key)
+            mentions.append(mention)
+    return mentions
+
+
+class VersionContext:
+    """
+    Resolves version mentions against the VHD notes and CHANGELOG indexes:
+    which OS SKUs an image version belongs to and what it bundles, which
+    images first shipped a Kubernetes or component version, and which
+    releases announced or fixed it.
+
+    Image versions and changelog tokens are dictionary lookups; the notes
+    index is only opened when the text actually quotes a version.
+    """
+
+    def __init__(self, exposure: Optional[PackageExposureIndex] = None, changelog: Optional[ChangelogIndex] = None,
+                 notes_root: str = 'vhd-notes', changelog_path: str = 'CHANGELOG.md', max_mentions: int = 5):
+        self._exposure = exposure
+        self.notes_root = notes_root
+        self.changelog = changelog or ChangelogIndex(changelog_path)
+        self.max_mentions = max_mentions
+        self._images: Optional[Dict[str, List[str]]] = None
+
+    @property
+    def exposure(self) -> PackageExposureIndex:
+        if self._exposure is None:
+            self._exposure = PackageExposureIndex(notes_root=self.notes_root)
+        return self._exposure
+
+    def _image_distros(self, image_version: str) -> List[str]:
+        if self._images is None:
+            self.exposure.known_names()
+            self._images = {}
+            for distro, version, _ in self.exposure.notes.releases():
+                self._images.setdefault(version, []).append(distro)
+        return self._images.get(image_version, [])
+
+    def _changelog(self, version: str, sections=None, limit: int = 3, name: Optional[str] = None) -> List[Dict]:
+        """Entries naming the version; with `name`, only those naming the component too"""
+        entries = self.changelog.mentions(version, sections)
+        if name is not None:
+            named = re.compile(rf'(?<![\w-]){re.escape(name)}(?![\w-])', re.IGNORECASE)
+            entries = [entry for entry in entries if named.search(entry.text)]
+        return [{'release': entry.release, 'section': entry.section, 'text': entry.text[:200]}
+                for entry in entries[:limit]]
+
+    def resolve(self, mention: Dict) -> Optional[Dict]:
+        if mention['type'] == MENTION_IMAGE:
+            distros = self._image_distros(mention['version'])
+            if not distros:
+                return None
+            # Per OS SKU: the same image version bundles different builds on Ubuntu and Azure Linux
+            bundled = {}
+            for distro in distros:
+                contents = {}
+                for row in self.exposure.notes.release_contents(distro, mention['version']):
+                    if row.kind in (KIND_COMPONENT, KIND_KERNEL, KIND_BINARY) and row.name in IMAGE_HIGHLIGHTS:
+                        contents.setdefault(row.name, set()).add(row.version)
+                if contents:
+                    bundled[distro] = {name: sorted(versions) for name, versions in sorted(contents.items())}
+            releases = {entry.release for distro in distros
+                        for entry in self.changelog.image_releases(distro, mention['version'])}
+            return {**mention, 'distros': distros, 'bundled': bundled, 'releases': sorted(releases)}
+
+        if mention['type'] == MENTION_KUBERNETES:
+            first = self.exposure.notes.first_release_with('kubelet', mention['version'], KIND_BINARY)
+            announced = self._changelog(mention['version'], (SECTION_FEATURES, SECTION_COMPONENTS, SECTION_BUG_FIXES))
+            if not first and not announced:
+                return None
+            return {**mention, 'first_images': {d: r['image_version'] for d, r in sorted(first.items())},
+                    'changelog': announced}
+
+        first = {}
+        for kind in (KIND_PACKAGE, KIND_COMPONENT):
+            for distro, row in self.exposure.notes.first_release_with(mention['name'], mention['version'], kind).items():
+                first.setdefault(distro, row['image_version'])
+        changelog = self._changelog(mention['version'], name=mention['name'])
+        if not first and not changelog:
+            return None
+        return {**mention, 'first_images': dict(sorted(first.items())), 'changelog': changelog}
+
+    def enrich(self, text: str) -> List[Dict]:
+        """Resolved context for each version the text quotes, in order of appearance"""
+        if not MENTION_PATTERN.search(text):
+            return []
+        resolved = []
+        for mention in extract_mentions(text, self.exposure.known_names()):
+            context = self.resolve(mention)
+            if context:
+                resolved.append(context)
+            if len(resolved) >= self.max_mentions:
+                break
+        return resolved
+
+
+def format_version_context(contexts: List[Dict], max_chars: int = 1200) -> str:
+    """One line per mention, compact enough for the classification prompt"""
+    lines = []
+    for context in contexts:
+        if context['type'] == MENTION_IMAGE:
+            bundled = '; '.join(
+                f"{distro} bundles " + ', '.join(f"{name} {'/'.join(versions[-2:])}" for name, versions in contents.items())
+                for distro, contents in context['bundled'].items())
+            line = f"- Node image {context['version']}: {', '.join(context['distros'])}"
+            if bundled:
+                line += f"; {bundled}"
+            if context['releases']:
+                line += f"; shipped in AKS release {', '.join(context['releases'])}"
+        else:
+            label = 'Kubernetes' if context['type'] == MENTION_KUBERNETES else context['name']
+            line = f"- {label} {context['version']}"
+            if context['first_images']:
+                firsts = ', '.join(f"{distro} {image}" for distro, image in list(context['first_images'].items())[:4])
+                line += f": first in node images {firsts}"
+            if context['changelog']:
+                line += '; changelog ' + ', '.join(f"{c['release']} ({c['section']})" for c in context['changelog'])
+        lines.append(line)
+    text = '\n'.join(lines)
+    return text if len(text) <= max_chars else text[:max_chars - 1] + '…'
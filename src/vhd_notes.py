@@ -0,0 +1,455 @@
+import hashlib
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .note_chunks import NoteChunkStore
+
+KIND_COMPONENT = 'component'
+KIND_IMAGE = 'image'
+KIND_BINARY = 'binary'
+KIND_PACKAGE = 'package'
+KIND_KERNEL = 'kernel'
+KIND_OS = 'os'
+KIND_UPDATE = 'update'
+KIND_CACHED = 'cached'
+# Stored as their index, so the order must only ever be appended to
+KINDS = (KIND_COMPONENT, KIND_IMAGE, KIND_BINARY, KIND_PACKAGE, KIND_KERNEL, KIND_OS, KIND_UPDATE, KIND_CACHED)
+
+# kind, lower-cased name, version ('' when the note gives none), and the raw
+# reference it came from (package NVRA, image ref or file name) or ''
+NoteRow = namedtuple('NoteRow', ['kind', 'name', 'version', 'detail'])
+
+RPM_ARCHES = ('x86_64', 'aarch64', 'noarch', 'i686', 'armv7hl')
+VERSION_TOKEN = re.compile(r'^v?\d[\w.+~:-]*$')
+BINARY_PATTERN = re.compile(r'/usr/local/bin/(kubelet|kubectl)-(\d\S*)$')
+KERNEL_PATTERN = re.compile(r'^Linux version (\S+)')
+DPKG_PATTERN = re.compile(r'^([^/\s]+)/\S+ (\S+) (\S+)(?: \[|$)')
+WINDOWS_CONTAINERD_PATTERN = re.compile(r'^Version: ctr \S+ v?(\S+)')
+WINDOWS_QFE_PATTERN = re.compile(r'^\s*(KB\d+)\s*:\s*([^:]+?)\s*:')
+CACHED_FILE_PATTERN = re.compile(r'^(?:(?!v?\d)(.+?)-)?v?(\d[\w.+~-]*?)(?:-windows-amd64)?\.(?:zip|tar\.gz|nupkg|exe|msi|cab)$')
+
+# Release file names: 2022.10.03, 202305.24.0 and (Windows) 17763.5329.240110
+RELEASE_PATTERNS = (
+    (re.compile(r'^(\d{4})\.(\d{2})\.(\d{2})$'), lambda m: (f"{m[1]}-{m[2]}-{m[3]}", 0)),
+    (re.compile(r'^(\d{4})(\d{2})\.(\d{2})\.(\d+)$'), lambda m: (f"{m[1]}-{m[2]}-{m[3]}", int(m[4]))),
+    (re.compile(r'^\d+\.\d+\.(\d{2})(\d{2})(\d{2})$'), lambda m: (f"20{m[1]}-{m[2]}-{m[3]}", 0)),
+)
+
+
+def release_date(image_version: str) -> Tuple[str, int]:
+    """(YYYY-MM-DD, same-day sequence) encoded in a release file name, for ordering releases"""
+    for pattern, convert in RELEASE_PATTERNS:
+        match = pattern.match(image_version)
+        if match:
+            return convert(match)
+    return ('', 0)
+
+
+def normalize_version(version: str) -> str:
+    return version[1:] if version[:1] in ('v', 'V') and version[1:2].isdigit() else version
+
+
+def version_matches(version: str, query: str) -> bool:
+    """'1.31.8' matches 1.31.8, v1.31.8 and 1.31.8-akslts / 1.31.8+azure, but not 1.31.80"""
+    version, query = normalize_version(version), normalize_version(query)
+    return version == query or (version.startswith(query) and version[len(query)] in '-+~_')
+
+
+def split_image_ref(ref: str) -> Tuple[str, str]:
+    """'mcr.microsoft.com/oss/kubernetes/pause:3.6' -> ('mcr.microsoft.com/oss/kubernetes/pause', '3.6')"""
+    if '@' in ref:
+        return ref.split('@', 1)[0], ''
+    name, sep, tag = ref.rpartition(':')
+    if not sep or '/' in tag:
+        return ref, ''
+    return name, tag
+
+
+def split_rpm_nvra(nvra: str) -> Optional[Tuple[str, str]]:
+    """'glibc-2.38-8.azl3.x86_64' -> ('glibc', '2.38-8.azl3')"""
+    base, _, arch = nvra.rpartition('.')
+    if arch not in RPM_ARCHES:
+        return None
+    parts = base.rsplit('-', 2)
+    if len(parts) != 3:
+        return None
+    return parts[0], f"{parts[1]}-{parts[2]}"
+
+
+def parse_component(line: str) -> List[NoteRow]:
+    """One '  - ' line of the components list, which mixes several free-form shapes"""
+    text = re.sub(r'^(?:\[\w+\]\s*)?(?:updated\s+)?', '', line.strip())
+    if '/' in text.split(' ')[0] and ('.' in text.split('/')[0] or ':' in text):
+        name, tag = split_image_ref(text.split(' ')[0])
+        return [NoteRow(KIND_IMAGE, name.lower(), tag, text.split(' ')[0])]
+    if '=' in text:
+        name, _, version = text.partition('=')
+        version = '' if '{{' in version else version.strip()
+        return [NoteRow(KIND_COMPONENT, name.strip().lower(), version, '')]
+
+    tokens = text.split()
+    index = next((i for i, token in enumerate(tokens) if VERSION_TOKEN.match(token) and i > 0), len(tokens))
+    names, versions = tokens[:index], [t for t in tokens[index:] if VERSION_TOKEN.match(t)]
+    if names and names[-1] == 'version':
+        names = names[:-1]
+    if not versions:
+        # 'pigz socat' and 'nvidia-docker2 nvidia-container-runtime' list several packages
+        return [NoteRow(KIND_COMPONENT, name.lower(), '', '') for name in tokens]
+    name = ' '.join(names).lower()
+    return [NoteRow(KIND_COMPONENT, name, normalize_version(v), '') for v in versions]
+
+
+# Parser state between lines: the open section and whether it has a body line yet
+PARSE_START = (None, 0)
+# Stored as the index's user_version; bump it when parsing changes so every note is parsed again
+PARSER_VERSION = 1
+
+
+def parse_note(text: str) -> List[NoteRow]:
+    """Normalized rows for one release-notes file (Linux or Windows layout)"""
+    return parse_lines(text.lstrip('\ufeff').splitlines())[0]
+
+
+def parse_lines(lines: Iterable[str], state: Tuple = PARSE_START) -> Tuple[List[NoteRow], Tuple]:
+    """
+    Rows for a run of note lines parsed from `state`, and the state after the
+    last line, so a note can be parsed piecewise and each piece reused
+    wherever it recurs after the same state.
+    """
+    rows: List[NoteRow] = []
+    section, section_lines = state
+    for raw in lines:
+        stripped = raw.strip()
+        if not stripped:
+            # Windows sections end at the first blank line after their body
+            if section in ('windows-images', 'windows-qfes', 'windows-cached') and section_lines:
+                section = None
+            continue
+        header = section
+
+        # Section headers
+        if stripped.startswith('Components downloaded in this VHD build'):
+            section = 'components'
+        elif stripped.endswith('images pre-pulled:'):
+            section = 'images'
+        elif stripped == 'kubelet/kubectl downloaded:':
+            section = 'binaries'
+        elif stripped == '=== Installed Packages Begin':
+            section = 'packages'
+        elif stripped in ('=== Installed Packages End', '=== os-release End', 'Disk usage:'):
+            section = None
+        elif stripped == '=== os-release Begin':
+            section = 'os-release'
+        elif stripped == 'Using kernel:':
+            section = 'kernel'
+        elif stripped == 'Images:':
+            section = 'windows-images'
+        elif stripped == 'Installed QFEs':
+            section = 'windows-qfes'
+        elif stripped == 'Cached Files:':
+            section = 'windows-cached'
+        elif stripped.startswith('OS Version') and ':' in stripped:
+            rows.append(NoteRow(KIND_OS, 'windows', stripped.split(':', 1)[1].strip(), ''))
+        elif WINDOWS_CONTAINERD_PATTERN.match(stripped):
+            rows.append(NoteRow(KIND_COMPONENT, 'containerd',
+                                WINDOWS_CONTAINERD_PATTERN.match(stripped).group(1), ''))
+
+        # Section bodies
+        elif section in ('components', 'images') and stripped.startswith('- '):
+            if section == 'components':
+                rows.extend(parse_component(stripped[2:]))
+            else:
+                ref = stripped[2:].strip()
+                name, tag = split_image_ref(ref)
+                rows.append(NoteRow(KIND_IMAGE, name.lower(), tag, ref))
+        elif section == 'binaries':
+            match = BINARY_PATTERN.search(stripped)
+            if match:
+                rows.append(NoteRow(KIND_BINARY, match.group(1), match.group(2), ''))
+        elif section == 'packages':
+            dpkg = DPKG_PATTERN.match(stripped)
+            if dpkg:
+                name, version, arch = dpkg.groups()
+                rows.append(NoteRow(KIND_PACKAGE, name.lower(), version, f"{name}_{version}_{arch}"))
+            else:
+                nv = split_rpm_nvra(stripped)
+                if nv:
+                    rows.append(NoteRow(KIND_PACKAGE, nv[0].lower(), nv[1], stripped))
+        elif section == 'os-release':
+            key, _, value = stripped.partition('=')
+            if key == 'VERSION':
+                rows.append(NoteRow(KIND_OS, 'os-release', value.strip('"'), ''))
+        elif section == 'kernel':
+            match = KERNEL_PATTERN.match(stripped)
+            if match:
+                rows.append(NoteRow(KIND_KERNEL, 'linux', match.group(1), ''))
+            section = None
+        elif section == 'windows-images':
+            ref = stripped.split()[0]
+            if ref != 'REF' and not ref.startswith('sha256:') and '@' not in ref:
+                name, tag = split_image_ref(ref)
+                rows.append(NoteRow(KIND_IMAGE, name.lower(), tag, ref))
+        elif section == 'windows-qfes':
+            match = WINDOWS_QFE_PATTERN.match(stripped)
+            if match:
+                rows.append(NoteRow(KIND_UPDATE, match.group(1).lower(), '', match.group(2)))
+        elif section == 'windows-cached' and stripped.lower().startswith('c:\\'):
+            path = stripped.split()[0]
+            directory, _, filename = path.rpartition('\\')
+            match = CACHED_FILE_PATTERN.match(filename)
+            if match:
+                # win-k8s\v1.24.3-1int.zip carries no name of its own
+                name = match.group(1) or directory.rpartition('\\')[2]
+                rows.append(NoteRow(KIND_CACHED, name.lower(), match.group(2), filename))
+        section_lines = 1 if section == header else 0
+    return rows, (section, section_lines)
+
+
+def iter_note_files(root: str) -> Iterator[Tuple[str, str, str]]:
+    """(path, distro, image version) for every release-notes file under root"""
+    for directory, _, files in os.walk(root):
+        distro = os.path.relpath(directory, root).replace(os.sep, '/')
+        for filename in files:
+            if filename.endswith('.txt'):
+                yield os.path.join(directory, filename), distro, filename[:-4]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id            INTEGER PRIMARY KEY,
+    path          TEXT    NOT NULL UNIQUE,
+    distro        TEXT    NOT NULL,
+    image_version TEXT    NOT NULL,
+    release_date  TEXT    NOT NULL,
+    release_seq   INTEGER NOT NULL,
+    size          INTEGER NOT NULL,
+    mtime_ns      INTEGER NOT NULL,
+    digest        TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names    (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS versions (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS details  (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS note_rows (
+    file_id    INTEGER NOT NULL,
+    kind       INTEGER NOT NULL,
+    name_id    INTEGER NOT NULL,
+    version_id INTEGER NOT NULL,
+    detail_id  INTEGER NOT NULL,
+    PRIMARY KEY (file_id, kind, name_id, version_id, detail_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS note_rows_by_name ON note_rows (name_id, version_id);
+"""
+
+
+class VhdNotesIndex:
+    """
+    SQLite index of the VHD release notes, one normalized row per component,
+    image, binary or package in each release.
+
+    Names, versions and raw references are dictionary-encoded, so each row is
+    five integers, and rows are clustered by release, so the table is also the
+    per-file index. For the 20 MB of notes in vhd-notes/ the database is about
+    15 MB: the rows and their name index take 9 MB, the note text 3 MB.
+    update() only re-parses files whose content changed since the last run
+    (size and mtime first, a content digest when those differ, e.g. after a
+    fresh checkout), and drops releases whose file is gone. An index written
+    by an older PARSER_VERSION has every note parsed again once; one with an
+    older schema is not migrated, delete it and it is rebuilt from the notes.
+
+    The note text itself is kept deduplicated in a NoteChunkStore, and parsing
+    goes chunk by chunk: the rows of a chunk parsed from a given parser state
+    are remembered, so a block shared by hundreds of releases is parsed and
+    interned once.
+    """
+
+    def __init__(self, path: str = 'vhd_notes.db', root: str = 'vhd-notes'):
+        self.path = path
+        self.root = root
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._reparse = self.conn.execute("PRAGMA user_version").fetchone()[0] != PARSER_VERSION
+        self._ids: Dict[str, Dict[str, int]] = {'names': {}, 'versions': {}, 'details': {}}
+        self.chunks = NoteChunkStore(self.conn)
+        # (chunk id, parser state) -> (interned rows, parser state after the chunk)
+        self._parsed: Dict[Tuple[int, Tuple], Tuple[List[Tuple[int, int, int, int]], Tuple]] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def _intern(self, table: str, value: str) -> int:
+        cache = self._ids[table]
+        if value not in cache:
+            row = self.conn.execute(f"SELECT id FROM {table} WHERE value = ?", (value,)).fetchone()
+            if row is None:
+                row = (self.conn.execute(f"INSERT INTO {table} (value) VALUES (?)", (value,)).lastrowid,)
+            cache[value] = row[0]
+        return cache[value]
+
+    def update(self) -> Dict:
+        """Bring the index in line with the files under root; returns what changed"""
+        known = {path: (file_id, size, mtime, digest) for file_id, path, size, mtime, digest in
+                 self.conn.execute("SELECT id, path, size, mtime_ns, digest FROM files")}
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'rows': 0}
+        seen = set()
+        with self.conn:
+            for path, distro, image_version in iter_note_files(self.root):
+                relpath = os.path.relpath(path, self.root).replace(os.sep, '/')
+                seen.add(relpath)
+                stat = os.stat(path)
+                previous = known.get(relpath)
+                current = previous is not None and not self._reparse
+                if current and previous[1:3] == (stat.st_size, stat.st_mtime_ns):
+                    stats['unchanged'] += 1
+                    continue
+                with open(path, 'rb') as f:
+                    content = f.read()
+                digest = hashlib.sha1(content).hexdigest()
+                if current and previous[3] == digest:
+                    self.conn.execute("UPDATE files SET mtime_ns = ? WHERE id = ?", (stat.st_mtime_ns, previous[0]))
+                    stats['unchanged'] += 1
+                    continue
+                if previous:
+                    self._delete(previous[0])
+                    stats['updated'] += 1
+                else:
+                    stats['added'] += 1
+
+                date, seq = release_date(image_version)
+                file_id = self.conn.execute(
+                    "INSERT INTO files (path, distro, image_version, release_date, release_seq, size, mtime_ns, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (relpath, distro, image_version, date, seq, stat.st_size, stat.st_mtime_ns, digest)).lastrowid
+                rows = set()
+                state = PARSE_START
+                for chunk_id, chunk in self.chunks.put(file_id, content):
+                    chunk_rows, state = self._parse_chunk(chunk_id, chunk, state)
+                    rows.update(chunk_rows)
+                self.conn.executemany("INSERT INTO note_rows VALUES (?, ?, ?, ?, ?)",
+                                      [(file_id,) + row for row in rows])
+                stats['rows'] += len(rows)
+
+            for relpath, (file_id, _, _, _) in known.items():
+                if relpath not in seen:
+                    self._delete(file_id)
+                    stats['removed'] += 1
+            if stats['updated'] or stats['removed']:
+                self.chunks.collect_garbage()
+            if self._reparse:
+                self.conn.execute(f"PRAGMA user_version = {PARSER_VERSION}")
+                self._reparse = False
+        return stats
+
+    def _parse_chunk(self, chunk_id: int, chunk: bytes, state: Tuple) -> Tuple[List[Tuple[int, int, int, int]], Tuple]:
+        """Interned rows of one chunk entered in `state`, parsed at most once per index"""
+        key = (chunk_id, state)
+        if key not in self._parsed:
+            # Chunks end on line breaks, so each decodes on its own; only a note's first can carry a BOM
+            rows, after = parse_lines(chunk.decode('utf-8', errors='replace').lstrip('\ufeff').splitlines(), state)
+            self._parsed[key] = ([(KINDS.index(row.kind), self._intern('names', row.name),
+                                   self._intern('versions', row.version), self._intern('details', row.detail))
+                                  for row in rows], after)
+        return self._parsed[key]
+
+    def _delete(self, file_id: int):
+        self.conn.execute("DELETE FROM note_rows WHERE file_id = ?", (file_id,))
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        self.chunks.remove(file_id)
+
+    def _file_id(self, distro: str, image_version: str) -> Optional[int]:
+        row = self.conn.execute("SELECT id FROM files WHERE distro = ? AND image_version = ?",
+                                (distro, image_version)).fetchone()
+        return row[0] if row else None
+
+    def read_note(self, distro: str, image_version: str) -> Optional[str]:
+        """A release's notes as indexed, rebuilt from the chunk store"""
+        file_id = self._file_id(distro, image_version)
+        if file_id is None:
+            return None
+        return self.chunks.read(file_id).decode('utf-8', errors='replace')
+
+    def note_diff(self, distro: str, from_version: str, to_version: str) -> List[str]:
+        """Unified text diff of two releases' notes, comparing only the chunks they do not share"""
+        file_ids = [self._file_id(distro, version) for version in (from_version, to_version)]
+        for version, file_id in zip((from_version, to_version), file_ids):
+            if file_id is None:
+                raise ValueError(f"No release {version} for {distro}")
+        return self.chunks.diff(*file_ids)
+
+    def _version_ids(self, name: str, version: Optional[str]) -> List[int]:
+        """Version ids stored for `name` that match `version` (all of them when version is None)"""
+        rows = self.conn.execute(
+            "SELECT DISTINCT v.id, v.value FROM note_rows r JOIN names n ON n.id = r.name_id "
+            "JOIN versions v ON v.id = r.version_id WHERE n.value = ?", (name.lower(),)).fetchall()
+        return [vid for vid, value in rows if version is None or version_matches(value, version)]
+
+    def releases_with(self, name: str, version: Optional[str] = None, kind: Optional[str] = None,
+                      distro: Optional[str] = None) -> List[Dict]:
+        """Releases shipping `name` (at `version`), oldest first"""
+        version_ids = self._version_ids(name, version)
+        if not version_ids:
+            return []
+        clauses = [f"r.version_id IN ({','.join('?' * len(version_ids))})",
+                   "r.name_id = (SELECT id FROM names WHERE value = ?)"]
+        params: List = version_ids + [name.lower()]
+        if kind:
+            clauses.append("r.kind = ?")
+            params.append(KINDS.index(kind))
+        if distro:
+            clauses.append("(f.distro = ? OR f.distro LIKE ?)")
+            params.extend([distro, f"{distro}/%"])
+        query = (
+            "SELECT f.distro, f.image_version, f.release_date, r.kind, v.value, d.value "
+            "FROM note_rows r JOIN files f ON f.id = r.file_id "
+            "JOIN versions v ON v.id = r.version_id JOIN details d ON d.id = r.detail_id "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY f.release_date, f.release_seq, f.distro")
+        return [{'distro': row[0], 'image_version': row[1], 'release_date': row[2],
+                 'kind': KINDS[row[3]], 'version': row[4], 'detail': row[5]}
+                for row in self.conn.execute(query, params)]
+
+    def first_release_with(self, name: str, version: str, kind: Optional[str] = None,
+                           distro: Optional[str] = None) -> Dict[str, Dict]:
+        """Earliest release per distro shipping `name` at `version`"""
+        first: Dict[str, Dict] = {}
+        for row in self.releases_with(name, version, kind, distro):
+            first.setdefault(row['distro'], row)
+        return first
+
+    def versions_of(self, name: str, distro: Optional[str] = None) -> Dict[str, int]:
+        """Every version of `name` in the index, with the number of releases shipping it"""
+        counts: Dict[str, int] = {}
+        for row in self.releases_with(name, distro=distro):
+            counts[row['version']] = counts.get(row['version'], 0) + 1
+        return counts
+
+    def release_contents(self, distro: str, image_version: str, kind: Optional[str] = None) -> List[NoteRow]:
+        # Resolve the file first so the rows come through the primary key
+        file_id = self._file_id(distro, image_version)
+        if file_id is None:
+            return []
+        query = (
+            "SELECT r.kind, n.value, v.value, d.value FROM note_rows r "
+            "JOIN names n ON n.id = r.name_id JOIN versions v ON v.id = r.version_id "
+            "JOIN details d ON d.id = r.detail_id WHERE r.file_id = ?")
+        params: List = [file_id]
+        if kind:
+            query += " AND r.kind = ?"
+            params.append(KINDS.index(kind))
+        return sorted(NoteRow(KINDS[k], n, v, d) for k, n, v, d in self.conn.execute(query, params))
+
+    def releases(self, distro: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """(distro, image version, release date) in release order"""
+        query = "SELECT distro, image_version, release_date FROM files"
+        params: List = []
+        if distro:
+            query += " WHERE distro = ? OR distro LIKE ?"
+            params = [distro, f"{distro}/%"]
+        return self.conn.execute(query + " ORDER BY release_date, release_seq, distro", params).fetchall()
+
+    def stats(self) -> Dict:
+        count = lambda table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return {'releases': count('files'), 'rows': count('note_rows'), 'names': count('names'),
+                'versions': count('versions'), 'details': count('details'), 'chunks': self.chunks.stats()}